@@ -0,0 +1,79 @@
+from ansible.errors import AnsibleActionFail
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible.plugins.action import ActionBase
+from ansible.utils.vars import merge_hash
+
+MODULE_NAME = 'keyfactor.platform.pfx_enrollment'
+
+class ActionModule(ActionBase):
+
+    _supports_check_mode = True
+    _supports_async = True
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp
+
+        module_args = dict(self._task.args)
+        aggregate = boolean(module_args.pop('aggregate', False), strict=False)
+        host_var = module_args.pop('host_var', 'pfx_enrollment_request')
+
+        wrap_async = self._task.async_val and not self._connection.has_native_async
+
+        if not aggregate:
+            return merge_hash(result, self._execute_module(module_name=MODULE_NAME,
+                module_args=module_args, task_vars=task_vars, wrap_async=wrap_async))
+
+        if not self._task.run_once:
+            raise AnsibleActionFail('aggregate requires the task to use run_once.')
+        if 'subject' in module_args or 'enrollments' in module_args:
+            raise AnsibleActionFail('subject and enrollments are read from the ' + host_var + ' host variable when aggregate is set.')
+
+        # Collect the request of every host in the current batch and enroll
+        # them in a single module execution using the module's batch mode
+        hosts = []
+        enrollments = []
+        hostvars = task_vars.get('hostvars', {})
+        for host in task_vars.get('ansible_play_batch', []):
+            request = hostvars[host].get(host_var)
+            if request is None:
+                continue
+            request = self._templar.template(request)
+            if not isinstance(request, dict):
+                raise AnsibleActionFail(host_var + ' of host ' + host + ' must be a dictionary.')
+            # The result is registered on every host of the batch, so it must
+            # not carry any host's key material
+            if not request.get('dest'):
+                raise AnsibleActionFail(host_var + ' of host ' + host + ' must set dest when aggregate is set.')
+            if module_args.get('dest_format', 'pfx') == 'pfx' and not (request.get('pfx_password') or module_args.get('pfx_password')):
+                raise AnsibleActionFail(host_var + ' of host ' + host + ' must set pfx_password when aggregate is set, the generated password is not returned.')
+            hosts.append(host)
+            enrollments.append(request)
+
+        if not enrollments:
+            result.update(changed=False, hosts={}, msg='No host in the batch defines ' + host_var + '.')
+            return result
+
+        module_args['enrollments'] = enrollments
+        module_result = self._execute_module(module_name=MODULE_NAME,
+            module_args=module_args, task_vars=task_vars, wrap_async=wrap_async)
+        if wrap_async:
+            return merge_hash(result, module_result)
+
+        # run_once results are registered on every host of the batch, each
+        # host finds its own enrollment under hosts[inventory_hostname]
+        entries = module_result.pop('enrollments', [])
+        for entry in entries:
+            entry.pop('pfx_certificate', None)
+            entry.pop('pfx_password', None)
+        module_result['hosts'] = dict(zip(hosts, entries))
+        module_result['failed_hosts'] = [host for host, entry in zip(hosts, entries) if entry.get('error') is not None]
+        # One host's failed enrollment should not fail the others, the task
+        # only fails when no host was enrolled
+        if module_result['failed_hosts'] and len(module_result['failed_hosts']) < len(entries):
+            module_result['failed'] = False
+            module_result.setdefault('warnings', []).append(str(len(module_result['failed_hosts'])) + ' of ' + str(len(entries))
+                + ' enrollments failed: ' + ', '.join(module_result['failed_hosts']) + '.')
+            module_result.pop('msg', None)
+            module_result.pop('exception', None)
+        return merge_hash(result, module_result)
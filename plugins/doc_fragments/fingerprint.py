@@ -0,0 +1,19 @@
+class ModuleDocFragment(object):
+
+    # Options of the modules that record successful applies in a fingerprint store
+    DOCUMENTATION = r'''
+options:
+    fingerprint_store:
+        description:
+            - Path of a local file recording the last successful apply of each request. When set, a task whose request
+              was applied within fingerprint_ttl seconds returns unchanged without contacting keyfactor.
+        required: false
+    fingerprint_ttl:
+        description:
+            - Seconds a recorded apply short-circuits the same request. Default 3600
+        required: false
+    force_refresh:
+        description:
+            - Ignore the fingerprint store and read keyfactor. The store is updated afterwards. Default False
+        required: false
+'''
@@ -0,0 +1,12 @@
+class ModuleDocFragment(object):
+
+    # The instances option of the modules that apply a task to several Command instances
+    DOCUMENTATION = r'''
+options:
+    instances:
+        description:
+            - List of Command instances to apply the task to concurrently, each with a name, url and optionally url_username,
+              url_password, validate_certs, ca_path and headers. Connection settings an instance omits are taken from the task.
+            - The result holds one entry per instance name, and a failing instance does not stop the others.
+        required: false
+'''
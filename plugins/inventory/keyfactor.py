@@ -0,0 +1,172 @@
+DOCUMENTATION = '''
+---
+name: keyfactor
+
+short_description: Orchestrators and certificate stores known to keyfactor
+
+version_added: "2.11"
+
+description:
+    - Builds an inventory with one host per orchestrator (agent) registered in keyfactor, keyed by its client machine name.
+    - Agents, certificate stores and store types are paged through concurrently. Every host gets the agent details and the
+      list of its certificate stores as variables.
+    - Hosts are grouped by platform (keyfactor_platform_<platform>), status (keyfactor_status_<status>) and by the short
+      name of every store type they hold a store of (keyfactor_store_type_<short name>).
+    - The inventory cache can be enabled so that playbook starts do not page through a large tenant every time.
+    - The inventory file name must end with keyfactor.yml or keyfactor.yaml.
+
+extends_documentation_fragment:
+    - constructed
+    - inventory_cache
+
+options:
+    plugin:
+        description: Name of the plugin
+        required: true
+        choices: ['keyfactor.platform.keyfactor']
+    url:
+        description: Address of keyfactor, with a trailing /
+        required: true
+        env:
+            - name: KEYFACTOR_ADDR
+    url_username:
+        description: Keyfactor user
+        env:
+            - name: KEYFACTOR_USER
+    url_password:
+        description: Password of the keyfactor user
+        env:
+            - name: KEYFACTOR_PASSWORD
+    validate_certs:
+        description: Whether to validate the keyfactor certificate
+        type: bool
+        default: true
+    src:
+        description: Name of the Virtual Directory
+        default: KeyfactorAPI
+    page_size:
+        description: Number of agents or stores requested per page
+        type: int
+        default: 500
+    include_stores:
+        description: Whether to read certificate stores. Without them hosts carry no store variables or store type groups
+        type: bool
+        default: true
+    timeout:
+        description: Request timeout in seconds
+        type: int
+        default: 30
+
+author:
+    - Sulav Acharya (@sulavacharya-inf)
+'''
+
+EXAMPLES = '''
+# keyfactor.yml
+plugin: keyfactor.platform.keyfactor
+url: https://keyfactor.example.com/
+cache: true
+cache_plugin: jsonfile
+cache_connection: ~/.cache/keyfactor_inventory
+cache_timeout: 3600
+keyed_groups:
+  - key: keyfactor_version
+    prefix: keyfactor_version
+'''
+
+from ansible.errors import AnsibleError
+from ansible.plugins.inventory import BaseInventoryPlugin, Cacheable, Constructable
+
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible_collections.keyfactor.platform.plugins.module_utils.client import KeyfactorClient
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import KeyfactorApiError
+
+PLATFORMS = {0: 'unknown', 1: 'dotnet', 2: 'java', 3: 'mac', 4: 'android', 5: 'native', 6: 'bundled_dotnet', 7: 'bundled_java'}
+STATUSES = {1: 'new', 2: 'approved', 3: 'disapproved'}
+
+class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
+
+    NAME = 'keyfactor.platform.keyfactor'
+
+    def verify_file(self, path):
+        return super(InventoryModule, self).verify_file(path) and path.endswith(('keyfactor.yml', 'keyfactor.yaml'))
+
+    def parse(self, inventory, loader, path, cache=True):
+        super(InventoryModule, self).parse(inventory, loader, path, cache)
+        self._read_config_data(path)
+
+        cache_key = self.get_cache_key(path)
+        use_cache = self.get_option('cache') and cache
+        update_cache = self.get_option('cache') and not cache
+        content = None
+        if use_cache:
+            try:
+                content = self._cache[cache_key]
+            except KeyError:
+                update_cache = True
+        if content is None:
+            content = self.handleFetch()
+        if update_cache:
+            self._cache[cache_key] = content
+        self.handlePopulate(content)
+
+    def handleFetch(self):
+        client = KeyfactorClient(self.get_option('url'), self.get_option('url_username'), self.get_option('url_password'),
+            self.get_option('validate_certs'), self.get_option('timeout'))
+        src = self.get_option('src')
+        page_size = self.get_option('page_size')
+        reads = {'agents': lambda: list(client.handlePaged(src + '/Agents', page_size=page_size))}
+        if self.get_option('include_stores'):
+            reads['stores'] = lambda: list(client.handlePaged(src + '/CertificateStores', page_size=page_size))
+            reads['store_types'] = lambda: client.handleJsonRequest('GET', src + '/CertificateStoreTypes') or []
+        try:
+            with ThreadPoolExecutor(max_workers=len(reads)) as executor:
+                futures = dict((name, executor.submit(read)) for name, read in reads.items())
+                return dict((name, future.result()) for name, future in futures.items())
+        except KeyfactorApiError as e:
+            raise AnsibleError('Unable to read keyfactor inventory: ' + e.message)
+
+    def handlePopulate(self, content):
+        storeTypes = dict((storeType['StoreType'], storeType.get('ShortName') or str(storeType['StoreType']))
+            for storeType in content.get('store_types', []))
+        storesByAgent = {}
+        for store in content.get('stores', []):
+            storesByAgent.setdefault(store.get('AgentId'), []).append({
+                'id': store.get('Id'),
+                'path': store.get('StorePath'),
+                'client_machine': store.get('ClientMachine'),
+                'store_type': storeTypes.get(store.get('CertStoreType'), store.get('CertStoreType'))
+            })
+
+        strict = self.get_option('strict')
+        for agent in content['agents']:
+            host = agent.get('ClientMachine')
+            if not host:
+                continue
+            self.inventory.add_host(host)
+            platform = PLATFORMS.get(agent.get('AgentPlatform'), str(agent.get('AgentPlatform')))
+            status = STATUSES.get(agent.get('Status'), str(agent.get('Status')))
+            stores = storesByAgent.get(agent.get('AgentId'), [])
+            hostvars = {
+                'keyfactor_agent_id': agent.get('AgentId'),
+                'keyfactor_platform': platform,
+                'keyfactor_status': status,
+                'keyfactor_version': agent.get('Version'),
+                'keyfactor_last_seen': agent.get('LastSeen'),
+                'keyfactor_capabilities': agent.get('Capabilities') or [],
+                'keyfactor_stores': stores
+            }
+            for key, value in hostvars.items():
+                self.inventory.set_variable(host, key, value)
+
+            groups = ['keyfactor_platform_' + platform, 'keyfactor_status_' + status]
+            groups.extend(sorted(set('keyfactor_store_type_' + str(store['store_type']) for store in stores)))
+            for group in groups:
+                group = self._sanitize_group_name(group)
+                self.inventory.add_group(group)
+                self.inventory.add_child(group, host)
+
+            self._set_composite_vars(self.get_option('compose'), hostvars, host, strict=strict)
+            self._add_host_to_composed_groups(self.get_option('groups'), hostvars, host, strict=strict)
+            self._add_host_to_keyed_groups(self.get_option('keyed_groups'), hostvars, host, strict=strict)
@@ -0,0 +1,214 @@
+DOCUMENTATION = '''
+---
+name: keyfactor
+
+short_description: Resolve certificate, collection and CA ids from keyfactor
+
+version_added: "2.11"
+
+description:
+    - Returns one value per term. With kind certificate a term is a keyfactor query, such as CN -eq "www.example.com",
+      filtered by keyfactor. Revoked and expired certificates are left out unless include_inactive is set, and of the
+      certificates that match, the field of the one expiring last is returned.
+    - With kind collection a term is a collection name and with kind ca a term is a logical name, optionally prefixed
+      with the host name (host\\logical). Their lists are short and read once, so one request resolves any number of names.
+    - Answers are kept in memory for the process, and in cache_path for cache_ttl seconds when it is set. Lookups for
+      different hosts run in separate worker processes, so the file cache is what spares keyfactor repeated requests
+      across hosts.
+    - With mirror_path collection and CA names are answered from a mirror kept by the keyfactor.platform.mirror module,
+      without a request, as long as the mirror holds that kind.
+
+options:
+    _terms:
+        description: Queries, collection names or CA names
+        required: true
+    kind:
+        description: What the terms name
+        choices: ['certificate', 'collection', 'ca']
+        default: certificate
+    field:
+        description:
+            - Field returned. Default Id for certificates and collections, and the CA id string (host\\logical) for CAs
+    url:
+        description: Address of keyfactor, with a trailing /
+        env:
+            - name: KEYFACTOR_ADDR
+    url_username:
+        description: Keyfactor user
+        env:
+            - name: KEYFACTOR_USER
+    url_password:
+        description: Password of the keyfactor user
+        env:
+            - name: KEYFACTOR_PASSWORD
+    validate_certs:
+        description: Whether to validate the keyfactor certificate
+        type: bool
+        default: true
+    src:
+        description: Name of the Virtual Directory
+        default: KeyfactorAPI
+    cache_path:
+        description: File keeping answers across worker processes and runs
+        type: path
+    cache_ttl:
+        description: Seconds an answer in cache_path stays valid
+        type: int
+        default: 600
+    mirror_path:
+        description: SQLite mirror answering collection and CA lookups
+        type: path
+    include_inactive:
+        description: With kind certificate, also match revoked and expired certificates
+        type: bool
+        default: false
+
+author:
+    - Sulav Acharya (@sulavacharya-inf)
+'''
+
+EXAMPLES = '''
+- name: Use the id of a collection and a certificate in a template
+  debug:
+    msg: >-
+      {{ lookup('keyfactor.platform.keyfactor', 'Web Servers', kind='collection') }}
+      {{ lookup('keyfactor.platform.keyfactor', 'CN -eq "' ~ inventory_hostname ~ '"', cache_path='/tmp/keyfactor_lookup.json') }}
+
+- name: CA id string for enrollment
+  set_fact:
+    ca: "{{ lookup('keyfactor.platform.keyfactor', 'CorpIssuingCA1', kind='ca') }}"
+'''
+
+RETURN = '''
+_raw:
+    description: One value per term
+    type: list
+'''
+
+from ansible.errors import AnsibleError
+from ansible.plugins.lookup import LookupBase
+from ansible.module_utils.six.moves.urllib.parse import urlencode
+
+import fcntl
+import os
+import threading
+import time
+
+from ansible_collections.keyfactor.platform.plugins.module_utils.client import KeyfactorClient
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import KeyfactorApiError, readJsonFile, writeJsonAtomic
+from ansible_collections.keyfactor.platform.plugins.module_utils.mirror import Mirror
+
+# Answers of this process, shared by every lookup it runs
+MEMORY = {}
+MEMORY_LOCK = threading.Lock()
+
+class LookupModule(LookupBase):
+
+    def run(self, terms, variables=None, **kwargs):
+        self.set_options(var_options=variables, direct=kwargs)
+        kind = self.get_option('kind')
+        field = self.get_option('field')
+        self.client = KeyfactorClient(self.get_option('url'), self.get_option('url_username'), self.get_option('url_password'),
+            self.get_option('validate_certs'))
+        self.src = self.get_option('src')
+
+        # Lookups with and without inactive certificates are cached apart
+        keyKind = kind + ':inactive' if kind == 'certificate' and self.get_option('include_inactive') else kind
+        keys = [createKey(self.get_option('url'), keyKind, field, term) for term in terms]
+        answers = self.handleCacheRead(keys)
+        missing = [(key, term) for key, term in zip(keys, terms) if key not in answers]
+        if missing:
+            try:
+                if kind == 'certificate':
+                    found = dict((key, self.handleCertificate(term, field)) for key, term in missing)
+                else:
+                    found = self.handleList(kind, field, missing)
+            except KeyfactorApiError as e:
+                raise AnsibleError('keyfactor lookup failed: ' + e.message)
+            self.handleCacheWrite(found)
+            answers.update(found)
+
+        unresolved = [term for key, term in zip(keys, terms) if answers.get(key) is None]
+        if unresolved:
+            raise AnsibleError('keyfactor lookup found no ' + kind + ' for: ' + ', '.join(unresolved))
+        return [answers[key] for key in keys]
+
+    def handleCertificate(self, query, field):
+        # Of several matches, such as a certificate and its renewal, the one
+        # expiring last is returned
+        if not self.get_option('include_inactive'):
+            query = '(' + query + ') AND CertState -eq 1 AND NotAfter -ge "%TODAY%"'
+        params = {'pq.queryString': query, 'pq.pageReturned': 1, 'pq.returnLimit': 1,
+            'pq.sortField': 'NotAfter', 'pq.sortAscending': 1}
+        certificates = self.client.handleJsonRequest('GET', self.src + '/Certificates?' + urlencode(params)) or []
+        if not certificates:
+            return None
+        return certificates[0].get(field or 'Id')
+
+    def handleList(self, kind, field, missing):
+        # One list request answers every name of the kind; all of them are
+        # cached so later lookups of other names cost nothing either
+        if kind == 'collection':
+            items = self.handleMirror('collections')
+            if items is None:
+                items = self.client.handleJsonRequest('GET', self.src + '/CertificateCollections/') or []
+            names = dict((item['Name'], item.get(field or 'Id')) for item in items)
+        else:
+            items = self.handleMirror('certificate_authorities')
+            if items is None:
+                items = self.client.handleJsonRequest('GET', self.src + '/CertificateAuthority/') or []
+            names = {}
+            for item in items:
+                value = item.get(field) if field else item['HostName'] + '\\' + item['LogicalName']
+                names[item['HostName'] + '\\' + item['LogicalName']] = value
+                names.setdefault(item['LogicalName'], value)
+        found = dict((createKey(self.get_option('url'), kind, field, name), value) for name, value in names.items())
+        for key, term in missing:
+            found.setdefault(key, None)
+        return found
+
+    def handleMirror(self, kind):
+        # The mirrored list of a kind, or None when there is no mirror of this
+        # keyfactor holding it
+        path = self.get_option('mirror_path')
+        if not path or not os.path.exists(path):
+            return None
+        mirror = Mirror(path)
+        try:
+            if mirror.getMeta('url') != self.get_option('url') or not mirror.getMeta('listed.' + kind):
+                return None
+            return mirror.findObjects(kind)
+        finally:
+            mirror.close()
+
+    def handleCacheRead(self, keys):
+        with MEMORY_LOCK:
+            answers = dict((key, MEMORY[key]) for key in keys if key in MEMORY)
+        path = self.get_option('cache_path')
+        if path and len(answers) < len(keys):
+            now = time.time()
+            stored = readJsonFile(path, {})
+            for key in keys:
+                entry = stored.get(key)
+                if key not in answers and entry and now - entry['time'] < self.get_option('cache_ttl'):
+                    answers[key] = entry['value']
+        return answers
+
+    def handleCacheWrite(self, found):
+        # Names that were not found are not cached, they may exist soon
+        found = dict((key, value) for key, value in found.items() if value is not None)
+        with MEMORY_LOCK:
+            MEMORY.update(found)
+        path = self.get_option('cache_path')
+        if not path or not found:
+            return
+        now = time.time()
+        with open(path + '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            stored = readJsonFile(path, {})
+            stored = dict((key, entry) for key, entry in stored.items() if now - entry['time'] < self.get_option('cache_ttl'))
+            stored.update((key, {'time': now, 'value': value}) for key, value in found.items())
+            writeJsonAtomic(path, stored)
+
+def createKey(url, kind, field, term):
+    return '|'.join([url or '', kind, field or '', term])
@@ -0,0 +1,142 @@
+def createCaSpec():
+    # Options of one certificate authority, shared by the
+    # certificate_authorities list of certificate_authority and reconcile
+    return dict(
+        name=dict(type='str', required=True),
+        host_name=dict(type='str', required=True),
+        forest_root=dict(type='str', required=True),
+        state=dict(type='str', required=False, default='present', choices=['absent', 'present']),
+        allowed_enrollment_types=dict(type='int', required=False, default=0, choices=[0,1,2,3]),
+        sync_external_certificates=dict(type='bool', required=False, default=False),
+        rfc_enforcement=dict(type='bool', required=False, default=False),
+        standalone=dict(type='bool', required=False, default=False),
+        orchestrator=dict(type='str', required=False, default=None),
+        key_retention=dict(type='int', required=False, default=0, choices=[0,1,2,3]),
+        key_retention_days=dict(type='int', required=False, default=None),
+        monitor=dict(type='bool', required=False, default=False),
+        issuance_max=dict(type='int', required=False, default=None),
+        issuance_min=dict(type='int', required=False, default=None),
+        denial_max=dict(type='int', required=False, default=None),
+        failure_max=dict(type='int', required=False, default=None),
+        delegate=dict(type='bool', required=False, default=False),
+        use_allowed_requesters=dict(type='bool', required=False, default=False),
+        allowed_requesters=dict(type='list', required=False, default=[]),
+    )
+
+def createPayload(params):
+    # Returns the CA payload for the module parameters, and an error message
+    # when the parameters are inconsistent
+    payload = {
+        "LogicalName": params["name"],
+        "HostName": params["host_name"],
+        "ForestRoot": params["forest_root"],
+        "AllowedEnrollmentTypes": params["allowed_enrollment_types"],
+        "RFCEnforcement": params["rfc_enforcement"],
+        "Standalone": params["standalone"],
+        "Properties": "{\"syncExternal\":false}",
+        "Remote": False,
+        "Agent": params["orchestrator"],
+        "KeyRetention": params["key_retention"],
+        "KeyRetentionDays": params["key_retention_days"],
+        "MonitorThresholds": params["monitor"],
+        "IssuanceMax": params["issuance_max"],
+        "IssuanceMin": params["issuance_min"],
+        "DenialMax": params["denial_max"],
+        "FailureMax": params["failure_max"],
+        "UseAllowedRequesters": params["use_allowed_requesters"],
+        "AllowedRequesters": params["allowed_requesters"],
+        "Delegate": params["delegate"]
+    }
+    if params.get("sync_external_certificates"):
+        payload["Properties"] = "{\"syncExternal\":true}"
+    if params.get("orchestrator"):
+        payload["Remote"] = True
+    if params.get("key_retention") in (0, 1):
+        payload["KeyRetentionDays"] = None
+    if params.get("monitor") != False:
+        if not all([
+            params.get("issuance_max"),
+            params.get("issuance_min"),
+            params.get("denial_max"),
+            params.get("failure_max"),
+            ]):
+            return payload, "Please provide proper values for issuance_max, issuance_min, denial_max, failure_max."
+        elif params.get("issuance_min") > params.get("issuance_max"):
+            return payload, "Issuance Less Than: \"Greater Than\" threshold cannot be smaller than \"Less Than\" threshold"
+    else:
+        payload["IssuanceMax"] = None
+        payload["IssuanceMin"] = None
+        payload["DenialMax"] = None
+        payload["FailureMax"] = None
+    if not params.get("use_allowed_requesters"):
+        payload["AllowedRequesters"] = []
+    return payload, None
+
+def createState(current):
+    return {
+            "LogicalName": current.get("LogicalName"),
+            "HostName": current.get("HostName"),
+            "ForestRoot": current.get("ForestRoot"),
+            "AllowedEnrollmentTypes": current.get("AllowedEnrollmentTypes"),
+            "RFCEnforcement": current.get("RFCEnforcement"),
+            "Standalone": current.get("Standalone"),
+            "Properties": current.get("Properties"),
+            "Remote": current.get("Remote"),
+            "Agent": current.get("Agent"),
+            "KeyRetention": current.get("KeyRetention"),
+            "KeyRetentionDays": current.get("KeyRetentionDays"),
+            "MonitorThresholds": current.get("MonitorThresholds"),
+            "IssuanceMax": current.get("IssuanceMax"),
+            "IssuanceMin": current.get("IssuanceMin"),
+            "DenialMax": current.get("DenialMax"),
+            "FailureMax": current.get("FailureMax"),
+            "Delegate": current.get("Delegate"),
+            'UseAllowedRequesters': current.get("UseAllowedRequesters"),
+            "AllowedRequesters": current.get("AllowedRequesters"),
+           }
+
+def compareState(current, requested):
+    # True when the current CA already matches the requested payload
+    current = createState(current)
+    for k,v in current.items():
+        if v != requested.get(k):
+            return False
+    return True
+
+def createKey(ca):
+    return (ca.get('HostName'), ca.get('LogicalName'), ca.get('ForestRoot'))
+
+def createName(key):
+    return key[0] + '\\' + key[1]
+
+def handleList(module, src):
+    return module.handleJsonRequest("GET", src + '/CertificateAuthority/') or []
+
+def createChanges(current, requested):
+    # requested is a list of (state, payload) tuples. The current CAs are
+    # indexed once by HostName, LogicalName and ForestRoot.
+    currentByKey = {createKey(ca): ca for ca in current}
+    changes = []
+    for state, payload in requested:
+        key = createKey(payload)
+        existing = currentByKey.get(key)
+        if state == 'absent':
+            if existing:
+                changes.append({'name': createName(key), 'action': 'delete', 'id': existing['Id']})
+            else:
+                changes.append({'name': createName(key), 'action': 'unchanged'})
+        elif not existing:
+            changes.append({'name': createName(key), 'action': 'create', 'payload': payload})
+        elif not compareState(existing, payload):
+            changes.append({'name': createName(key), 'action': 'update', 'payload': dict(payload, Id=existing['Id']), 'id': existing['Id']})
+        else:
+            changes.append({'name': createName(key), 'action': 'unchanged'})
+    return changes
+
+def applyChange(module, src, change):
+    if change['action'] == 'create':
+        return module.handleJsonRequest("POST", src + '/CertificateAuthority/', change['payload'])
+    if change['action'] == 'update':
+        return module.handleJsonRequest("PUT", src + '/CertificateAuthority/', change['payload'])
+    if change['action'] == 'delete':
+        return module.handleJsonRequest("DELETE", src + '/CertificateAuthority/' + str(change['id']))
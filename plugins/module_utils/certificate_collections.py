@@ -0,0 +1,45 @@
+def handleList(module, src):
+    return module.handleJsonRequest("GET", src + '/CertificateCollections/') or []
+
+def createPayload(params):
+    return {
+        "Name": params['name'],
+        "Description": params['description'],
+        "Automated": False,
+        "Query": params['query'],
+        "DuplicationField": params['duplication_field'],
+        "ShowOnDashboard": params['show_on_dashboard'],
+        "Favorite": params['favorite'],
+        "CopyFromId": None
+        }
+
+def compareState(current, payload):
+    # True when the current collection differs from the payload. The API
+    # returns the query as Content.
+    requested = dict(payload, Content=payload['Query'])
+    for key, value in current.items():
+        if key in ('Id', 'Automated') or key not in requested:
+            continue
+        if value != requested[key]:
+            return True
+    return False
+
+def createChanges(current, collections):
+    # Command cannot update or delete a collection through the API, so a
+    # collection that differs is reported with an error instead of written
+    currentByName = dict((collection['Name'], collection) for collection in current)
+    changes = []
+    for params in collections:
+        payload = createPayload(params)
+        existing = currentByName.get(params['name'])
+        if not existing:
+            changes.append({'name': params['name'], 'action': 'create', 'payload': payload})
+        elif compareState(existing, payload):
+            changes.append({'name': params['name'], 'action': 'update', 'id': existing['Id'],
+                'error': 'Updating certificate collections is not supported by the API.'})
+        else:
+            changes.append({'name': params['name'], 'action': 'unchanged', 'id': existing['Id']})
+    return changes
+
+def applyChange(module, src, change):
+    return module.handleJsonRequest("POST", src + '/CertificateCollections/', change['payload'])
@@ -0,0 +1,216 @@
+import json
+
+# Keys of a store compared with the requested state. Anything else, such as
+# the inventory schedule or the password, is left as Command has it.
+COMPARED_KEYS = ('ContainerId', 'AgentId', 'CreateIfMissing')
+
+# Results of orchestrator jobs in the job history
+JOB_RESULTS = {0: 'unknown', 1: 'succeeded', 2: 'warning', 3: 'failed'}
+
+def createStoreSpec():
+    # Options of one certificate store in the stores list of certificate_store
+    return dict(
+        client_machine=dict(type='str', required=True),
+        store_path=dict(type='str', required=True),
+        store_type=dict(type='str', required=True),
+        state=dict(type='str', required=False, default='present', choices=['absent', 'present']),
+        agent=dict(type='str', required=False),
+        container_id=dict(type='int', required=False),
+        create_if_missing=dict(type='bool', required=False, default=False),
+        properties=dict(type='dict', required=False, default={})
+    )
+
+def createScheduleSpec():
+    return dict(
+        immediate=dict(type='bool', required=False, default=False),
+        interval=dict(type='int', required=False),
+        daily=dict(type='str', required=False),
+        off=dict(type='bool', required=False, default=False)
+    )
+
+def createSchedule(params):
+    # Command schedule object for a schedule option; off clears the schedule
+    if params['off']:
+        return {}
+    if params['immediate']:
+        return {"Immediate": True}
+    if params['interval']:
+        return {"Interval": {"Minutes": params['interval']}}
+    if params['daily']:
+        return {"Daily": {"Time": params['daily']}}
+    return None
+
+def createName(client_machine, store_path, store_type):
+    return client_machine + ':' + store_path + ' (' + str(store_type) + ')'
+
+def createKey(client_machine, store_path, store_type_id):
+    # Command treats machine names case insensitively
+    return (client_machine.lower(), store_path, int(store_type_id))
+
+def handleList(module, src, store_type_ids, page_size=500):
+    # Every store of the given store types, paged
+    query = ' OR '.join('CertStoreType -eq ' + str(int(i)) for i in sorted(set(store_type_ids)))
+    return module.handlePaged(src + '/CertificateStores', {'pq.queryString': query}, page_size)
+
+def handleListAgents(module, src, page_size=500):
+    return module.handlePaged(src + '/Agents', None, page_size)
+
+def parseProperties(value):
+    # Properties are a JSON string. Newer Command versions wrap each value
+    # as {"value": ...}.
+    if isinstance(value, str):
+        value = json.loads(value) if value else {}
+    return dict((k, v['value'] if isinstance(v, dict) and 'value' in v else v) for k, v in (value or {}).items())
+
+def createPayload(params, store_type_id, agent_id):
+    payload = {
+        "ClientMachine": params['client_machine'],
+        "StorePath": params['store_path'],
+        "CertStoreType": store_type_id,
+        "AgentId": agent_id,
+        "AgentAssigned": agent_id is not None,
+        "CreateIfMissing": params['create_if_missing'],
+        "Properties": json.dumps(params['properties'] or {})
+    }
+    if params.get('container_id') is not None:
+        payload["ContainerId"] = params['container_id']
+    return payload
+
+def mergeProperties(current, requested):
+    # Properties of an update: those of the store as Command returns them,
+    # secrets included, with the requested ones set on top. Values are
+    # wrapped as {"value": ...} when the store holds them that way.
+    if isinstance(current, str):
+        current = json.loads(current) if current else {}
+    merged = dict(current or {})
+    wrapped = any(isinstance(v, dict) and 'value' in v for v in merged.values())
+    for key, value in (requested or {}).items():
+        merged[key] = {'value': value} if wrapped else value
+    return json.dumps(merged)
+
+def compareState(current, requested):
+    # True when the current store differs from the requested one. Only the
+    # properties that are requested are compared.
+    for key in COMPARED_KEYS:
+        if key in requested and current.get(key) != requested[key]:
+            return True
+    currentProperties = parseProperties(current.get('Properties'))
+    for key, value in parseProperties(requested.get('Properties')).items():
+        if currentProperties.get(key) != value:
+            return True
+    return False
+
+def findDuplicates(stores, storeTypeIds):
+    # Names of the stores listed more than once, by client machine, store
+    # path and store type
+    seen = set()
+    duplicates = []
+    for params in stores:
+        storeType = storeTypeIds.get(params['store_type'], params['store_type'])
+        key = (params['client_machine'].lower(), params['store_path'], str(storeType))
+        if key in seen:
+            duplicates.append(createName(params['client_machine'], params['store_path'], params['store_type']))
+        seen.add(key)
+    return duplicates
+
+def createChanges(current, stores, storeTypeIds, agentIds):
+    # stores are the requested entries, storeTypeIds maps store type names
+    # to ids and agentIds maps orchestrator machine names (lower case) to
+    # agent ids. Unknown names are planned with an error, unless the store
+    # is absent anyway.
+    currentByKey = dict((createKey(store['ClientMachine'], store['StorePath'], store['CertStoreType']), store) for store in current)
+    changes = []
+    for params in stores:
+        storeTypeId = storeTypeIds.get(params['store_type'])
+        name = createName(params['client_machine'], params['store_path'], params['store_type'])
+        if storeTypeId is None:
+            if params['state'] == 'absent':
+                changes.append({'name': name, 'action': 'unchanged'})
+            else:
+                changes.append({'name': name, 'action': 'create', 'error': 'Store type ' + params['store_type'] + ' does not exist.'})
+            continue
+        existing = currentByKey.get(createKey(params['client_machine'], params['store_path'], storeTypeId))
+        if params['state'] == 'absent':
+            if existing:
+                changes.append({'name': name, 'action': 'delete', 'id': existing['Id']})
+            else:
+                changes.append({'name': name, 'action': 'unchanged'})
+            continue
+        agent = (params.get('agent') or params['client_machine']).lower()
+        if agent not in agentIds:
+            changes.append({'name': name, 'action': 'update' if existing else 'create', 'id': existing and existing['Id'],
+                'error': 'Orchestrator ' + agent + ' is not registered.'})
+            continue
+        requested = createPayload(params, storeTypeId, agentIds[agent])
+        if not existing:
+            changes.append({'name': name, 'action': 'create', 'payload': requested})
+        elif compareState(existing, requested):
+            requested['Id'] = existing['Id']
+            requested['Properties'] = mergeProperties(existing.get('Properties'), params['properties'])
+            changes.append({'name': name, 'action': 'update', 'payload': requested, 'id': existing['Id']})
+        else:
+            changes.append({'name': name, 'action': 'unchanged', 'id': existing['Id'], 'current': existing})
+    return changes
+
+def applyChange(module, src, change):
+    if change['action'] == 'create':
+        created = module.handleJsonRequest("POST", src + '/CertificateStores', change['payload'])
+        change['id'] = (created or {}).get('Id')
+        return created
+    if change['action'] == 'update':
+        return module.handleJsonRequest("PUT", src + '/CertificateStores', change['payload'])
+    if change['action'] == 'delete':
+        return module.handleJsonRequest("DELETE", src + '/CertificateStores/' + str(change['id']))
+
+def handleSchedule(module, src, store_ids, schedule):
+    # One request schedules the inventory of every store
+    return module.handleJsonRequest("PUT", src + '/CertificateStores/Schedule', {"StoreIds": store_ids, "Schedule": schedule})
+
+def handleReenrollment(module, src, store, params):
+    return module.handleJsonRequest("POST", src + '/CertificateStores/Reenrollment', {
+        "KeystoreId": store['id'],
+        "AgentGuid": store['agent_id'],
+        "SubjectName": params['subject_name'],
+        "Alias": params['alias'],
+        "JobProperties": params['job_properties'] or {}
+    })
+
+def handleSelect(module, src, store_ids=None, store_type_id=None, container_id=None, page_size=500):
+    # Stores matching every given selector, paged. Ids are looked up with one
+    # OR query per chunk of ids.
+    conditions = []
+    if store_type_id is not None:
+        conditions.append('CertStoreType -eq ' + str(int(store_type_id)))
+    if container_id is not None:
+        conditions.append('ContainerId -eq ' + str(int(container_id)))
+    chunks = [store_ids[i:i + 50] for i in range(0, len(store_ids), 50)] if store_ids else [None]
+    for chunk in chunks:
+        parts = list(conditions)
+        if chunk:
+            parts.append(' OR '.join('Id -eq "' + str(id) + '"' for id in chunk))
+        query = ' AND '.join('(' + part + ')' for part in parts)
+        for store in module.handlePaged(src + '/CertificateStores', {'pq.queryString': query}, page_size):
+            yield store
+
+def handleAddCertificate(module, src, certificate_id, stores, alias=None, overwrite=False):
+    # Schedules one management job per store to add the certificate, in a
+    # single request. Returns the job ids Command answers with.
+    return module.handleJsonRequest("POST", src + '/CertificateStores/Certificates/Add', {
+        "CertificateId": certificate_id,
+        "CertificateStores": [{
+            "CertificateStoreId": store['Id'],
+            "Alias": alias,
+            "Overwrite": overwrite
+        } for store in stores],
+        "Schedule": {"Immediate": True}
+    })
+
+def handleJobHistory(module, src, job_ids, page_size=500):
+    # {job id: history entry} of the given jobs that have finished, with one
+    # OR query per chunk of ids
+    history = {}
+    for i in range(0, len(job_ids), 50):
+        query = ' OR '.join('JobID -eq "' + str(id) + '"' for id in job_ids[i:i + 50])
+        for entry in module.handlePaged(src + '/OrchestratorJobs/JobHistory', {'pq.queryString': query}, page_size):
+            history[str(entry.get('JobID'))] = entry
+    return history
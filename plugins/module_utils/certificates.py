@@ -0,0 +1,102 @@
+from ansible.module_utils.six.moves.urllib.parse import urlencode
+
+import re
+
+from datetime import datetime, timezone
+
+def escapeQueryValue(value):
+    # Command queries quote values with double quotes
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+def createQueryString(conditions):
+    # conditions is a list of (field, operator, value) tuples joined with AND
+    return ' AND '.join(field + ' ' + operator + ' "' + escapeQueryValue(value) + '"' for field, operator, value in conditions)
+
+def parseDate(value):
+    # Command returns ISO 8601 timestamps with or without fractional seconds
+    # and with a trailing Z, an offset such as +00:00 or neither. Naive values
+    # are treated as UTC.
+    if not value:
+        return None
+    match = re.match(r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(?:\.\d+)?(Z|[+-]\d{2}:?\d{2})?$', value.strip())
+    if not match:
+        raise ValueError('Invalid timestamp ' + value + '.')
+    date = datetime.strptime(match.group(1), '%Y-%m-%dT%H:%M:%S')
+    offset = match.group(2)
+    if not offset or offset == 'Z':
+        return date.replace(tzinfo=timezone.utc)
+    return datetime.strptime(match.group(1) + offset.replace(':', ''), '%Y-%m-%dT%H:%M:%S%z').astimezone(timezone.utc)
+
+def normalizeDn(dn):
+    return ','.join(part.strip() for part in (dn or '').split(',')).lower()
+
+def handleCertificateSearch(request, src, query='', page_size=100, include_metadata=False, include_locations=False, limit=None):
+    # Generator over the certificates matching a Command query. request is a
+    # callable(method, endpoint) returning the parsed JSON response, such as
+    # AnsibleKeyfactorModule.handleJsonRequest. Pages are fetched lazily so
+    # only one page is held in memory at a time.
+    page = 1
+    returned = 0
+    while True:
+        page_limit = page_size if limit is None else min(page_size, limit - returned)
+        if page_limit <= 0:
+            return
+        params = {
+            'pq.queryString': query,
+            'pq.pageReturned': page,
+            'pq.returnLimit': page_size,
+            'pq.includeMetadata': str(bool(include_metadata)).lower(),
+            'pq.includeLocations': str(bool(include_locations)).lower()
+        }
+        certificates = request('GET', src + '/Certificates?' + urlencode(params)) or []
+        for certificate in certificates[:page_limit]:
+            yield certificate
+        returned += min(len(certificates), page_limit)
+        if len(certificates) < page_size:
+            return
+        page += 1
+
+def projectCertificate(certificate, fields=None):
+    # Keeps only the requested top level fields, or the whole certificate
+    if not fields:
+        return certificate
+    return dict((field, certificate.get(field)) for field in fields)
+
+def handleCertificatePages(request, src, query='', page_size=1000, after_id=None, include_metadata=False, include_locations=False):
+    # Generator over pages of certificates in ascending Id order. Each page
+    # is requested as the first page of the certificates with an Id above the
+    # last one seen, so the cursor stays valid while certificates are added
+    # and an interrupted run can resume from the last Id.
+    while True:
+        conditions = [query] if query else []
+        if after_id is not None:
+            conditions.append('Id -gt ' + str(int(after_id)))
+        params = {
+            'pq.queryString': ' AND '.join('(' + condition + ')' for condition in conditions),
+            'pq.pageReturned': 1,
+            'pq.returnLimit': page_size,
+            'pq.sortField': 'Id',
+            'pq.sortAscending': 0,
+            'pq.includeMetadata': str(bool(include_metadata)).lower(),
+            'pq.includeLocations': str(bool(include_locations)).lower()
+        }
+        certificates = request('GET', src + '/Certificates?' + urlencode(params)) or []
+        if not certificates:
+            return
+        yield certificates
+        after_id = certificates[-1]['Id']
+        if len(certificates) < page_size:
+            return
+
+def createChunks(items, size):
+    items = list(items)
+    return [items[i:i + size] for i in range(0, len(items), max(1, size))]
+
+def handleCertificatesByField(request, src, field, values, chunk_size=50, include_metadata=False):
+    # Generator over the certificates whose field (Id, Thumbprint, ...) is one
+    # of values. Values are looked up chunk_size at a time with one OR query
+    # per chunk instead of one search per value.
+    for chunk in createChunks(values, chunk_size):
+        query = ' OR '.join(field + ' -eq "' + escapeQueryValue(value) + '"' for value in chunk)
+        for certificate in handleCertificateSearch(request, src, query, page_size=max(len(chunk), 100), include_metadata=include_metadata):
+            yield certificate
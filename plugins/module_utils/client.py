@@ -0,0 +1,61 @@
+from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
+from ansible.module_utils.six.moves.urllib.parse import urlencode
+from ansible.module_utils.urls import open_url
+
+import json
+
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import KeyfactorApiError
+
+class KeyfactorClient(object):
+    # Request helper for controller side plugins (inventory, lookup), which
+    # have no AnsibleModule to hand to fetch_url. handleJsonRequest has the
+    # signature and error behaviour of AnsibleKeyfactorModule.handleJsonRequest
+    # so the same module_utils helpers work with both.
+    def __init__(self, url, username=None, password=None, validate_certs=True, timeout=30, headers=None):
+        self.url = url
+        self.username = username
+        self.password = password
+        self.validate_certs = validate_certs
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self.headers['Content-Type'] = 'application/json'
+        self.headers['X-Keyfactor-Requested-With'] = 'APIClient'
+
+    def handleJsonRequest(self, method, endpoint, payload=None):
+        try:
+            resp = open_url(self.url + endpoint, method=method,
+                data=None if payload is None else json.dumps(payload),
+                headers=self.headers,
+                url_username=self.username,
+                url_password=self.password,
+                force_basic_auth=True,
+                validate_certs=self.validate_certs,
+                timeout=self.timeout)
+        except HTTPError as e:
+            if e.code in ( 401, 403 ):
+                raise KeyfactorApiError('Authentication failed.', e.code)
+            try:
+                contentSet = json.loads(e.read())
+                raise KeyfactorApiError(contentSet.get('Message', str(e)), e.code, contentSet.get('ErrorCode'))
+            except (TypeError, ValueError, AttributeError):
+                raise KeyfactorApiError(str(e), e.code)
+        except URLError as e:
+            raise KeyfactorApiError('Request failed: ' + str(e.reason))
+        content = resp.read()
+        if not content:
+            return None
+        return json.loads(content)
+
+    def handlePaged(self, endpoint, params=None, page_size=500):
+        # Generator over every item of a paged Keyfactor API list
+        page = 1
+        while True:
+            query = dict(params or {})
+            query['pq.pageReturned'] = page
+            query['pq.returnLimit'] = page_size
+            items = self.handleJsonRequest('GET', endpoint + '?' + urlencode(query)) or []
+            for item in items:
+                yield item
+            if len(items) < page_size:
+                return
+            page += 1
@@ -0,0 +1,32 @@
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import KeyfactorApiError
+
+def handleListCollections(module, src):
+    return module.handleJsonRequest("GET", src + '/CertificateCollections/') or []
+
+def handleGetPermissions(module, src, collection_id):
+    # Current [{"RoleId", "Permissions"}] of a collection, or None when the
+    # Command version does not expose them and every change must be written
+    try:
+        return module.handleJsonRequest("GET", src + '/CertificateCollections/' + str(collection_id) + '/Permissions') or []
+    except KeyfactorApiError as e:
+        if e.status in (404, 405):
+            return None
+        raise
+
+def comparePermissions(current, requested):
+    # True when the two permission lists differ, ignoring order and case
+    return set(p.lower() for p in current or []) != set(p.lower() for p in requested or [])
+
+def createChange(name, collection_id, current, requested):
+    # requested maps a role id to its permission list. All roles that differ
+    # are sent in a single POST for the collection.
+    currentByRole = {} if current is None else {entry['RoleId']: entry.get('Permissions') for entry in current}
+    payload = [{"RoleId": role_id, "Permissions": permissions}
+        for role_id, permissions in sorted(requested.items(), key=lambda item: str(item[0]))
+        if current is None or comparePermissions(currentByRole.get(role_id), permissions)]
+    if not payload:
+        return {'name': name, 'action': 'unchanged', 'id': collection_id}
+    return {'name': name, 'action': 'update', 'id': collection_id, 'payload': payload}
+
+def applyChange(module, src, change):
+    return module.handleJsonRequest("POST", src + '/CertificateCollections/' + str(change['id']) + '/Permissions', change['payload'])
@@ -1,15 +1,137 @@
 from ansible.module_utils.basic import AnsibleModule
 
 from ansible.module_utils.urls import fetch_url, url_argument_spec
+from ansible.module_utils.six.moves.urllib.parse import urlencode
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import hashlib
 import os
 import json
+import tempfile
+import threading
+import time
+
+class KeyfactorApiError(Exception):
+    def __init__(self, message, status=None, error_code=None):
+        Exception.__init__(self, message)
+        self.message = message
+        self.status = status
+        self.error_code = error_code
+
+class RateLimiter(object):
+    # Spaces calls evenly so that no more than `rate` requests per second are
+    # started across all worker threads. A rate of 0 or None disables the cap.
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class InstanceExit(BaseException):
+    # Raised by exit_json and fail_json while a task runs for one of several
+    # instances. It derives from BaseException so that module code catching
+    # Exception around a fail_json call does not swallow it.
+    def __init__(self, result):
+        BaseException.__init__(self)
+        self.result = result
+
+class InstanceParams(dict):
+    # Module parameters as seen by the current thread. While a thread works
+    # for one instance of handleInstances, that instance's connection
+    # parameters take precedence, including for fetch_url.
+    def __init__(self, params, local):
+        dict.__init__(self, params)
+        self.__local__ = local
+
+    def __overrides__(self):
+        return getattr(self.__local__, 'overrides', None) or {}
+
+    def __getitem__(self, key):
+        overrides = self.__overrides__()
+        if key in overrides:
+            return overrides[key]
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        overrides = self.__overrides__()
+        if key in overrides:
+            return overrides[key]
+        return dict.get(self, key, default)
 
 class AnsibleKeyfactorModule(AnsibleModule):
     def __init__(self, *args, **kwargs):
-        __updateSpec__(kwargs.get('argument_spec'))
+        supports_instances = kwargs.pop('supports_instances', False)
+        __updateSpec__(kwargs.get('argument_spec'), supports_instances)
         AnsibleModule.__init__(self, *args, **kwargs)
         self.__env_fallback__()
+        self.__local__ = threading.local()
+        self.params = InstanceParams(self.params, self.__local__)
+
+    def __instance__(self):
+        # Connection overrides of the instance the current thread works for.
+        # Argument validation may fail before __local__ exists.
+        local = getattr(self, '__local__', None)
+        return getattr(local, 'overrides', None)
+
+    def exit_json(self, **kwargs):
+        if self.__instance__():
+            raise InstanceExit(kwargs)
+        AnsibleModule.exit_json(self, **kwargs)
+
+    def fail_json(self, msg, **kwargs):
+        # fetch_url fails the module on connection errors. Within __fetch__,
+        # which may run on a worker thread, that becomes a KeyfactorApiError
+        # so only the calling thread ever exits the module.
+        if getattr(getattr(self, '__local__', None), 'fetching', False):
+            raise KeyfactorApiError(msg)
+        if self.__instance__():
+            raise InstanceExit(dict(kwargs, msg=msg, failed=True))
+        AnsibleModule.fail_json(self, msg=msg, **kwargs)
+
+    def handleInstances(self, run):
+        # Runs run() once, or once per entry of the instances option, all
+        # instances concurrently. run() ends with exit_json or fail_json as a
+        # single instance task would; with instances, every outcome is kept
+        # under its instance name and one failure leaves the others running.
+        instances = self.params.get('instances')
+        if not instances:
+            return run()
+
+        def worker(instance):
+            self.__local__.overrides = dict((k, v) for k, v in instance.items() if k != 'name' and v is not None)
+            try:
+                run()
+                return {}
+            except InstanceExit as e:
+                return e.result
+            except KeyfactorApiError as e:
+                return {'failed': True, 'msg': e.message}
+            except Exception as e:
+                return {'failed': True, 'msg': str(e)}
+            finally:
+                self.__local__.overrides = None
+
+        names = [instance['name'] for instance in instances]
+        with ThreadPoolExecutor(max_workers=len(instances)) as executor:
+            results = dict(zip(names, executor.map(worker, instances)))
+        result = {
+            'changed': any(r.get('changed') for r in results.values()),
+            'instances': results
+        }
+        failed = [name for name in names if results[name].get('failed')]
+        if failed:
+            self.fail_json(msg=str(len(failed)) + ' of ' + str(len(names)) + ' instances failed: ' + ', '.join(failed), **result)
+        self.exit_json(**result)
 
     def __env_fallback__(self):
         if (self.params['url_password'] == None):
@@ -30,7 +152,7 @@ class AnsibleKeyfactorModule(AnsibleModule):
     def handleRequest(self, method, endpoint, payload={}):
         socket_timeout = self.params['timeout']
         # allow additional headers to be passed in
-        dict_headers = self.params['headers']
+        dict_headers = dict(self.params['headers'])
         dict_headers['Content-Type'] = 'application/json'
         dict_headers['X-Keyfactor-Requested-With'] = 'APIClient'
         url = self.params['url'] + endpoint
@@ -47,8 +169,153 @@ class AnsibleKeyfactorModule(AnsibleModule):
         if status in ( 401, 403 ):
             return self.fail_json(msg='Authentication failed.')
         return resp, info
-    
-def __updateSpec__(argument_spec):
+
+    def __fetch__(self, method, endpoint, payload={}, headers=None):
+        socket_timeout = self.params['timeout']
+        dict_headers = dict(self.params['headers'])
+        dict_headers.update(headers or {})
+        dict_headers['Content-Type'] = 'application/json'
+        dict_headers['X-Keyfactor-Requested-With'] = 'APIClient'
+        url = self.params['url'] + endpoint
+        self.__local__.fetching = True
+        try:
+            resp, info = fetch_url(self, url, data=json.dumps(payload),
+                headers=dict_headers,
+                method=method,
+                timeout=socket_timeout,
+                ca_path=self.params.get('ca_path', None))
+        except ValueError as e:
+            raise KeyfactorApiError('Invalid request to ' + url + ': ' + str(e))
+        finally:
+            self.__local__.fetching = False
+        status = info['status']
+        if status in ( 401, 403 ):
+            raise KeyfactorApiError('Authentication failed.', status)
+        if status == 304:
+            return None, info
+        if resp is None or status >= 400:
+            content = info.get('body', '')
+            try:
+                contentSet = json.loads(content)
+                raise KeyfactorApiError(contentSet.get('Message', info.get('msg')), status, contentSet.get('ErrorCode'))
+            except (TypeError, ValueError, AttributeError):
+                raise KeyfactorApiError(info.get('msg', 'Request failed.'), status)
+        return resp.read(), info
+
+    def handleJsonRequest(self, method, endpoint, payload={}):
+        # Thread safe variant of handleRequest: failures are raised as
+        # KeyfactorApiError instead of exiting the module, so it can be used
+        # from handleConcurrent workers.
+        content, info = self.__fetch__(method, endpoint, payload)
+        if not content:
+            return None
+        return json.loads(content)
+
+    def handlePaged(self, endpoint, params=None, page_size=500):
+        # Generator over every item of a paged Keyfactor API list, as
+        # KeyfactorClient.handlePaged
+        page = 1
+        while True:
+            query = dict(params or {})
+            query['pq.pageReturned'] = page
+            query['pq.returnLimit'] = page_size
+            items = self.handleJsonRequest("GET", endpoint + '?' + urlencode(query)) or []
+            for item in items:
+                yield item
+            if len(items) < page_size:
+                return
+            page += 1
+
+    def handleConditionalRequest(self, endpoint, etag=None):
+        # GET sent with If-None-Match when an ETag is known. Returns
+        # (content, etag, modified); content is None when not modified.
+        content, info = self.__fetch__("GET", endpoint, headers={'If-None-Match': etag} if etag else None)
+        if info['status'] == 304:
+            return None, etag, False
+        return (json.loads(content) if content else None), info.get('etag'), True
+
+    def handleConcurrent(self, func, items, concurrency=1, rate_limit=None, on_complete=None):
+        # Runs func(item) for every item on a bounded thread pool and returns
+        # (value, error) pairs in input order. Exceptions raised by func are
+        # captured per item so one failure does not abort the batch. When
+        # given, on_complete(item, value, error) is called from the calling
+        # thread as each item finishes.
+        limiter = RateLimiter(rate_limit)
+        # Workers act for the same instance as the calling thread
+        overrides = self.__instance__()
+
+        def worker(item):
+            self.__local__.overrides = overrides
+            limiter.wait()
+            try:
+                return func(item), None
+            except KeyfactorApiError as e:
+                return None, e.message
+            except Exception as e:
+                return None, str(e)
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            if on_complete is None:
+                return list(executor.map(worker, items))
+            futures = dict((executor.submit(worker, item), item) for item in items)
+            for future in as_completed(futures):
+                value, error = future.result()
+                on_complete(futures[future], value, error)
+            return [future.result() for future in futures]
+
+    def handleChanges(self, changes, apply, concurrency=1):
+        # Applies every planned change whose action is not 'unchanged' with
+        # apply(change) and records failures on the change. Changes planned
+        # with an error are not sent, and nothing is sent in check mode.
+        pending = [change for change in changes if change['action'] != 'unchanged' and not change.get('error')]
+        if self.check_mode:
+            return changes
+        for change, (value, error) in zip(pending, self.handleConcurrent(apply, pending, concurrency)):
+            change['error'] = error
+        return changes
+
+def createChangeReport(changes):
+    # Strips payloads from a list of planned changes, leaving what a user
+    # needs to read the outcome of a bulk run
+    return [{
+        'name': change['name'],
+        'action': change['action'],
+        'changed': change['action'] != 'unchanged' and not change.get('error'),
+        'error': change.get('error')
+    } for change in changes]
+
+def readJsonFile(path, default=None):
+    if not path or not os.path.exists(path):
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+def writeFileAtomic(path, chunks, mode=0o600):
+    # Write to a temporary file in the destination directory and rename it over
+    # the target so readers never observe a partially written file. Returns the
+    # sha256 digest of the content.
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.')
+    digest = hashlib.sha256()
+    try:
+        os.chmod(tmp_path, mode)
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                digest.update(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return digest.hexdigest()
+
+def writeJsonAtomic(path, data, mode=0o600):
+    return writeFileAtomic(path, [json.dumps(data, sort_keys=True).encode('utf-8')], mode)
+
+def __updateSpec__(argument_spec, supports_instances=False):
     argument_spec.update(url_argument_spec())
     argument_spec.update(
         name=dict(type='str'),
@@ -60,4 +327,15 @@ def __updateSpec__(argument_spec):
         headers=dict(type='dict', default={}),
         force_basic_auth=dict(type='bool', required=False, default=True)
     )
-
+    if supports_instances:
+        argument_spec.update(
+            instances=dict(type='list', elements='dict', required=False, options=dict(
+                name=dict(type='str', required=True),
+                url=dict(type='str', required=True),
+                url_username=dict(type='str', aliases=['user'], required=False),
+                url_password=dict(type='str', aliases=['password'], required=False, no_log=True),
+                validate_certs=dict(type='bool', required=False),
+                ca_path=dict(type='path', required=False),
+                headers=dict(type='dict', required=False)
+            ))
+        )
@@ -0,0 +1,93 @@
+import hashlib
+import json
+
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import KeyfactorApiError
+from ansible_collections.keyfactor.platform.plugins.module_utils.certificate_authorities import createKey as createCaKey, createName as createCaName
+from ansible_collections.keyfactor.platform.plugins.module_utils.store_types import normalize as normalizeStoreType
+
+# Kind: (source parameter, list endpoint)
+ENDPOINTS = {
+    'identities': ('legacy_src', '/Security/1/GetIdentities'),
+    'roles': ('legacy_src', '/Security/1/GetRoles'),
+    'collections': ('src', '/CertificateCollections/'),
+    'metadata_fields': ('src', '/MetadataFields/'),
+    'store_types': ('src', '/CertificateStoreTypes/'),
+    'certificate_authorities': ('src', '/CertificateAuthority/'),
+}
+
+def createObjectName(kind, current):
+    if kind == 'identities':
+        return current['AccountName'].lower()
+    if kind == 'certificate_authorities':
+        return createCaName(createCaKey(current))
+    return current['Name']
+
+def createDigest(kind, current):
+    if kind == 'store_types':
+        current = normalizeStoreType(current)
+    return hashlib.sha256(json.dumps(current, sort_keys=True).encode('utf-8')).hexdigest()
+
+def createObjectDigests(kind, content):
+    return dict((createObjectName(kind, current), createDigest(kind, current)) for current in content or [])
+
+def createListDigest(objects):
+    # Digest of the per object digests, so that two lists match whatever
+    # order the API returned them in
+    return hashlib.sha256(json.dumps(objects, sort_keys=True).encode('utf-8')).hexdigest()
+
+def compareObjects(baseline, objects):
+    return {
+        'added': sorted(name for name in objects if name not in baseline),
+        'removed': sorted(name for name in baseline if name not in objects),
+        'changed': sorted(name for name in objects if name in baseline and baseline[name] != objects[name])
+    }
+
+def handleProbe(module, src, kind, baseline):
+    # Probes one kind against its baseline {etag, digest, objects}. The list
+    # is only parsed when the server does not answer 304, and only compared
+    # object by object when its digest moved. Returns (probe, drift, state)
+    # where state is the new baseline.
+    content, etag, modified = module.handleConditionalRequest(src + ENDPOINTS[kind][1], baseline.get('etag'))
+    if not modified:
+        return 'not_modified', None, baseline
+    objects = createObjectDigests(kind, content)
+    state = {'etag': etag, 'digest': createListDigest(objects), 'objects': objects,
+        'ids': dict((createObjectName(kind, current), current.get('Id')) for current in content or [])}
+    if 'digest' not in baseline:
+        return 'baseline', None, state
+    if state['digest'] == baseline['digest']:
+        return 'same_digest', None, state
+    return 'diffed', compareObjects(baseline['objects'], objects), state
+
+def handleProbePermissions(module, src, baseline, collections, concurrency):
+    # Collection permissions have one endpoint per collection, each probed
+    # with its own ETag. collections maps collection names to ids.
+    previous = baseline.get('objects', {})
+    etags = baseline.get('etags', {})
+    names = sorted(collections)
+    reads = module.handleConcurrent(
+        lambda name: module.handleConditionalRequest(src + '/CertificateCollections/' + str(collections[name]) + '/Permissions', etags.get(name)),
+        names, concurrency)
+    objects = {}
+    state = {'etags': {}, 'objects': objects}
+    modifiedAny = False
+    for name, (value, error) in zip(names, reads):
+        if error:
+            raise KeyfactorApiError('Unable to read permissions of ' + name + ': ' + error)
+        content, etag, modified = value
+        modifiedAny = modifiedAny or modified
+        if modified:
+            entries = sorted(({'RoleId': entry.get('RoleId'), 'Permissions': sorted(entry.get('Permissions') or [])} for entry in content or []),
+                key=lambda entry: entry['RoleId'])
+            objects[name] = createDigest('collection_permissions', entries)
+        else:
+            objects[name] = previous.get(name)
+        state['etags'][name] = etag
+    state['digest'] = createListDigest(objects)
+    if 'digest' not in baseline:
+        return 'baseline', None, state
+    if not modifiedAny and set(objects) == set(previous):
+        return 'not_modified', None, state
+    if state['digest'] == baseline['digest']:
+        return 'same_digest', None, state
+    return 'diffed', compareObjects(previous, objects), state
@@ -0,0 +1,70 @@
+from ansible.module_utils.urls import url_argument_spec
+
+import fcntl
+import hashlib
+import json
+import time
+
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import KeyfactorApiError, readJsonFile, writeJsonAtomic
+
+# Parameters that do not change what a task asks for
+IGNORED_PARAMS = set(url_argument_spec()) | set([
+    'url', 'url_username', 'url_password', 'headers', 'timeout', 'force_basic_auth',
+    'concurrency', 'instances', 'fingerprint_store', 'fingerprint_ttl', 'force_refresh'])
+
+def createFingerprintSpec():
+    return dict(
+        fingerprint_store=dict(type='path', required=False),
+        fingerprint_ttl=dict(type='int', required=False, default=3600),
+        force_refresh=dict(type='bool', required=False, default=False)
+    )
+
+def createDigest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def createFingerprintKey(module, kind, extra=None):
+    # Hash of the Command URL, the module and what the task requests. extra
+    # carries requested state that does not live in the parameters, such as
+    # the content of definition files.
+    params = dict((k, v) for k, v in module.params.items() if k not in IGNORED_PARAMS)
+    return createDigest([module.params['url'], kind, params, extra])
+
+def readStore(module, path):
+    # A corrupt store fails the task the way a corrupt drift state does
+    try:
+        store = readJsonFile(path, {})
+    except ValueError:
+        store = None
+    if not isinstance(store, dict):
+        module.fail_json(msg='The fingerprint store ' + path + ' is not valid JSON. Delete it to start a new store.')
+    return store
+
+def handleFingerprintLookup(module, kind, extra=None):
+    # Returns the stored entry when the same request was applied successfully
+    # within fingerprint_ttl seconds, in which case the task has nothing to do
+    path = module.params['fingerprint_store']
+    if not path or module.params['force_refresh']:
+        return None
+    entry = readStore(module, path).get(createFingerprintKey(module, kind, extra))
+    if entry and time.time() - entry['applied'] < module.params['fingerprint_ttl']:
+        return entry
+    return None
+
+def handleFingerprintSave(module, kind, handleCurrent, extra=None):
+    # Records a successful apply with the version (digest) of the server
+    # objects it left behind, read with handleCurrent() only when a store is
+    # configured. Check mode runs are not recorded.
+    path = module.params['fingerprint_store']
+    if not path or module.check_mode:
+        return
+    try:
+        version = createDigest(handleCurrent())
+    except KeyfactorApiError as e:
+        module.warn('Apply not recorded in the fingerprint store: ' + e.message)
+        return
+    # Tasks running in parallel share the store
+    with open(path + '.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        store = readStore(module, path)
+        store[createFingerprintKey(module, kind, extra)] = {'applied': time.time(), 'version': version}
+        writeJsonAtomic(path, store)
@@ -0,0 +1,25 @@
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import KeyfactorApiError
+
+def handleList(module, src):
+    return module.handleJsonRequest("GET", src + '/Security/1/GetIdentities') or []
+
+def createChanges(current, identities):
+    # Account names are matched case insensitively, as Command does
+    currentByName = dict((identity['AccountName'].lower(), identity) for identity in current)
+    changes = []
+    for identity in identities:
+        existing = currentByName.get(identity['name'].lower())
+        if identity.get('state', 'present') == 'absent':
+            action = 'delete' if existing else 'unchanged'
+        else:
+            action = 'unchanged' if existing else 'create'
+        changes.append({'name': identity['name'], 'action': action, 'payload': {"Account": identity['name']}})
+    return changes
+
+def applyChange(module, src, change):
+    endpoint = '/Security/1/AddIdentity' if change['action'] == 'create' else '/Security/1/DeleteIdentity'
+    response = module.handleJsonRequest("POST", src + endpoint, change['payload'])
+    # The legacy API reports some failures in the body of a successful response
+    if isinstance(response, dict) and response.get('Valid') == False:
+        raise KeyfactorApiError(response.get('Message', 'Failed.'))
+    return response
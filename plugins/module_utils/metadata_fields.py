@@ -0,0 +1,96 @@
+IGNORED_KEYS = ('Id', 'Enrollment')
+
+def createFieldSpec():
+    # Options of one metadata field, shared by the fields list of
+    # metadata_fields and the reconcile module
+    return dict(
+        name=dict(type='str', required=True),
+        state=dict(type='str', required=False, default='present', choices=['absent', 'present']),
+        description=dict(type='str', required=False),
+        data_type=dict(type='int', required=False, choices=[1,2,3,4,5,6,7,8]),
+        hint=dict(type='str', required=False),
+        validation=dict(type='str', required=False),
+        enrollment=dict(type='int', required=False, choices=[0,1,2]),
+        options=dict(type='str', required=False),
+        default_value=dict(type='str', required=False),
+        explicit_update=dict(type='bool', required=False, default=False),
+        allow_api=dict(type='bool', required=False),
+        display_order=dict(type='int', required=False)
+    )
+
+def validateFields(module, fields):
+    # data_type is only needed to create or update a field, so absent entries
+    # may leave it out
+    missing = [field['name'] for field in fields if field['state'] == 'present' and field['data_type'] is None]
+    if missing:
+        module.fail_json(msg='data_type is required for present metadata fields: ' + ', '.join(missing) + '.')
+
+def createRequestedState(params):
+    # Options left unset are not part of the requested state, so they are
+    # neither compared nor sent and keep the value Command has
+    state = {
+        "Name": params['name'],
+        "Description": params['description'],
+        "DataType": params['data_type'],
+        "Hint": params['hint'],
+        "Validation": params['validation'],
+        "Enrollment": params['enrollment'],
+        "Options": params['options'],
+        "DefaultValue": params['default_value'],
+        "ExplicitUpdate": params['explicit_update'],
+        "AllowAPI": params['allow_api'],
+        "DisplayOrder": params['display_order']
+        }
+    return dict((key, value) for key, value in state.items() if value is not None)
+
+def compareState(currentState, requestedState):
+    # True when the current field differs from the requested one
+    for key, value in currentState.items():
+        if key in IGNORED_KEYS or requestedState.get(key) is None:
+            continue
+        if value != requestedState[key]:
+            return True
+    return False
+
+def handleList(module, src):
+    return module.handleJsonRequest("GET", src + '/MetadataFields/') or []
+
+def createChanges(current, fields, prune=False):
+    # Plans the POST/PUT/DELETE calls that turn the current list of metadata
+    # fields into the requested one. Fields without a display_order are
+    # ordered by their position in the list.
+    currentByName = {field['Name']: field for field in current}
+    changes = []
+    position = 0
+    for field in fields:
+        existing = currentByName.pop(field['name'], None)
+        if field.get('state', 'present') == 'absent':
+            if existing:
+                changes.append({'name': field['name'], 'action': 'delete', 'id': existing['Id']})
+            else:
+                changes.append({'name': field['name'], 'action': 'unchanged'})
+            continue
+        position += 1
+        params = dict(field)
+        if params.get('display_order') is None:
+            params['display_order'] = position
+        requested = createRequestedState(params)
+        if not existing:
+            changes.append({'name': field['name'], 'action': 'create', 'payload': requested})
+        elif compareState(existing, requested):
+            requested['Id'] = existing['Id']
+            changes.append({'name': field['name'], 'action': 'update', 'payload': requested, 'id': existing['Id']})
+        else:
+            changes.append({'name': field['name'], 'action': 'unchanged'})
+    if prune:
+        for name, existing in currentByName.items():
+            changes.append({'name': name, 'action': 'delete', 'id': existing['Id']})
+    return changes
+
+def applyChange(module, src, change):
+    if change['action'] == 'create':
+        return module.handleJsonRequest("POST", src + '/MetadataFields/', change['payload'])
+    if change['action'] == 'update':
+        return module.handleJsonRequest("PUT", src + '/MetadataFields/', change['payload'])
+    if change['action'] == 'delete':
+        return module.handleJsonRequest("DELETE", src + '/MetadataFields/' + str(change['id']))
@@ -0,0 +1,280 @@
+import json
+import sqlite3
+import time
+
+from datetime import datetime, timezone
+
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import KeyfactorApiError
+from ansible_collections.keyfactor.platform.plugins.module_utils.certificates import handleCertificatePages, parseDate
+from ansible_collections.keyfactor.platform.plugins.module_utils.drift import ENDPOINTS, createObjectName
+
+SCHEMA_VERSION = 1
+
+# Kinds kept as whole lists. Their lists are short, so they are read again
+# with If-None-Match and replaced when the server reports a change.
+OBJECT_KINDS = ('identities', 'roles', 'collections', 'metadata_fields', 'store_types', 'certificate_authorities')
+KINDS = ('certificates',) + OBJECT_KINDS
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS objects (
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    id TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (kind, name)
+);
+CREATE INDEX IF NOT EXISTS objects_id ON objects (kind, id);
+CREATE TABLE IF NOT EXISTS certificates (
+    id INTEGER PRIMARY KEY,
+    cn TEXT COLLATE NOCASE,
+    thumbprint TEXT COLLATE NOCASE,
+    serial_number TEXT,
+    issuer_dn TEXT,
+    ca_id INTEGER,
+    not_before TEXT,
+    not_after TEXT,
+    state INTEGER,
+    generation INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS certificates_cn ON certificates (cn);
+CREATE INDEX IF NOT EXISTS certificates_thumbprint ON certificates (thumbprint);
+CREATE INDEX IF NOT EXISTS certificates_not_after ON certificates (not_after);
+CREATE INDEX IF NOT EXISTS certificates_ca ON certificates (ca_id, not_after);
+CREATE TABLE IF NOT EXISTS collection_certificates (
+    collection_id INTEGER NOT NULL,
+    certificate_id INTEGER NOT NULL,
+    PRIMARY KEY (collection_id, certificate_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS collection_certificates_certificate ON collection_certificates (certificate_id);
+'''
+
+def createTimestamp(value):
+    # Dates are stored as UTC 'YYYY-MM-DDTHH:MM:SS' so that text order is
+    # time order and expiry windows are index range scans
+    date = value.astimezone(timezone.utc) if isinstance(value, datetime) else parseDate(value)
+    return date.strftime('%Y-%m-%dT%H:%M:%S') if date else None
+
+def createCertificateRow(certificate, generation):
+    return (
+        certificate['Id'],
+        certificate.get('IssuedCN'),
+        certificate.get('Thumbprint'),
+        certificate.get('SerialNumber'),
+        certificate.get('IssuerDN'),
+        certificate.get('CertificateAuthorityId'),
+        createTimestamp(certificate.get('NotBefore')),
+        createTimestamp(certificate.get('NotAfter')),
+        certificate.get('CertState'),
+        generation,
+        json.dumps(certificate, sort_keys=True)
+    )
+
+class Mirror(object):
+    # Local SQLite copy of keyfactor objects. Reading needs nothing but the
+    # file, so lookups and reports can answer from it without a request;
+    # handleRefresh brings it up to date through an AnsibleKeyfactorModule.
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        if path != ':memory:':
+            # Readers are not blocked while a refresh writes
+            self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript(SCHEMA)
+        version = self.getMeta('schema_version')
+        if version is not None and int(version) != SCHEMA_VERSION:
+            raise KeyfactorApiError('Mirror ' + path + ' has schema version ' + str(version) + ', expected ' + str(SCHEMA_VERSION) + '.')
+        self.setMeta('schema_version', SCHEMA_VERSION)
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def getMeta(self, key, default=None):
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row['value']) if row else default
+
+    def setMeta(self, key, value):
+        self.db.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, json.dumps(value)))
+
+    def findObjects(self, kind, name=None):
+        # Objects of a kind, by the names drift and reconcile use: lower case
+        # account names for identities and host\logical for CAs
+        if name is None:
+            rows = self.db.execute('SELECT data FROM objects WHERE kind = ? ORDER BY name', (kind,))
+        else:
+            rows = self.db.execute('SELECT data FROM objects WHERE kind = ? AND name = ?', (kind, name))
+        return [json.loads(row['data']) for row in rows]
+
+    def findCertificates(self, cn=None, thumbprint=None, ca_id=None, collection_id=None, expires_after=None,
+            expires_before=None, limit=None):
+        # Certificates matching every given filter, by ascending NotAfter.
+        # Expiry bounds are datetimes or ISO 8601 strings.
+        conditions = []
+        args = []
+        for column, value in (('cn', cn), ('thumbprint', thumbprint), ('ca_id', ca_id)):
+            if value is not None:
+                conditions.append(column + ' = ?')
+                args.append(value)
+        if expires_after is not None:
+            conditions.append('not_after >= ?')
+            args.append(createTimestamp(expires_after))
+        if expires_before is not None:
+            conditions.append('not_after < ?')
+            args.append(createTimestamp(expires_before))
+        if collection_id is not None:
+            conditions.append('id IN (SELECT certificate_id FROM collection_certificates WHERE collection_id = ?)')
+            args.append(collection_id)
+        sql = 'SELECT data FROM certificates'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY not_after, id'
+        if limit:
+            sql += ' LIMIT ' + str(int(limit))
+        for row in self.db.execute(sql, args):
+            yield json.loads(row['data'])
+
+    def findObjectNames(self, kind):
+        # {id: name} of the objects of a kind
+        return dict((row['id'], row['name']) for row in self.db.execute('SELECT id, name FROM objects WHERE kind = ?', (kind,)))
+
+    def findCollectionIds(self, certificate_id):
+        rows = self.db.execute('SELECT collection_id FROM collection_certificates WHERE certificate_id = ?', (certificate_id,))
+        return [row['collection_id'] for row in rows]
+
+    def handleCount(self, kind):
+        if kind == 'certificates':
+            return self.db.execute('SELECT COUNT(*) FROM certificates').fetchone()[0]
+        return self.db.execute('SELECT COUNT(*) FROM objects WHERE kind = ?', (kind,)).fetchone()[0]
+
+    def handleRefresh(self, module, kinds, src, legacy_src, full=False, full_refresh_interval=86400, page_size=1000,
+            include_metadata=True, collection_membership=True, concurrency=10):
+        # Brings the requested kinds up to date in one transaction and returns
+        # {kind: (mode, updated)}. Nothing is kept when a request fails or in
+        # check mode.
+        url = self.getMeta('url')
+        if url is not None and url != module.params['url']:
+            raise KeyfactorApiError('Mirror ' + self.path + ' holds ' + url + ', not ' + str(module.params['url']) + '.')
+        self.setMeta('url', module.params['url'])
+        sources = {'src': src, 'legacy_src': legacy_src}
+        refreshed = {}
+        try:
+            objectKinds = [kind for kind in OBJECT_KINDS if kind in kinds]
+            if 'certificates' in kinds and collection_membership and 'collections' not in objectKinds:
+                objectKinds.append('collections')
+            etags = dict((kind, self.getMeta('etag.' + kind) if self.handleCount(kind) else None) for kind in objectKinds)
+            lists = module.handleConcurrent(
+                lambda kind: module.handleConditionalRequest(sources[ENDPOINTS[kind][0]] + ENDPOINTS[kind][1], etags[kind]),
+                objectKinds, concurrency)
+            for kind, (value, error) in zip(objectKinds, lists):
+                if error:
+                    raise KeyfactorApiError('Unable to read ' + kind + ': ' + error)
+                refreshed[kind] = self.handleObjects(kind, value)
+            if 'certificates' in kinds:
+                refreshed['certificates'] = self.handleCertificates(module, src, full, full_refresh_interval, page_size,
+                    include_metadata, collection_membership, refreshed.get('collections', ('not_modified', 0))[0] != 'not_modified',
+                    concurrency)
+        except Exception:
+            self.db.rollback()
+            raise
+        if module.check_mode:
+            self.db.rollback()
+        else:
+            self.db.commit()
+        return refreshed
+
+    def handleObjects(self, kind, value):
+        content, etag, modified = value
+        if not modified:
+            return 'not_modified', 0
+        previous = dict((row['name'], row['data']) for row in self.db.execute('SELECT name, data FROM objects WHERE kind = ?', (kind,)))
+        rows = dict((createObjectName(kind, current), (str(current.get('Id')), json.dumps(current, sort_keys=True)))
+            for current in content or [])
+        updated = len(set(previous) - set(rows)) + sum(1 for name, row in rows.items() if previous.get(name) != row[1])
+        self.db.execute('DELETE FROM objects WHERE kind = ?', (kind,))
+        self.db.executemany('INSERT INTO objects (kind, name, id, data) VALUES (?, ?, ?, ?)',
+            [(kind, name, row[0], row[1]) for name, row in rows.items()])
+        self.setMeta('etag.' + kind, etag)
+        self.setMeta('listed.' + kind, time.time())
+        return 'listed', updated
+
+    def handleCertificates(self, module, src, full, full_refresh_interval, page_size, include_metadata,
+            collection_membership, collections_changed, concurrency):
+        # Incremental refreshes read the certificates imported or revoked
+        # since the newest such date already mirrored. Metadata edits and
+        # deletions are not dated by the API, so a full refresh still runs
+        # every full_refresh_interval seconds and drops what it did not see.
+        watermark = self.getMeta('certificates.watermark')
+        lastFull = self.getMeta('certificates.full', 0)
+        if watermark is None or self.getMeta('certificates.include_metadata') != include_metadata:
+            full = True
+        if full_refresh_interval and time.time() - lastFull >= full_refresh_interval:
+            full = True
+        generation = self.getMeta('certificates.generation', 0) + 1
+        query = '' if full else 'ImportDate -ge "' + watermark + '" OR RevocationEffDate -ge "' + watermark + '"'
+
+        updated = 0
+        changedIds = []
+        newest = watermark
+        pages = handleCertificatePages(module.handleJsonRequest, src, query, page_size=page_size, include_metadata=include_metadata)
+        for page in pages:
+            rows = [createCertificateRow(certificate, generation) for certificate in page]
+            known = dict((row['id'], row['data']) for row in self.db.execute(
+                'SELECT id, data FROM certificates WHERE id IN (' + ','.join('?' * len(rows)) + ')', [row[0] for row in rows]))
+            updated += sum(1 for row in rows if known.get(row[0]) != row[-1])
+            self.db.executemany('INSERT OR REPLACE INTO certificates VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            if not full:
+                changedIds.extend(row[0] for row in rows)
+            for certificate in page:
+                for field in ('ImportDate', 'RevocationEffDate'):
+                    date = createTimestamp(certificate.get(field))
+                    if date and (newest is None or date > newest):
+                        newest = date
+        if full:
+            removed = self.db.execute('DELETE FROM certificates WHERE generation < ?', (generation,)).rowcount
+            self.db.execute('DELETE FROM collection_certificates WHERE certificate_id NOT IN (SELECT id FROM certificates)')
+            updated += removed
+            self.setMeta('certificates.full', time.time())
+            self.setMeta('certificates.include_metadata', include_metadata)
+        self.setMeta('certificates.generation', generation)
+        self.setMeta('certificates.watermark', newest or time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(0)))
+
+        if collection_membership:
+            # Collection queries can change without any certificate changing,
+            # so memberships are rebuilt whole unless only certificates moved
+            if full or collections_changed or not self.getMeta('certificates.membership'):
+                self.handleMembership(module, src, None, page_size, concurrency)
+            elif changedIds:
+                self.handleMembership(module, src, (query, changedIds), page_size, concurrency)
+            self.setMeta('certificates.membership', True)
+        elif full or changedIds:
+            # Memberships no longer follow the certificates
+            self.setMeta('certificates.membership', False)
+        return 'full' if full else 'incremental', updated
+
+    def handleMembership(self, module, src, changed, page_size, concurrency):
+        # Runs every collection query, restricted to the changed certificates
+        # when changed is (query, ids), and records which certificates match
+        collections = [(int(row['id']), json.loads(row['data']).get('Content') or '')
+            for row in self.db.execute("SELECT id, data FROM objects WHERE kind = 'collections'")]
+
+        def handleCollection(collection):
+            conditions = [part for part in (collection[1], changed[0] if changed else '') if part]
+            query = ' AND '.join('(' + part + ')' for part in conditions)
+            ids = []
+            for page in handleCertificatePages(module.handleJsonRequest, src, query, page_size=page_size):
+                ids.extend(certificate['Id'] for certificate in page)
+            return ids
+
+        members = module.handleConcurrent(handleCollection, collections, concurrency)
+        if changed:
+            self.db.executemany('DELETE FROM collection_certificates WHERE certificate_id = ?', [(i,) for i in changed[1]])
+        else:
+            self.db.execute('DELETE FROM collection_certificates')
+        for (collection_id, content), (ids, error) in zip(collections, members):
+            if error:
+                raise KeyfactorApiError('Unable to read the certificates of collection ' + str(collection_id) + ': ' + error)
+            self.db.executemany('INSERT OR IGNORE INTO collection_certificates VALUES (?, ?)', [(collection_id, i) for i in ids])
@@ -0,0 +1,299 @@
+import hashlib
+import json
+
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import KeyfactorApiError, createChangeReport
+from ansible_collections.keyfactor.platform.plugins.module_utils import certificate_authorities, certificate_collections, collection_permissions, identities, metadata_fields, roles, store_types
+
+# Every kind the reconcile module manages, with the kinds that must be
+# written before it. Deletes run in the reverse order once everything
+# else is in place.
+DEPENDS = {
+    'identities': [],
+    'metadata_fields': [],
+    'store_types': [],
+    'roles': ['identities'],
+    'collections': ['metadata_fields'],
+    'certificate_authorities': ['roles'],
+    'collection_permissions': ['roles', 'collections'],
+}
+
+# Kinds that later waves may refer to by name before they exist. Their
+# lists are read again once the wave that creates them has run.
+REFRESHED = ('roles', 'collections')
+
+def createLevels(kinds):
+    # Groups the requested kinds into waves. A kind is placed in the first
+    # wave after all the requested kinds it depends on.
+    levels = []
+    placed = set()
+    remaining = [kind for kind in DEPENDS if kind in kinds]
+    while remaining:
+        level = [kind for kind in remaining if all(d in placed or d not in kinds for d in DEPENDS[kind])]
+        levels.append(level)
+        placed.update(level)
+        remaining = [kind for kind in remaining if kind not in placed]
+    return levels
+
+class Reconciler(object):
+
+    def __init__(self, module, config, src, legacy_src, api_src, concurrency=10):
+        self.module = module
+        self.config = config
+        self.src = src
+        self.legacy_src = legacy_src
+        self.api_src = api_src
+        self.concurrency = concurrency
+        self.state = {}
+        self.permissions = {}
+        # Names planned for creation, which later waves treat as existing
+        self.pending = {'roles': set(), 'collections': set()}
+
+    def handleList(self, kind):
+        if kind == 'identities':
+            return identities.handleList(self.module, self.legacy_src)
+        if kind == 'roles':
+            return roles.handleList(self.module, self.legacy_src)
+        if kind in ('collections', 'collection_permissions'):
+            return certificate_collections.handleList(self.module, self.src)
+        if kind == 'metadata_fields':
+            return metadata_fields.handleList(self.module, self.src)
+        if kind == 'store_types':
+            return store_types.handleList(self.module, self.src)
+        if kind == 'certificate_authorities':
+            return certificate_authorities.handleList(self.module, self.src)
+
+    def handleSnapshot(self, kinds):
+        # Reads the live state of every kind once, concurrently. Permission
+        # matrices need the roles and collections lists.
+        lists = set('collections' if kind == 'collection_permissions' else kind for kind in kinds)
+        if 'collection_permissions' in kinds:
+            lists.add('roles')
+        lists = sorted(lists)
+        for kind, (current, error) in zip(lists, self.module.handleConcurrent(self.handleList, lists, self.concurrency)):
+            if error:
+                raise KeyfactorApiError('Unable to read ' + kind + ': ' + error)
+            self.state[kind] = current
+
+    def createChanges(self, kind):
+        entries = self.config[kind]
+        if kind == 'identities':
+            return identities.createChanges(self.state[kind], entries)
+        if kind == 'metadata_fields':
+            return metadata_fields.createChanges(self.state[kind], entries)
+        if kind == 'store_types':
+            return store_types.createChanges(self.state[kind], entries)
+        if kind == 'certificate_authorities':
+            return self.createAuthorityChanges(entries)
+        if kind == 'roles':
+            return self.createRoleChanges(entries)
+        if kind == 'collections':
+            return certificate_collections.createChanges(self.state[kind], entries)
+        if kind == 'collection_permissions':
+            return self.createPermissionChanges(entries)
+
+    def createAuthorityChanges(self, entries):
+        requested = []
+        for params in entries:
+            payload, msg = certificate_authorities.createPayload(params)
+            if msg:
+                raise KeyfactorApiError(params['host_name'] + '\\' + params['name'] + ': ' + msg)
+            requested.append((params['state'], payload))
+        return certificate_authorities.createChanges(self.state['certificate_authorities'], requested)
+
+    def createRoleChanges(self, entries):
+        currentByName = dict((role['Name'], role) for role in self.state['roles'])
+        changes = []
+        for params in entries:
+            current = currentByName.get(params['name'])
+            if params['state'] == 'absent':
+                changes.append({'name': params['name'], 'action': 'delete' if current else 'unchanged'})
+                continue
+            requested = {
+                'name': params['name'],
+                'description': params['description'],
+                'identities': params['identities'],
+                'permissions': params['permissions']
+                }
+            changes.append(roles.createChange(current, requested))
+        return changes
+
+    def createPermissionChanges(self, entries):
+        roleIds = dict((role['Name'], role['Id']) for role in self.state['roles'])
+        collections = dict((c['Name'], c['Id']) for c in self.state['collections'])
+        requested = {}
+        errors = {}
+        for entry in entries:
+            name = entry['collection']
+            role_id = entry['role_id']
+            if role_id is None:
+                role_id = roleIds.get(entry['role'])
+                if role_id is None and entry['role'] not in self.pending['roles']:
+                    errors[name] = 'Role \'' + entry['role'] + '\' does not exist.'
+                    continue
+                # A role that check mode would create is keyed by its name
+                role_id = role_id or entry['role']
+            requested.setdefault(name, {})[role_id] = entry['permissions']
+
+        changes = []
+        readable = []
+        for name in sorted(set(requested) | set(errors)):
+            if name in errors:
+                changes.append({'name': name, 'action': 'update', 'error': errors[name]})
+            elif name in collections:
+                readable.append(name)
+            elif name in self.pending['collections']:
+                changes.append(collection_permissions.createChange(name, None, None, requested[name]))
+            else:
+                changes.append({'name': name, 'action': 'update', 'error': 'Certificate Collection \'' + name + '\' does not exist.'})
+
+        reads = self.module.handleConcurrent(
+            lambda name: collection_permissions.handleGetPermissions(self.module, self.src, collections[name]),
+            readable, self.concurrency)
+        for name, (current, error) in zip(readable, reads):
+            if error:
+                changes.append({'name': name, 'action': 'update', 'error': 'Unable to read permissions: ' + error})
+            else:
+                self.permissions[name] = current
+                changes.append(collection_permissions.createChange(name, collections[name], current, requested[name]))
+        return sorted(changes, key=lambda change: change['name'])
+
+    def applyChange(self, kind, change):
+        if kind == 'identities':
+            return identities.applyChange(self.module, self.legacy_src, change)
+        if kind == 'roles':
+            response = roles.applyChange(self.module, self.legacy_src, self.api_src, change)
+            if isinstance(response, dict) and response.get('Valid') == False:
+                raise KeyfactorApiError(response.get('Message', 'Failed.'))
+            return response
+        if kind == 'metadata_fields':
+            return metadata_fields.applyChange(self.module, self.src, change)
+        if kind == 'store_types':
+            return store_types.applyChange(self.module, self.src, change)
+        if kind == 'certificate_authorities':
+            return certificate_authorities.applyChange(self.module, self.src, change)
+        if kind == 'collections':
+            return certificate_collections.applyChange(self.module, self.src, change)
+        if kind == 'collection_permissions':
+            return collection_permissions.applyChange(self.module, self.src, change)
+
+    def createIndex(self, kind):
+        # Current objects of a kind, keyed by the name their changes carry
+        if kind == 'identities':
+            return dict((identity['AccountName'].lower(), identity) for identity in self.state[kind])
+        if kind == 'certificate_authorities':
+            return dict((certificate_authorities.createName(certificate_authorities.createKey(ca)), ca) for ca in self.state[kind])
+        if kind == 'collection_permissions':
+            return self.permissions
+        return dict((current['Name'], current) for current in self.state[kind])
+
+    def createIndexKey(self, kind, name):
+        return name.lower() if kind == 'identities' else name
+
+    def handleResolve(self, changes):
+        # Roles and collections created by an earlier wave are referenced by
+        # name in permission changes until their ids are known
+        unresolved = [change for change in changes if change['kind'] == 'collection_permissions' and change['action'] != 'unchanged' and not change.get('error')
+            and (change.get('id') is None or any(not isinstance(entry['RoleId'], int) for entry in change['payload']))]
+        if not unresolved or self.module.check_mode:
+            return
+        for kind in REFRESHED:
+            self.state[kind] = self.handleList(kind)
+        roleIds = dict((role['Name'], role['Id']) for role in self.state['roles'])
+        collections = dict((c['Name'], c['Id']) for c in self.state['collections'])
+        for change in unresolved:
+            change['id'] = change.get('id') or collections.get(change['name'])
+            missing = [entry['RoleId'] for entry in change['payload'] if not isinstance(entry['RoleId'], int) and entry['RoleId'] not in roleIds]
+            if change['id'] is None or missing:
+                change['error'] = 'Unable to resolve ' + ', '.join(missing or [change['name']]) + '.'
+                continue
+            for entry in change['payload']:
+                entry['RoleId'] = roleIds.get(entry['RoleId'], entry['RoleId'])
+
+    def handleVerify(self, changes):
+        # Compares the fingerprints recorded by plan with the objects as they
+        # are now, read from the same list endpoints the plan used so both
+        # fingerprints cover the same shape. Returns the names of the objects
+        # that drifted.
+        checked = [change for change in changes if change.get('fingerprint') and not change.get('error')]
+        kinds = sorted(set(change['kind'] for change in checked if change['kind'] != 'collection_permissions'))
+        for kind, (current, error) in zip(kinds, self.module.handleConcurrent(self.handleList, kinds, self.concurrency)):
+            if error:
+                raise KeyfactorApiError('Unable to read ' + kind + ': ' + error)
+            self.state[kind] = current
+        indexes = dict((kind, self.createIndex(kind)) for kind in kinds)
+
+        permissions = [change for change in checked if change['kind'] == 'collection_permissions']
+        reads = self.module.handleConcurrent(
+            lambda change: collection_permissions.handleGetPermissions(self.module, self.src, change['id']),
+            permissions, self.concurrency)
+        for change, (current, error) in zip(permissions, reads):
+            if error:
+                raise KeyfactorApiError('Unable to read collection_permissions ' + change['name'] + ': ' + error)
+            self.permissions[change['name']] = current
+        indexes['collection_permissions'] = self.permissions
+
+        drifted = []
+        for change in checked:
+            current = indexes[change['kind']].get(self.createIndexKey(change['kind'], change['name']))
+            if current is None or createFingerprint(change['kind'], current) != change['fingerprint']:
+                drifted.append(change['kind'] + ' ' + change['name'])
+        return drifted
+
+    def handleWave(self, changes):
+        # All the changes of a wave go out on one pool, whatever their kind
+        self.handleResolve(changes)
+        self.module.handleChanges(changes, lambda change: self.applyChange(change['kind'], change), self.concurrency)
+
+    def plan(self):
+        # Lists every kind once and plans all changes up front. Changes of
+        # later waves refer to roles and collections still to be created by
+        # name. Every update and delete carries the fingerprint of the object
+        # it was planned against.
+        kinds = [kind for kind in DEPENDS if self.config.get(kind)]
+        levels = createLevels(kinds)
+        self.handleSnapshot(kinds)
+
+        changes = []
+        for index, level in enumerate(levels):
+            for kind in level:
+                planned = self.createChanges(kind)
+                currentByName = self.createIndex(kind)
+                for change in planned:
+                    change['kind'] = kind
+                    change['level'] = index
+                    current = currentByName.get(self.createIndexKey(kind, change['name']))
+                    if change['action'] in ('update', 'delete') and current is not None:
+                        change['fingerprint'] = createFingerprint(kind, current)
+                    changes.append(change)
+                if kind in REFRESHED:
+                    self.pending[kind].update(change['name'] for change in planned if change['action'] == 'create')
+        return levels, changes
+
+    def apply(self, levels, changes):
+        # Sends the planned changes wave by wave. Deletes go last, dependents
+        # first.
+        for index in range(len(levels)):
+            self.handleWave([change for change in changes if change['level'] == index and change['action'] != 'delete'])
+        for index in reversed(range(len(levels))):
+            self.handleWave([change for change in changes if change['level'] == index and change['action'] == 'delete'])
+        return changes
+
+    def run(self):
+        levels, changes = self.plan()
+        self.apply(levels, changes)
+        return createResult(levels, changes)
+
+def createFingerprint(kind, current):
+    # sha256 of the object as the API returns it. Permission entries come
+    # back in no particular order.
+    if kind == 'collection_permissions':
+        current = sorted(({'RoleId': entry.get('RoleId'), 'Permissions': sorted(entry.get('Permissions') or [])} for entry in current),
+            key=lambda entry: str(entry['RoleId']))
+    return hashlib.sha256(json.dumps(current, sort_keys=True).encode('utf-8')).hexdigest()
+
+def createResult(levels, changes):
+    kinds = [kind for level in levels for kind in level]
+    return {
+        'changes': dict((kind, createChangeReport([change for change in changes if change['kind'] == kind])) for kind in kinds),
+        'levels': levels
+    }
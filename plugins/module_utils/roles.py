@@ -0,0 +1,81 @@
+def parseMembers(value):
+    # The legacy API returns identities and permissions as comma joined strings
+    if not value:
+        return []
+    if isinstance(value, list):
+        return value
+    return [member.strip() for member in value.split(',') if member.strip()]
+
+def indexMembers(members):
+    # Case insensitive lookup of members, keeping the spelling first seen
+    index = {}
+    for member in members:
+        index.setdefault(member.lower(), member)
+    return index
+
+def createDelta(current, add=None, remove=None, replace=None):
+    # Returns the (added, removed) members needed to go from current to the
+    # requested membership, given either a full replace list or add/remove
+    currentIndex = indexMembers(current)
+    if replace is not None:
+        requestedIndex = indexMembers(replace)
+        added = [member for key, member in requestedIndex.items() if key not in currentIndex]
+        removed = [member for key, member in currentIndex.items() if key not in requestedIndex]
+        return added, removed
+    removeKeys = set(member.lower() for member in remove or [])
+    added = [member for key, member in indexMembers(add or []).items() if key not in currentIndex and key not in removeKeys]
+    removed = [currentIndex[key] for key in removeKeys if key in currentIndex]
+    return added, removed
+
+def applyDelta(current, added, removed):
+    removedKeys = set(member.lower() for member in removed)
+    return [member for member in current if member.lower() not in removedKeys] + list(added)
+
+def createChange(current, requested):
+    # requested holds name, description and for identities and permissions
+    # either a full list or add/remove lists. Identity changes alone are sent
+    # as a delta; description or permission changes rewrite the role.
+    name = requested['name']
+    if not current:
+        return {'name': name, 'action': 'create', 'payload': {
+            "name": name,
+            "description": requested['description'],
+            "identities": list(requested.get('identities') or requested.get('identities_add') or []),
+            "permissions": list(requested.get('permissions') or requested.get('permissions_add') or [])
+            }}
+
+    current = {k.lower(): v for (k, v) in current.items()}
+    identities = parseMembers(current.get('identities'))
+    permissions = parseMembers(current.get('permissions'))
+    identitiesAdded, identitiesRemoved = createDelta(identities, requested.get('identities_add'),
+        requested.get('identities_remove'), requested.get('identities'))
+    permissionsAdded, permissionsRemoved = createDelta(permissions, requested.get('permissions_add'),
+        requested.get('permissions_remove'), requested.get('permissions'))
+    description = requested.get('description')
+    descriptionChanged = description is not None and description != current.get('description')
+
+    if descriptionChanged or permissionsAdded or permissionsRemoved:
+        return {'name': name, 'action': 'update', 'id': current.get('id'), 'payload': {
+            "name": name,
+            "description": description if description is not None else current.get('description'),
+            "identities": applyDelta(identities, identitiesAdded, identitiesRemoved),
+            "permissions": applyDelta(permissions, permissionsAdded, permissionsRemoved)
+            }}
+    if identitiesAdded or identitiesRemoved:
+        return {'name': name, 'action': 'update', 'id': current.get('id'), 'delta': {
+            "Add": [{"AccountName": member} for member in identitiesAdded],
+            "Remove": [{"AccountName": member} for member in identitiesRemoved]
+            }}
+    return {'name': name, 'action': 'unchanged', 'id': current.get('id')}
+
+def handleList(module, src):
+    return module.handleJsonRequest("GET", src + '/Security/1/GetRoles') or []
+
+def applyChange(module, src, api_src, change):
+    if change['action'] == 'create':
+        return module.handleJsonRequest("POST", src + '/Security/1/AddRole', change['payload'])
+    if change['action'] == 'delete':
+        return module.handleJsonRequest("POST", src + '/Security/1/DeleteRole', {"name": change['name']})
+    if 'delta' in change:
+        return module.handleJsonRequest("PUT", api_src + '/Security/Roles/' + str(change['id']) + '/Identities', change['delta'])
+    return module.handleJsonRequest("POST", src + '/Security/1/EditRole', change['payload'])
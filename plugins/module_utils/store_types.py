@@ -0,0 +1,67 @@
+import glob
+import hashlib
+import json
+import os
+
+# Assigned by Command, never part of a definition
+SERVER_KEYS = ('StoreType', 'InventoryJobType', 'ManagementJobType', 'DiscoveryJobType', 'EnrollmentJobType', 'ImportType')
+# Assigned by Command to the items of Properties and EntryParameters
+ITEM_SERVER_KEYS = ('Id', 'StoreTypeId')
+
+def loadDefinitions(path):
+    # Reads store type definitions from a JSON file or from every *.json
+    # file of a directory. A file may hold one definition or a list of them.
+    files = sorted(glob.glob(os.path.join(path, '*.json'))) if os.path.isdir(path) else [path]
+    definitions = []
+    for name in files:
+        with open(name) as f:
+            content = json.load(f)
+        definitions.extend(content if isinstance(content, list) else [content])
+    return definitions
+
+def normalize(value):
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items() if k not in SERVER_KEYS}
+    if isinstance(value, list):
+        items = [normalize(dict((k, w) for k, w in v.items() if k not in ITEM_SERVER_KEYS) if isinstance(v, dict) else v) for v in value]
+        # Lists of named objects (properties, entry parameters) are unordered
+        if items and all(isinstance(v, dict) and 'Name' in v for v in items):
+            items.sort(key=lambda v: v['Name'])
+        return items
+    return value
+
+def createDigest(definition, current=None):
+    # Digest of the normalized definition. When current is given, the digest
+    # covers the keys of definition only, so that fields Command adds do not
+    # count as a difference.
+    state = normalize(definition)
+    if current is not None:
+        current = normalize(current)
+        state = {k: current.get(k) for k in state}
+    return hashlib.sha256(json.dumps(state, sort_keys=True).encode('utf-8')).hexdigest()
+
+def handleList(module, src):
+    return module.handleJsonRequest("GET", src + '/CertificateStoreTypes/') or []
+
+def createChanges(current, definitions):
+    currentByName = {storeType['Name']: storeType for storeType in current}
+    changes = []
+    for definition in definitions:
+        name = definition.get('Name')
+        digest = createDigest(definition)
+        existing = currentByName.get(name)
+        if not existing:
+            payload = {k: v for k, v in definition.items() if k != 'StoreType'}
+            changes.append({'name': name, 'action': 'create', 'payload': payload, 'digest': digest})
+        elif createDigest(definition, existing) != digest:
+            payload = dict(definition, StoreType=existing['StoreType'])
+            changes.append({'name': name, 'action': 'update', 'payload': payload, 'id': existing['StoreType'], 'digest': digest})
+        else:
+            changes.append({'name': name, 'action': 'unchanged', 'digest': digest})
+    return changes
+
+def applyChange(module, src, change):
+    if change['action'] == 'create':
+        return module.handleJsonRequest("POST", src + '/CertificateStoreTypes/', change['payload'])
+    if change['action'] == 'update':
+        return module.handleJsonRequest("PUT", src + '/CertificateStoreTypes/', change['payload'])
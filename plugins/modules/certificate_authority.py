@@ -106,9 +106,23 @@ options:
         description:
             - Whether the role should be present or absent
         required: true
+    certificate_authorities:
+        description:
+            - "List of certificate authorities to configure in one task. Mutually exclusive with name, host_name and forest_root."
+            - "Each entry takes the same options as the module, including its own state."
+            - "The current CAs are downloaded once and indexed by HostName, LogicalName and ForestRoot. Only the required POST/PUT/DELETE calls are sent."
+        required: false
+    concurrency:
+        description:
+            - "Maximum number of CA changes sent at once with certificate_authorities." Default: 10
+        required: false
 
 author:
     - Anthony Batlouni (@abatlouni-inf)
+
+extends_documentation_fragment:
+    - keyfactor.platform.fingerprint
+    - keyfactor.platform.instances
 '''
 
 EXAMPLES = '''
@@ -139,54 +153,96 @@ EXAMPLES = '''
       host_name: PodCA_HostName
       forest_root: PodCA_ForestName
       state: 'absent'
+  - name: Configure every Keyfactor CA of the estate
+    keyfactor.platform.certificate_authority:
+      concurrency: 10
+      certificate_authorities:
+        - name: IssuingCA1
+          host_name: ca1.forest1.lab
+          forest_root: forest1.lab
+          allowed_enrollment_types: 3
+        - name: IssuingCA2
+          host_name: ca2.forest2.lab
+          forest_root: forest2.lab
+          allowed_enrollment_types: 1
+        - name: RetiredCA
+          host_name: ca0.forest1.lab
+          forest_root: forest1.lab
+          state: 'absent'
 '''
 
 RETURN = '''
+fingerprint_hit:
+    description: Whether the task was skipped because the fingerprint store holds a recent apply of the same request
+    type: bool
+    returned: when fingerprint_store is set
 changed:
     description: Whether or not a change was made
     type: bool
     returned: always
+changes:
+    description: Per CA report with name (HostName\\LogicalName), action (create, update, delete or unchanged), changed and error
+    type: list
+    returned: when certificate_authorities is provided
+instances:
+    description: Per instance result keyed by instance name, with the keys a single instance task returns
+    type: dict
+    returned: when instances is provided
 '''
 
 import json
-from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule, KeyfactorApiError, createChangeReport
+from ansible_collections.keyfactor.platform.plugins.module_utils.certificate_authorities import applyChange, compareState, createCaSpec, createChanges, createKey, handleList
+from ansible_collections.keyfactor.platform.plugins.module_utils.fingerprints import createFingerprintSpec, handleFingerprintLookup, handleFingerprintSave
+from ansible_collections.keyfactor.platform.plugins.module_utils.certificate_authorities import createPayload as createStatePayload
 
 def run_module():
 
-    argument_spec = dict(
-        name=dict(type='str', required=True),
-        host_name=dict(type='str', required=True),
-        forest_root=dict(type='str', required=True),
+    ca_spec = createCaSpec()
+
+    argument_spec = dict((k, dict(v)) for k, v in ca_spec.items() if k != 'state')
+    for k in ('name', 'host_name', 'forest_root'):
+        argument_spec[k]['required'] = False
+    argument_spec.update(
         src=dict(type='str', required=False, default="KeyfactorAPI"),
-        allowed_enrollment_types=dict(type='int', required=False, default=0, choices=[0,1,2,3]),
-        sync_external_certificates=dict(type='bool', required=False, default=False),
-        rfc_enforcement=dict(type='bool', required=False, default=False),
-        standalone=dict(type='bool', required=False, default=False),
-        orchestrator=dict(type='str', required=False, default=None),
-        key_retention=dict(type='int', required=False, default=0, choices=[0,1,2,3]),
-        key_retention_days=dict(type='int', required=False, default=None),
-        monitor=dict(type='bool', required=False, default=False),
-        issuance_max=dict(type='int', required=False, default=None),
-        issuance_min=dict(type='int', required=False, default=None),
-        denial_max=dict(type='int', required=False, default=None),
-        failure_max=dict(type='int', required=False, default=None),
-        delegate=dict(type='bool', required=False, default=False),
-        use_allowed_requesters=dict(type='bool', required=False, default=False),
-        allowed_requesters=dict(type='list', required=False, default=[]),
+        certificate_authorities=dict(type='list', elements='dict', required=False, options=ca_spec,
+            mutually_exclusive=[["orchestrator", "monitor"]]),
+        concurrency=dict(type='int', required=False, default=10)
     )
+    argument_spec.update(createFingerprintSpec())
 
-    mutually_exclusive_args = [["orchestrator", "monitor"]]
-
-    result = dict(
-        changed=False
-    )
+    mutually_exclusive_args = [["orchestrator", "monitor"], ["name", "certificate_authorities"]]
 
     module = AnsibleKeyfactorModule(
         argument_spec=argument_spec,
         mutually_exclusive=mutually_exclusive_args,
-        supports_check_mode=True
+        required_one_of=[["name", "certificate_authorities"]],
+        required_together=[["name", "host_name", "forest_root"]],
+        supports_check_mode=True,
+        supports_instances=True
     )
 
+    module.handleInstances(lambda: handleModule(module))
+
+def handleModule(module):
+    # seed the result dict in the object
+    result = dict(
+        changed=False
+    )
+
+    if handleFingerprintLookup(module, 'certificate_authority'):
+        result['fingerprint_hit'] = True
+        module.exit_json(**result)
+
+    if module.params['certificate_authorities'] is not None:
+        result['changes'] = handleBulk(module)
+        result['changed'] = any(change['changed'] for change in result['changes'])
+        errors = [change for change in result['changes'] if change['error']]
+        if errors:
+            module.fail_json(msg=str(len(errors)) + ' certificate authority changes failed.', **result)
+        handleFingerprint(module)
+        module.exit_json(**result)
+
     # if the user is working with this module in only check mode we do not
     # want to make any changes to the environment, just return the current
     # state with no modifications
@@ -203,55 +259,36 @@ def run_module():
         msg = "Module Does Not Support State: " + module.params["state"]
         module.fail_json(msg=msg)
 
+    handleFingerprint(module)
     module.exit_json(**result)
 
+def handleFingerprint(module):
+    keys = [createKey({'HostName': params['host_name'], 'LogicalName': params['name'], 'ForestRoot': params['forest_root']})
+        for params in module.params['certificate_authorities'] or [module.params]]
+    handleFingerprintSave(module, 'certificate_authority',
+        lambda: [ca for ca in handleList(module, module.params['src']) if createKey(ca) in keys])
+
+def handleBulk(module):
+    requested = []
+    for params in module.params['certificate_authorities']:
+        payload, msg = createStatePayload(params)
+        if msg:
+            module.fail_json(msg=params['host_name'] + '\\' + params['name'] + ': ' + msg)
+        requested.append((params['state'], payload))
+
+    url = module.params.get('src')
+    try:
+        current = handleList(module, url)
+    except KeyfactorApiError as e:
+        module.fail_json(msg=e.message)
+    changes = createChanges(current, requested)
+    module.handleChanges(changes, lambda change: applyChange(module, url, change), module.params['concurrency'])
+    return createChangeReport(changes)
+
 def createPayload(module):
-    payload = {
-        "LogicalName": module.params["name"],
-        "HostName": module.params["host_name"],
-        "ForestRoot": module.params["forest_root"],
-        "AllowedEnrollmentTypes": module.params["allowed_enrollment_types"],
-        "RFCEnforcement": module.params["rfc_enforcement"],
-        "Standalone": module.params["standalone"],
-        "Properties": "{\"syncExternal\":false}",
-        "Remote": False,
-        "Agent": module.params["orchestrator"],
-        "KeyRetention": module.params["key_retention"],
-        "KeyRetentionDays": module.params["key_retention_days"],
-        "MonitorThresholds": module.params["monitor"],
-        "IssuanceMax": module.params["issuance_max"],
-        "IssuanceMin": module.params["issuance_min"],
-        "DenialMax": module.params["denial_max"],
-        "FailureMax": module.params["failure_max"],
-        "UseAllowedRequesters": module.params["use_allowed_requesters"],
-        "AllowedRequesters": module.params["allowed_requesters"],
-        "Delegate": module.params["delegate"]
-    }
-    if module.params.get("sync_external_certificates"):
-        payload["Properties"] = "{\"syncExternal\":true}"
-    if module.params.get("orchestrator"):
-        payload["Remote"] = True
-    if module.params.get("key_retention") in (0, 1):
-        payload["KeyRetentionDays"] = None
-    if module.params.get("monitor") != False:
-        if not all([
-            module.params.get("issuance_max"),
-            module.params.get("issuance_min"),
-            module.params.get("denial_max"),
-            module.params.get("failure_max"),
-            ]):
-            msg = "Please provide proper values for issuance_max, issuance_min, denial_max, failure_max."
-            module.fail_json(msg=msg)
-        elif module.params.get("issuance_min") > module.params.get("issuance_max"):
-            msg = "Issuance Less Than: \"Greater Than\" threshold cannot be smaller than \"Less Than\" threshold"
-            module.fail_json(msg=msg)
-    else:
-        payload["IssuanceMax"] = None
-        payload["IssuanceMin"] = None
-        payload["DenialMax"] = None
-        payload["FailureMax"] = None
-    if not module.params.get("use_allowed_requesters"):
-        payload["AllowedRequesters"] = []
+    payload, msg = createStatePayload(module.params)
+    if msg:
+        module.fail_json(msg=msg)
     return payload
 
 def handleCheckMode(module):
@@ -266,36 +303,6 @@ def handleCheckMode(module):
             return True
         return False
 
-def createState(current):
-    return {
-            "LogicalName": current.get("LogicalName"),
-            "HostName": current.get("HostName"),
-            "ForestRoot": current.get("ForestRoot"),
-            "AllowedEnrollmentTypes": current.get("AllowedEnrollmentTypes"),
-            "RFCEnforcement": current.get("RFCEnforcement"),
-            "Standalone": current.get("Standalone"),
-            "Properties": current.get("Properties"),
-            "Remote": current.get("Remote"),
-            "Agent": current.get("Agent"),
-            "KeyRetention": current.get("KeyRetention"),
-            "KeyRetentionDays": current.get("KeyRetentionDays"),
-            "MonitorThresholds": current.get("MonitorThresholds"),
-            "IssuanceMax": current.get("IssuanceMax"),
-            "IssuanceMin": current.get("IssuanceMin"),
-            "DenialMax": current.get("DenialMax"),
-            "FailureMax": current.get("FailureMax"),
-            "Delegate": current.get("Delegate"),
-            'UseAllowedRequesters': current.get("UseAllowedRequesters"),
-            "AllowedRequesters": current.get("AllowedRequesters"),
-           }
-
-def compareState(current, requested):
-  current = createState(current)
-  for k,v in current.items():
-    if v != requested.get(k):
-      return False
-  return True
-
 def handleStatePresent(module):
     current = handleGet(module)
     payload=createPayload(module)
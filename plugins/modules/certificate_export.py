@@ -0,0 +1,271 @@
+#!/usr/bin/python
+
+DOCUMENTATION = '''
+---
+module: certificate_export
+
+short_description: This module exports keyfactor certificates to a file
+
+version_added: "2.11"
+
+description:
+    - This module pages through the certificates matching a keyfactor query and writes every page straight to dest as
+      NDJSON (one certificate per line) or CSV, so memory stays at one page whatever the size of the inventory.
+    - Certificates are read in ascending Id order. After each page is written a checkpoint file records the last Id,
+      the number of rows and the size of dest. An interrupted export run again with the same options resumes after
+      the last checkpointed page instead of starting over.
+    - With compress each page is written as its own gzip member. The result is a regular gzip file and a resumed
+      export can cut it back to the last checkpoint.
+    - Only an incomplete export is resumed. When the checkpoint records a completed export, every run starts a new one.
+
+options:
+    dest:
+        description:
+            - File the certificates are written to
+        required: true
+    format:
+        description:
+            - ndjson or csv. Default ndjson
+        required: false
+    compress:
+        description:
+            - Whether dest is gzip compressed. Default False
+        required: false
+    query:
+        description:
+            - Keyfactor query, for example CN -contains "Pod Collection". Default all certificates
+        required: false
+    fields:
+        description:
+            - Certificate fields to export. Default every field for ndjson and a set of common fields for csv
+        required: false
+    include_metadata:
+        description:
+            - Whether keyfactor returns metadata. Default False
+        required: false
+    include_locations:
+        description:
+            - Whether keyfactor returns certificate store locations. Default False
+        required: false
+    page_size:
+        description:
+            - Certificates requested per page. Default 1000
+        required: false
+    checkpoint:
+        description:
+            - Checkpoint file. Default dest with .checkpoint appended
+        required: false
+    restart:
+        description:
+            - Discard the checkpoint of an incomplete export and export from the start. Default False
+        required: false
+    src:
+        description:
+            - Name of the Virtual Directory, Default: KeyfactorAPI
+        required: false
+
+author:
+    - Sulav Acharya (@sulavacharya-inf)
+'''
+
+EXAMPLES = '''
+- name: Nightly certificate inventory
+  keyfactor.platform.certificate_export:
+    dest: /var/lib/keyfactor/certificates.ndjson.gz
+    compress: True
+    include_metadata: True
+  register: export
+
+- name: Expiring certificates as CSV
+  keyfactor.platform.certificate_export:
+    dest: /tmp/expiring.csv
+    format: csv
+    query: 'NotAfter -le "%TODAY+30%"'
+    fields:
+      - Id
+      - IssuedCN
+      - Thumbprint
+      - NotAfter
+'''
+
+RETURN = '''
+changed:
+    description: Whether dest was written
+    type: bool
+    returned: always
+dest:
+    description: The exported file
+    type: str
+    returned: always
+rows:
+    description: Number of certificates in dest
+    type: int
+    returned: always
+pages:
+    description: Number of pages written by this run
+    type: int
+    returned: always
+resumed:
+    description: Whether this run continued an interrupted export
+    type: bool
+    returned: always
+elapsed:
+    description: Seconds spent by this run
+    type: float
+    returned: always
+rows_per_second:
+    description: Certificates written per second by this run
+    type: float
+    returned: always
+'''
+
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule, KeyfactorApiError, readJsonFile, writeJsonAtomic
+from ansible_collections.keyfactor.platform.plugins.module_utils.certificates import handleCertificatePages, projectCertificate
+
+CSV_FIELDS = ['Id', 'Thumbprint', 'SerialNumber', 'IssuedDN', 'IssuedCN', 'IssuerDN', 'NotBefore', 'NotAfter',
+    'CertState', 'KeyType', 'KeySizeInBits', 'TemplateName']
+
+def run_module():
+
+    argument_spec = dict(
+        dest=dict(type='path', required=True),
+        format=dict(type='str', required=False, default='ndjson', choices=['ndjson', 'csv']),
+        compress=dict(type='bool', required=False, default=False),
+        query=dict(type='str', required=False, default=''),
+        fields=dict(type='list', elements='str', required=False),
+        include_metadata=dict(type='bool', required=False, default=False),
+        include_locations=dict(type='bool', required=False, default=False),
+        page_size=dict(type='int', required=False, default=1000),
+        checkpoint=dict(type='path', required=False),
+        restart=dict(type='bool', required=False, default=False),
+        src=dict(type='str', required=False, default="KeyfactorAPI")
+    )
+
+    # seed the result dict in the object
+    result = dict(
+        changed=False,
+        dest='',
+        rows=0,
+        pages=0,
+        resumed=False,
+        elapsed=0.0,
+        rows_per_second=0.0
+    )
+
+    module = AnsibleKeyfactorModule(
+        argument_spec=argument_spec,
+        supports_check_mode=True
+    )
+
+    dest = module.params['dest']
+    checkpointPath = module.params['checkpoint'] or dest + '.checkpoint'
+    result['dest'] = dest
+    fields = module.params['fields'] or (CSV_FIELDS if module.params['format'] == 'csv' else None)
+    options = createExportOptions(module, fields)
+
+    checkpoint = readCheckpoint(module, checkpointPath, dest, options)
+    # A completed export is what the last run left, a new run exports again
+    if checkpoint and checkpoint['complete']:
+        checkpoint = None
+
+    result['changed'] = True
+    result['resumed'] = checkpoint is not None
+    if module.check_mode:
+        module.exit_json(**result)
+
+    if checkpoint is None:
+        checkpoint = dict(options=options, last_id=None, rows=0, size=0, complete=False)
+
+    start = time.time()
+    written = 0
+    with open(dest, 'r+b' if result['resumed'] else 'wb') as f:
+        # Anything past the checkpoint was written by a page that was not
+        # recorded and is read again
+        f.truncate(checkpoint['size'])
+        f.seek(checkpoint['size'])
+        if not result['resumed'] and module.params['format'] == 'csv':
+            handleWrite(module, f, createCsv([fields]), checkpointPath, checkpoint)
+        try:
+            pages = handleCertificatePages(module.handleJsonRequest, module.params['src'], module.params['query'],
+                page_size=module.params['page_size'],
+                after_id=checkpoint['last_id'],
+                include_metadata=module.params['include_metadata'],
+                include_locations=module.params['include_locations'])
+            for page in pages:
+                checkpoint['last_id'] = page[-1]['Id']
+                checkpoint['rows'] += len(page)
+                handleWrite(module, f, createPage(module, page, fields), checkpointPath, checkpoint)
+                written += len(page)
+                result['pages'] += 1
+        except KeyfactorApiError as e:
+            result['rows'] = checkpoint['rows']
+            module.fail_json(msg=e.message + ' The export stopped after ' + str(checkpoint['rows'])
+                + ' certificates and resumes from there when run again.', **result)
+
+    checkpoint['complete'] = True
+    writeJsonAtomic(checkpointPath, checkpoint)
+    result['rows'] = checkpoint['rows']
+    result['elapsed'] = round(time.time() - start, 3)
+    result['rows_per_second'] = round(written / result['elapsed'], 1) if result['elapsed'] else float(written)
+    module.exit_json(**result)
+
+def createExportOptions(module, fields):
+    # Options that shape the content of dest; a checkpoint taken with other
+    # options is not resumed
+    keys = ('format', 'compress', 'query', 'include_metadata', 'include_locations', 'src')
+    options = dict((key, module.params[key]) for key in keys)
+    options['url'] = module.params['url']
+    options['fields'] = fields
+    return options
+
+def readCheckpoint(module, path, dest, options):
+    if module.params['restart']:
+        return None
+    checkpoint = readJsonFile(path)
+    if not checkpoint or checkpoint.get('options') != options:
+        return None
+    # dest shorter than recorded was replaced or truncated since
+    if not os.path.exists(dest) or os.path.getsize(dest) < checkpoint['size']:
+        return None
+    return checkpoint
+
+def createPage(module, page, fields):
+    rows = [projectCertificate(certificate, fields) for certificate in page]
+    if module.params['format'] == 'csv':
+        return createCsv([[createCsvValue(row.get(field)) for field in fields] for row in rows])
+    return ''.join(json.dumps(row, sort_keys=True) + '\n' for row in rows).encode('utf-8')
+
+def createCsv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerows(rows)
+    return buffer.getvalue().encode('utf-8')
+
+def createCsvValue(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True)
+    return value
+
+def handleWrite(module, f, data, checkpointPath, checkpoint):
+    if module.params['compress']:
+        data = gzip.compress(data)
+    f.write(data)
+    f.flush()
+    os.fsync(f.fileno())
+    checkpoint['size'] = f.tell()
+    writeJsonAtomic(checkpointPath, checkpoint)
+
+import csv
+import gzip
+import io
+import json
+import os
+import time
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
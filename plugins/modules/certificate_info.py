@@ -0,0 +1,152 @@
+#!/usr/bin/python
+
+DOCUMENTATION = '''
+---
+module: certificate_info
+
+short_description: This module searches keyfactor certificates
+
+version_added: "2.11"
+
+description:
+    - This module runs a keyfactor certificate query and returns the matching certificates.
+    - Certificates are read page by page and only the requested fields of each certificate are kept, so memory follows
+      the size of the projected result rather than of the raw pages.
+    - Metadata and locations are left out of the responses unless asked for.
+    - Stops after limit certificates. Set limit to 0 to read every match.
+    - This module does not change anything and supports check mode.
+
+options:
+    query:
+        description:
+            - Keyfactor query, for example CN -contains "Pod Collection". Default all certificates
+        required: false
+    collection:
+        description:
+            - Name of a collection whose query is combined with query
+        required: false
+    fields:
+        description:
+            - Certificate fields to return, for example Id, IssuedCN, Thumbprint and NotAfter. Default every field
+        required: false
+    include_metadata:
+        description:
+            - Whether keyfactor returns metadata. Default False
+        required: false
+    include_locations:
+        description:
+            - Whether keyfactor returns certificate store locations. Default False
+        required: false
+    limit:
+        description:
+            - Maximum number of certificates returned, 0 for no limit. Default 1000
+        required: false
+    page_size:
+        description:
+            - Certificates requested per page. Default 500
+        required: false
+    src:
+        description:
+            - Name of the Virtual Directory, Default: KeyfactorAPI
+        required: false
+
+author:
+    - Sulav Acharya (@sulavacharya-inf)
+'''
+
+EXAMPLES = '''
+- name: Certificates of the pod collection expiring this quarter
+  keyfactor.platform.certificate_info:
+    collection: "Pod Collection"
+    query: 'NotAfter -le "%TODAY+90%"'
+    fields:
+      - Id
+      - IssuedCN
+      - NotAfter
+  register: pod_certificates
+'''
+
+RETURN = '''
+changed:
+    description: Always False
+    type: bool
+    returned: always
+certificates:
+    description: The matching certificates, holding only the requested fields
+    type: list
+    returned: always
+count:
+    description: Number of certificates returned
+    type: int
+    returned: always
+truncated:
+    description: Whether more certificates matched than limit
+    type: bool
+    returned: always
+'''
+
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule, KeyfactorApiError
+from ansible_collections.keyfactor.platform.plugins.module_utils.certificates import handleCertificateSearch, projectCertificate
+from ansible_collections.keyfactor.platform.plugins.module_utils.certificate_collections import handleList as handleListCollections
+
+def run_module():
+
+    argument_spec = dict(
+        query=dict(type='str', required=False, default=''),
+        collection=dict(type='str', required=False),
+        fields=dict(type='list', elements='str', required=False),
+        include_metadata=dict(type='bool', required=False, default=False),
+        include_locations=dict(type='bool', required=False, default=False),
+        limit=dict(type='int', required=False, default=1000),
+        page_size=dict(type='int', required=False, default=500),
+        src=dict(type='str', required=False, default="KeyfactorAPI")
+    )
+
+    # seed the result dict in the object
+    result = dict(
+        changed=False,
+        certificates=[],
+        count=0,
+        truncated=False
+    )
+
+    module = AnsibleKeyfactorModule(
+        argument_spec=argument_spec,
+        supports_check_mode=True
+    )
+
+    try:
+        query = createQuery(module)
+        limit = module.params['limit'] or None
+        # One certificate past the limit tells whether the result is truncated
+        search = handleCertificateSearch(module.handleJsonRequest, module.params['src'], query,
+            page_size=module.params['page_size'],
+            include_metadata=module.params['include_metadata'],
+            include_locations=module.params['include_locations'],
+            limit=limit + 1 if limit else None)
+        for certificate in search:
+            if limit and len(result['certificates']) == limit:
+                result['truncated'] = True
+                break
+            result['certificates'].append(projectCertificate(certificate, module.params['fields']))
+    except KeyfactorApiError as e:
+        module.fail_json(msg=e.message)
+
+    result['count'] = len(result['certificates'])
+    module.exit_json(**result)
+
+def createQuery(module):
+    query = module.params['query']
+    if not module.params['collection']:
+        return query
+    collection = [c for c in handleListCollections(module, module.params['src']) if c['Name'] == module.params['collection']]
+    if not collection:
+        module.fail_json(msg='Certificate Collections with Name \'' + module.params['collection'] + '\' does not exist.')
+    content = collection[0].get('Content') or ''
+    return ' AND '.join('(' + part + ')' for part in (content, query) if part)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
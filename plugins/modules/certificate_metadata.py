@@ -0,0 +1,193 @@
+#!/usr/bin/python
+
+DOCUMENTATION = '''
+---
+module: certificate_metadata
+
+short_description: This module sets metadata on existing keyfactor certificates
+
+version_added: "2.11"
+
+description:
+    - This module sets metadata fields on the certificates given by id or selected by a keyfactor query, for example to
+      record a new owner on every certificate of a team.
+    - The selected certificates are paged through with their metadata, and only their id and the fields being set are
+      kept. Certificates whose fields already hold the requested values are skipped, so a rerun only reads.
+    - The others are updated with the bulk metadata endpoint, chunk_size certificates per request with up to
+      concurrency requests at a time.
+    - A field set to an empty value is cleared.
+    - Supports check mode, which reports the certificates that would be updated.
+
+options:
+    ids:
+        description:
+            - Ids of the certificates to update
+        required: false
+    query:
+        description:
+            - Keyfactor query selecting the certificates to update
+        required: false
+    metadata:
+        description:
+            - Metadata field names and the values they should hold
+        required: true
+    chunk_size:
+        description:
+            - Certificates updated per request. Default 500
+        required: false
+    concurrency:
+        description:
+            - Number of requests sent in parallel. Default 4
+        required: false
+    page_size:
+        description:
+            - Certificates requested per page. Default 1000
+        required: false
+    src:
+        description:
+            - Name of the Virtual Directory, Default: KeyfactorAPI
+        required: false
+
+author:
+    - Sulav Acharya (@sulavacharya-inf)
+'''
+
+EXAMPLES = '''
+- name: Hand the web certificates over to the platform team
+  keyfactor.platform.certificate_metadata:
+    query: 'CN -contains ".web.example.com"'
+    metadata:
+      Owner: platform-team@example.com
+      CostCenter: "4711"
+'''
+
+RETURN = '''
+changed:
+    description: Whether any certificate was updated
+    type: bool
+    returned: always
+selected:
+    description: Number of certificates selected
+    type: int
+    returned: always
+unchanged:
+    description: Number of selected certificates whose metadata already matched
+    type: int
+    returned: always
+updated:
+    description: Ids of the certificates updated, or that would be in check mode
+    type: list
+    returned: always
+errors:
+    description: Certificates that could not be updated, with id and error
+    type: list
+    returned: always
+'''
+
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule, KeyfactorApiError
+from ansible_collections.keyfactor.platform.plugins.module_utils.certificates import createChunks, handleCertificatePages, handleCertificatesByField
+
+def run_module():
+
+    argument_spec = dict(
+        ids=dict(type='list', elements='int', required=False, default=[]),
+        query=dict(type='str', required=False),
+        metadata=dict(type='dict', required=True),
+        chunk_size=dict(type='int', required=False, default=500),
+        concurrency=dict(type='int', required=False, default=4),
+        page_size=dict(type='int', required=False, default=1000),
+        src=dict(type='str', required=False, default="KeyfactorAPI")
+    )
+
+    # seed the result dict in the object
+    result = dict(
+        changed=False,
+        selected=0,
+        unchanged=0,
+        updated=[],
+        errors=[]
+    )
+
+    module = AnsibleKeyfactorModule(
+        argument_spec=argument_spec,
+        required_one_of=[('ids', 'query')],
+        supports_check_mode=True
+    )
+
+    requested = dict((name, createMetadataValue(value)) for name, value in module.params['metadata'].items())
+    try:
+        selected, pending = handleSelect(module, requested)
+    except KeyfactorApiError as e:
+        module.fail_json(msg='Unable to read the certificates: ' + e.message, **result)
+
+    missing = [id for id in module.params['ids'] if id not in selected]
+    if missing:
+        module.fail_json(msg='Certificates not found: ' + ', '.join(str(id) for id in missing) + '. Nothing was updated.', **result)
+
+    result['selected'] = len(selected)
+    result['unchanged'] = len(selected) - len(pending)
+    if module.check_mode:
+        result['updated'] = pending
+        result['changed'] = bool(pending)
+        module.exit_json(**result)
+
+    handleUpdate(module, requested, pending, result)
+    result['changed'] = bool(result['updated'])
+    if result['errors']:
+        module.fail_json(msg=str(len(result['errors'])) + ' of ' + str(len(pending)) + ' certificates were not updated.', **result)
+    module.exit_json(**result)
+
+def createMetadataValue(value):
+    # Command holds every metadata value as a string, empty when unset
+    if value is None:
+        return ''
+    return str(value)
+
+def createProjection(certificate, requested):
+    # The requested fields of a certificate as they are now
+    metadata = certificate.get('Metadata') or {}
+    return dict((name, createMetadataValue(metadata.get(name))) for name in requested)
+
+def handleSelect(module, requested):
+    # Returns the ids of the selected certificates and, sorted, of those
+    # whose metadata differs. Nothing else is kept of a page once read.
+    request = module.handleJsonRequest
+    src = module.params['src']
+    selected = set()
+    pending = set()
+
+    def handleCertificate(certificate):
+        selected.add(certificate['Id'])
+        if createProjection(certificate, requested) != requested:
+            pending.add(certificate['Id'])
+
+    if module.params['ids']:
+        for certificate in handleCertificatesByField(request, src, 'Id', set(module.params['ids']), include_metadata=True):
+            handleCertificate(certificate)
+    if module.params['query']:
+        pages = handleCertificatePages(request, src, module.params['query'], page_size=module.params['page_size'], include_metadata=True)
+        for page in pages:
+            for certificate in page:
+                handleCertificate(certificate)
+    return selected, sorted(pending)
+
+def handleUpdate(module, requested, pending, result):
+    chunks = createChunks(pending, module.params['chunk_size'])
+
+    def update(ids):
+        return module.handleJsonRequest("PUT", module.params['src'] + '/Certificates/Metadata/All', {
+            "CertificateIds": ids,
+            "Metadata": requested
+        })
+
+    for ids, (value, error) in zip(chunks, module.handleConcurrent(update, chunks, module.params['concurrency'])):
+        if error:
+            result['errors'].extend({'id': id, 'error': error} for id in ids)
+        else:
+            result['updated'].extend(ids)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/python
+
+DOCUMENTATION = '''
+---
+module: certificate_revoke
+
+short_description: This module revokes keyfactor certificates in batches
+
+version_added: "2.11"
+
+description:
+    - This module revokes the certificates given by id, thumbprint or a keyfactor query.
+    - Ids and thumbprints are resolved with one search per chunk of values and a query is paged through, so every
+      certificate is known with its state and CA before anything is revoked. Certificates already revoked are left alone
+      and a missing id or thumbprint fails the task before any revocation is sent.
+    - Revocations are sent batch_size certificates per request, with up to concurrency requests at a time.
+    - With publish_crl the CRL of every CA that revoked at least one certificate is published once afterwards.
+    - max_certificates guards against a query that matches more than intended.
+    - Supports check mode, which resolves the certificates and reports those that would be revoked.
+
+options:
+    ids:
+        description:
+            - Ids of the certificates to revoke
+        required: false
+    thumbprints:
+        description:
+            - Thumbprints of the certificates to revoke
+        required: false
+    query:
+        description:
+            - Keyfactor query selecting the certificates to revoke
+        required: false
+    reason:
+        description:
+            - unspecified, key_compromise, ca_compromise, affiliation_changed, superseded, cessation_of_operation or
+              certificate_hold. Default unspecified
+        required: false
+    comment:
+        description:
+            - Comment recorded with the revocation
+        required: true
+    effective_date:
+        description:
+            - When the revocation takes effect, ISO 8601. Default now
+        required: false
+    publish_crl:
+        description:
+            - Publish the CRL of every CA that revoked a certificate. Default False
+        required: false
+    batch_size:
+        description:
+            - Certificates revoked per request. Default 100
+        required: false
+    concurrency:
+        description:
+            - Number of requests sent in parallel. Default 4
+        required: false
+    max_certificates:
+        description:
+            - Fail without revoking anything when more certificates are selected, 0 for no limit. Default 1000
+        required: false
+    src:
+        description:
+            - Name of the Virtual Directory, Default: KeyfactorAPI
+        required: false
+
+author:
+    - Sulav Acharya (@sulavacharya-inf)
+'''
+
+EXAMPLES = '''
+- name: Revoke everything issued for a compromised host
+  keyfactor.platform.certificate_revoke:
+    query: 'CN -contains "web01.example.com"'
+    reason: key_compromise
+    comment: "INC-1234"
+    publish_crl: True
+
+- name: Revoke by thumbprint
+  keyfactor.platform.certificate_revoke:
+    thumbprints:
+      - 3A1F0C2E9D0B7A34C6E5F1D2B8A9C0E1F2A3B4C5
+    comment: "Superseded by the renewed certificate"
+    reason: superseded
+'''
+
+RETURN = '''
+changed:
+    description: Whether any certificate was revoked
+    type: bool
+    returned: always
+certificates:
+    description: One entry per selected certificate with its id, thumbprint, cn, status and error. status is revoked,
+        already_revoked, would_revoke, failed or not_found
+    type: list
+    returned: always
+crls:
+    description: CRL publication per CA, published or the error
+    type: dict
+    returned: always
+revoked:
+    description: Number of certificates revoked
+    type: int
+    returned: always
+'''
+
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule, KeyfactorApiError
+from ansible_collections.keyfactor.platform.plugins.module_utils.certificates import createChunks, handleCertificatePages, handleCertificatesByField
+from ansible_collections.keyfactor.platform.plugins.module_utils.certificate_authorities import handleList as handleListAuthorities
+
+REASONS = {
+    'unspecified': 0,
+    'key_compromise': 1,
+    'ca_compromise': 2,
+    'affiliation_changed': 3,
+    'superseded': 4,
+    'cessation_of_operation': 5,
+    'certificate_hold': 6
+}
+REVOKED = 2
+
+def run_module():
+
+    argument_spec = dict(
+        ids=dict(type='list', elements='int', required=False, default=[]),
+        thumbprints=dict(type='list', elements='str', required=False, default=[]),
+        query=dict(type='str', required=False),
+        reason=dict(type='str', required=False, default='unspecified', choices=list(REASONS)),
+        comment=dict(type='str', required=True),
+        effective_date=dict(type='str', required=False),
+        publish_crl=dict(type='bool', required=False, default=False),
+        batch_size=dict(type='int', required=False, default=100),
+        concurrency=dict(type='int', required=False, default=4),
+        max_certificates=dict(type='int', required=False, default=1000),
+        src=dict(type='str', required=False, default="KeyfactorAPI")
+    )
+
+    # seed the result dict in the object
+    result = dict(
+        changed=False,
+        certificates=[],
+        crls={},
+        revoked=0
+    )
+
+    module = AnsibleKeyfactorModule(
+        argument_spec=argument_spec,
+        required_one_of=[('ids', 'thumbprints', 'query')],
+        supports_check_mode=True
+    )
+
+    try:
+        entries = handleResolve(module)
+    except KeyfactorApiError as e:
+        module.fail_json(msg='Unable to resolve the certificates: ' + e.message, **result)
+    result['certificates'] = entries
+
+    missing = [entry for entry in entries if entry['status'] == 'not_found']
+    if missing:
+        module.fail_json(msg='Certificates not found: ' + ', '.join(str(entry['id'] or entry['thumbprint']) for entry in missing)
+            + '. Nothing was revoked.', **result)
+    limit = module.params['max_certificates']
+    if limit and len(entries) > limit:
+        module.fail_json(msg=str(len(entries)) + ' certificates selected, more than max_certificates (' + str(limit)
+            + '). Nothing was revoked.', certificates=[], crls={}, revoked=0)
+
+    pending = [entry for entry in entries if entry['status'] == 'pending']
+    if module.check_mode:
+        for entry in pending:
+            entry['status'] = 'would_revoke'
+        result['changed'] = bool(pending)
+        module.exit_json(**result)
+
+    handleRevoke(module, pending)
+    result['revoked'] = len([entry for entry in pending if entry['status'] == 'revoked'])
+    result['changed'] = result['revoked'] > 0
+    if module.params['publish_crl'] and result['revoked']:
+        try:
+            result['crls'] = handlePublish(module, [entry for entry in pending if entry['status'] == 'revoked'])
+        except KeyfactorApiError as e:
+            module.fail_json(msg='Certificates revoked but the CRLs were not published: ' + e.message, **result)
+
+    failed = [entry for entry in entries if entry['status'] == 'failed']
+    crlErrors = [name for name, status in result['crls'].items() if status != 'published']
+    if failed or crlErrors:
+        msg = []
+        if failed:
+            msg.append(str(len(failed)) + ' of ' + str(len(pending)) + ' revocations failed')
+        if crlErrors:
+            msg.append('CRL publication failed for ' + ', '.join(sorted(crlErrors)))
+        module.fail_json(msg='; '.join(msg) + '.', **result)
+    module.exit_json(**result)
+
+def createEntry(certificate=None, id=None, thumbprint=None):
+    if certificate is None:
+        return {'id': id, 'thumbprint': thumbprint, 'cn': None, 'ca_id': None, 'status': 'not_found', 'error': None}
+    return {
+        'id': certificate['Id'],
+        'thumbprint': certificate.get('Thumbprint'),
+        'cn': certificate.get('IssuedCN'),
+        'ca_id': certificate.get('CertificateAuthorityId'),
+        'status': 'already_revoked' if certificate.get('CertState') == REVOKED else 'pending',
+        'error': None
+    }
+
+def handleResolve(module):
+    request = module.handleJsonRequest
+    src = module.params['src']
+    found = {}
+    entries = []
+    # Every certificate once, whichever ways it was selected
+    if module.params['ids']:
+        byId = dict((certificate['Id'], certificate) for certificate in handleCertificatesByField(request, src, 'Id', set(module.params['ids'])))
+        for id in module.params['ids']:
+            if id not in byId:
+                entries.append(createEntry(id=id))
+        found.update(byId)
+    if module.params['thumbprints']:
+        certificates = list(handleCertificatesByField(request, src, 'Thumbprint', set(t.upper() for t in module.params['thumbprints'])))
+        byThumbprint = dict(((certificate.get('Thumbprint') or '').upper(), certificate) for certificate in certificates)
+        for thumbprint in module.params['thumbprints']:
+            if thumbprint.upper() not in byThumbprint:
+                entries.append(createEntry(thumbprint=thumbprint))
+        found.update((certificate['Id'], certificate) for certificate in certificates)
+    if module.params['query']:
+        limit = module.params['max_certificates']
+        for page in handleCertificatePages(request, src, module.params['query']):
+            found.update((certificate['Id'], certificate) for certificate in page)
+            # Stop paging once the selection is known to be too large
+            if limit and len(found) > limit:
+                break
+    return [createEntry(found[id]) for id in sorted(found)] + entries
+
+def createPayload(module, ids):
+    payload = {
+        "CertificateIds": ids,
+        "Reason": REASONS[module.params['reason']],
+        "Comment": module.params['comment']
+    }
+    if module.params['effective_date']:
+        payload["EffectiveDate"] = module.params['effective_date']
+    return payload
+
+def handleRevoke(module, pending):
+    batches = createChunks(pending, module.params['batch_size'])
+
+    def revokeBatch(batch):
+        ids = [entry['id'] for entry in batch]
+        return parseResponse(module.handleJsonRequest("POST", module.params['src'] + '/Certificates/Revoke', createPayload(module, ids)), ids)
+
+    for batch, (errors, error) in zip(batches, module.handleConcurrent(revokeBatch, batches, module.params['concurrency'])):
+        for entry in batch:
+            entry['error'] = error or (errors or {}).get(entry['id'])
+            entry['status'] = 'failed' if entry['error'] else 'revoked'
+
+def parseResponse(response, ids):
+    # Returns {id: error} for the certificates of a batch that were not
+    # revoked. Command answers with the ids it revoked, or with the failed
+    # revocations, depending on the version.
+    if isinstance(response, list):
+        revoked = set(response)
+        return dict((id, 'Not revoked by keyfactor.') for id in ids if id not in revoked)
+    if isinstance(response, dict):
+        return dict((failure.get('CertificateId'), failure.get('Message') or failure.get('Reason') or 'Not revoked by keyfactor.')
+            for failure in response.get('Failures') or [])
+    return {}
+
+def handlePublish(module, revoked):
+    # One CRL publication per CA that revoked a certificate
+    authorities = dict((ca.get('Id'), ca) for ca in handleListAuthorities(module, module.params['src']))
+    crls = {}
+    targets = []
+    for ca_id in sorted(set(entry['ca_id'] for entry in revoked), key=str):
+        ca = authorities.get(ca_id)
+        if not ca:
+            crls[str(ca_id)] = 'Certificate authority ' + str(ca_id) + ' is not known to keyfactor.'
+            continue
+        targets.append(ca)
+
+    def publish(ca):
+        return module.handleJsonRequest("POST", module.params['src'] + '/CertificateAuthority/PublishCRL', {
+            "CertificateAuthorityLogicalName": ca['LogicalName'],
+            "CertificateAuthorityHostName": ca['HostName']
+        })
+
+    for ca, (value, error) in zip(targets, module.handleConcurrent(publish, targets, module.params['concurrency'])):
+        crls[ca['HostName'] + '\\' + ca['LogicalName']] = error or 'published'
+    return crls
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
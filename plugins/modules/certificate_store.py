@@ -0,0 +1,240 @@
+#!/usr/bin/python
+
+DOCUMENTATION = '''
+---
+module: certificate_store
+
+short_description: This module manages keyfactor certificate stores and schedules their jobs
+
+version_added: "2.11"
+
+description:
+    - This module creates, updates and deletes the certificate stores given in stores.
+    - The existing stores of the store types involved are read page by page once and diffed against the list, so only
+      stores that are missing or differ are written, with up to concurrency requests at a time.
+    - Stores are matched by client machine, store path and store type. Their orchestrator, container, create_if_missing
+      and the given properties are compared; other properties and the store password are left as they are. A store
+      listed more than once fails the task before anything is written.
+    - inventory_schedule sets the inventory schedule of every listed store with one request, sent only for the stores
+      whose schedule differs. An immediate inventory is always sent.
+    - reenrollment starts a reenrollment job on every listed store. In subject_name, {client_machine} and {store_path} are
+      replaced by those of each store.
+    - Supports check mode.
+
+options:
+    stores:
+        description:
+            - Certificate stores, with client_machine, store_path, store_type (name, short name or id), state (present
+              or absent), agent (machine name of the orchestrator, default client_machine), container_id,
+              create_if_missing and properties
+        required: true
+    inventory_schedule:
+        description:
+            - Inventory schedule of the stores, with one of immediate (bool), interval (minutes), daily (time, for
+              example 23:30) or off (bool)
+        required: false
+    reenrollment:
+        description:
+            - Reenrollment job started on every store, with subject_name, alias and job_properties
+        required: false
+    page_size:
+        description:
+            - Stores and orchestrators requested per page. Default 500
+        required: false
+    concurrency:
+        description:
+            - Number of requests sent in parallel. Default 10
+        required: false
+    src:
+        description:
+            - Name of the Virtual Directory, Default: KeyfactorAPI
+        required: false
+
+author:
+    - Sulav Acharya (@sulavacharya-inf)
+
+extends_documentation_fragment:
+    - keyfactor.platform.instances
+'''
+
+EXAMPLES = '''
+- name: IIS stores of the web farm with an hourly inventory
+  keyfactor.platform.certificate_store:
+    stores:
+      - client_machine: web01.example.com
+        store_path: IIS Personal
+        store_type: IISU
+      - client_machine: web02.example.com
+        store_path: IIS Personal
+        store_type: IISU
+        agent: orchestrator01.example.com
+    inventory_schedule:
+      interval: 60
+
+- name: Inventory the stores now
+  keyfactor.platform.certificate_store:
+    stores:
+      - client_machine: web01.example.com
+        store_path: IIS Personal
+        store_type: IISU
+    inventory_schedule:
+      immediate: True
+'''
+
+RETURN = '''
+changed:
+    description: Whether any store was written or any job scheduled
+    type: bool
+    returned: always
+changes:
+    description: One entry per store with name, action, changed and error
+    type: list
+    returned: always
+stores:
+    description: Id of every present store by name
+    type: dict
+    returned: always
+scheduled:
+    description: Names of the stores whose inventory schedule was set
+    type: list
+    returned: always
+reenrollment:
+    description: One entry per store with name and error
+    type: list
+    returned: always
+'''
+
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule, KeyfactorApiError, createChangeReport
+from ansible_collections.keyfactor.platform.plugins.module_utils.certificate_stores import applyChange, createChanges, createSchedule, createScheduleSpec, createStoreSpec, findDuplicates, handleList, handleListAgents, handleReenrollment, handleSchedule
+from ansible_collections.keyfactor.platform.plugins.module_utils.store_types import handleList as handleListStoreTypes
+
+def run_module():
+
+    argument_spec = dict(
+        stores=dict(type='list', elements='dict', required=True, options=createStoreSpec()),
+        inventory_schedule=dict(type='dict', required=False, options=createScheduleSpec(),
+            mutually_exclusive=[['immediate', 'interval', 'daily', 'off']],
+            required_one_of=[['immediate', 'interval', 'daily', 'off']]),
+        reenrollment=dict(type='dict', required=False, options=dict(
+            subject_name=dict(type='str', required=True),
+            alias=dict(type='str', required=False),
+            job_properties=dict(type='dict', required=False)
+        )),
+        page_size=dict(type='int', required=False, default=500),
+        concurrency=dict(type='int', required=False, default=10),
+        src=dict(type='str', required=False, default="KeyfactorAPI")
+    )
+
+    module = AnsibleKeyfactorModule(
+        argument_spec=argument_spec,
+        supports_check_mode=True,
+        supports_instances=True
+    )
+
+    module.handleInstances(lambda: handleModule(module))
+
+def handleModule(module):
+    # seed the result dict in the object
+    result = dict(
+        changed=False,
+        changes=[],
+        stores={},
+        scheduled=[],
+        reenrollment=[]
+    )
+
+    src = module.params['src']
+    try:
+        changes, current = handlePlan(module, src)
+    except KeyfactorApiError as e:
+        module.fail_json(msg=e.message, **result)
+
+    module.handleChanges(changes, lambda change: applyChange(module, src, change), module.params['concurrency'])
+    result['changes'] = createChangeReport(changes)
+    result['changed'] = any(change['changed'] for change in result['changes'])
+    errors = [change for change in result['changes'] if change['error']]
+
+    # Stores present after the changes, with the agent they belong to
+    targets = []
+    for change, params in zip(changes, module.params['stores']):
+        if params['state'] == 'present' and not change.get('error'):
+            result['stores'][change['name']] = change.get('id')
+            targets.append({
+                'name': change['name'],
+                'id': change.get('id'),
+                'agent_id': change['payload']['AgentId'] if 'payload' in change else change['current'].get('AgentId'),
+                'current': current.get(change.get('id'), {}),
+                'params': params
+            })
+
+    if module.params['inventory_schedule']:
+        handleInventory(module, src, targets, result)
+    if module.params['reenrollment']:
+        handleReenrollments(module, src, targets, result)
+
+    failed = [entry for entry in result['reenrollment'] if entry['error']]
+    if errors or failed or result.get('msg'):
+        msg = [result.pop('msg')] if result.get('msg') else []
+        if errors:
+            msg.append(str(len(errors)) + ' certificate store changes failed')
+        if failed:
+            msg.append(str(len(failed)) + ' reenrollment jobs failed')
+        module.fail_json(msg='; '.join(msg) + '.', **result)
+    module.exit_json(**result)
+
+def handlePlan(module, src):
+    storeTypes = handleListStoreTypes(module, src)
+    storeTypeIds = {}
+    for storeType in storeTypes:
+        for name in (str(storeType['StoreType']), storeType.get('ShortName'), storeType.get('Name')):
+            if name:
+                storeTypeIds[name] = storeType['StoreType']
+    duplicates = findDuplicates(module.params['stores'], storeTypeIds)
+    if duplicates:
+        raise KeyfactorApiError('Certificate stores listed more than once: ' + ', '.join(duplicates) + '.')
+    requestedTypes = [storeTypeIds[params['store_type']] for params in module.params['stores'] if params['store_type'] in storeTypeIds]
+
+    agentIds = {}
+    if any(params['state'] == 'present' for params in module.params['stores']):
+        agentIds = dict((agent['ClientMachine'].lower(), agent['AgentId'])
+            for agent in handleListAgents(module, src, module.params['page_size']) if agent.get('ClientMachine'))
+    current = list(handleList(module, src, requestedTypes, module.params['page_size'])) if requestedTypes else []
+    changes = createChanges(current, module.params['stores'], storeTypeIds, agentIds)
+    return changes, dict((store['Id'], store) for store in current)
+
+def handleInventory(module, src, targets, result):
+    schedule = createSchedule(module.params['inventory_schedule'])
+    # Stores created in check mode have no id yet but would be scheduled
+    pending = [target for target in targets
+        if schedule.get('Immediate') or not target['current'] or (target['current'].get('InventorySchedule') or {}) != schedule]
+    if not pending:
+        return
+    result['scheduled'] = [target['name'] for target in pending]
+    result['changed'] = True
+    if module.check_mode:
+        return
+    try:
+        handleSchedule(module, src, [target['id'] for target in pending], schedule)
+    except KeyfactorApiError as e:
+        result['scheduled'] = []
+        result['msg'] = 'Unable to schedule the inventory: ' + e.message
+
+def handleReenrollments(module, src, targets, result):
+    params = dict(module.params['reenrollment'])
+    result['changed'] = result['changed'] or bool(targets)
+    if module.check_mode:
+        result['reenrollment'] = [{'name': target['name'], 'error': None} for target in targets]
+        return
+
+    def reenroll(target):
+        values = {'client_machine': target['params']['client_machine'], 'store_path': target['params']['store_path']}
+        return handleReenrollment(module, src, target, dict(params, subject_name=params['subject_name'].format(**values)))
+
+    outcomes = module.handleConcurrent(reenroll, targets, module.params['concurrency'])
+    result['reenrollment'] = [{'name': target['name'], 'error': error} for target, (value, error) in zip(targets, outcomes)]
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+#!/usr/bin/python
+
+DOCUMENTATION = '''
+---
+module: certificate_store_add
+
+short_description: This module adds a certificate to many keyfactor certificate stores
+
+version_added: "2.11"
+
+description:
+    - This module adds, or with overwrite replaces, a certificate in every certificate store selected by id, store type
+      or container.
+    - Stores that already hold the certificate, according to its locations in keyfactor, are skipped.
+    - The other stores are sent to the bulk add endpoint chunk_size stores per request, with up to concurrency requests
+      at a time. Keyfactor schedules one management job per store.
+    - With wait the job history is polled for all outstanding jobs together, with one query per 50 jobs, and only
+      for the jobs that have not finished yet. The delay between polls grows from poll_interval up to a minute until
+      every job finished or wait_timeout passed. Only succeeded jobs count as success; a job that finished with a
+      warning is reported with a warning, and one whose result is unknown fails the task like a failed one.
+    - Supports check mode, which reports the stores the certificate would be added to.
+
+options:
+    certificate_id:
+        description:
+            - Id of the certificate to add
+        required: true
+    stores:
+        description:
+            - Ids of the certificate stores
+        required: false
+    store_type:
+        description:
+            - Select the stores of this store type, by name, short name or id
+        required: false
+    container_id:
+        description:
+            - Select the stores of this certificate store container
+        required: false
+    alias:
+        description:
+            - Alias of the certificate in the stores
+        required: false
+    overwrite:
+        description:
+            - Replace a certificate with the same alias. Default False
+        required: false
+    chunk_size:
+        description:
+            - Stores per add request. Default 100
+        required: false
+    concurrency:
+        description:
+            - Number of requests sent in parallel. Default 4
+        required: false
+    wait:
+        description:
+            - Wait for the jobs to finish and report their results. Default True
+        required: false
+    wait_timeout:
+        description:
+            - Seconds to wait for the jobs. Default 900
+        required: false
+    poll_interval:
+        description:
+            - Seconds before the first poll of the job history. Default 5
+        required: false
+    page_size:
+        description:
+            - Stores and job history entries requested per page. Default 500
+        required: false
+    src:
+        description:
+            - Name of the Virtual Directory, Default: KeyfactorAPI
+        required: false
+
+author:
+    - Sulav Acharya (@sulavacharya-inf)
+'''
+
+EXAMPLES = '''
+- name: Roll the renewed certificate out to every IIS store
+  keyfactor.platform.certificate_store_add:
+    certificate_id: "{{ renewed.certificate_id }}"
+    store_type: IISU
+    alias: www.example.com
+    overwrite: True
+  register: rollout
+'''
+
+RETURN = '''
+changed:
+    description: Whether the certificate was sent to any store
+    type: bool
+    returned: always
+stores:
+    description: One entry per selected store with id, client_machine, store_path, job_id, status and message. status
+        is present, would_add, submitted, succeeded, warning, failed, unknown (finished without a known result), timeout
+        (still running when wait_timeout passed), unverified (submitted with wait but without a job id to check) or
+        error (not submitted)
+    type: list
+    returned: always
+summary:
+    description: Number of stores per status
+    type: dict
+    returned: always
+'''
+
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule, KeyfactorApiError
+from ansible_collections.keyfactor.platform.plugins.module_utils.certificates import createChunks
+from ansible_collections.keyfactor.platform.plugins.module_utils.certificate_stores import JOB_RESULTS, handleAddCertificate, handleJobHistory, handleSelect
+from ansible_collections.keyfactor.platform.plugins.module_utils.store_types import handleList as handleListStoreTypes
+
+MAX_POLL_INTERVAL = 60
+
+def run_module():
+
+    argument_spec = dict(
+        certificate_id=dict(type='int', required=True),
+        stores=dict(type='list', elements='str', required=False),
+        store_type=dict(type='str', required=False),
+        container_id=dict(type='int', required=False),
+        alias=dict(type='str', required=False),
+        overwrite=dict(type='bool', required=False, default=False),
+        chunk_size=dict(type='int', required=False, default=100),
+        concurrency=dict(type='int', required=False, default=4),
+        wait=dict(type='bool', required=False, default=True),
+        wait_timeout=dict(type='int', required=False, default=900),
+        poll_interval=dict(type='int', required=False, default=5),
+        page_size=dict(type='int', required=False, default=500),
+        src=dict(type='str', required=False, default="KeyfactorAPI")
+    )
+
+    # seed the result dict in the object
+    result = dict(
+        changed=False,
+        stores=[],
+        summary={}
+    )
+
+    module = AnsibleKeyfactorModule(
+        argument_spec=argument_spec,
+        required_one_of=[('stores', 'store_type', 'container_id')],
+        supports_check_mode=True
+    )
+
+    try:
+        entries = handleResolve(module)
+    except KeyfactorApiError as e:
+        module.fail_json(msg=e.message, **result)
+    result['stores'] = entries
+
+    pending = [entry for entry in entries if entry['status'] == 'pending']
+    if module.check_mode:
+        for entry in pending:
+            entry['status'] = 'would_add'
+    else:
+        handleSubmit(module, pending)
+        if module.params['wait']:
+            handleWait(module, [entry for entry in pending if entry['status'] == 'submitted' and entry['job_id']])
+            for entry in pending:
+                if entry['status'] == 'submitted':
+                    entry['status'] = 'timeout' if entry['job_id'] else 'unverified'
+            warnings = [entry for entry in pending if entry['status'] == 'warning']
+            if warnings:
+                module.warn('The jobs of ' + str(len(warnings)) + ' stores finished with a warning: '
+                    + ', '.join(str(entry['client_machine']) + ':' + str(entry['store_path']) for entry in warnings))
+    result['changed'] = any(entry['status'] not in ('present', 'error') for entry in pending)
+
+    for entry in entries:
+        result['summary'][entry['status']] = result['summary'].get(entry['status'], 0) + 1
+    failed = [entry for entry in entries if entry['status'] in ('error', 'failed', 'unknown', 'timeout', 'unverified')]
+    if failed:
+        module.fail_json(msg=str(len(failed)) + ' of ' + str(len(entries)) + ' stores did not receive the certificate.', **result)
+    module.exit_json(**result)
+
+def createEntry(store, status):
+    return {
+        'id': store['Id'],
+        'client_machine': store.get('ClientMachine'),
+        'store_path': store.get('StorePath'),
+        'job_id': None,
+        'status': status,
+        'message': None
+    }
+
+def handleResolve(module):
+    src = module.params['src']
+    storeTypeId = None
+    if module.params['store_type']:
+        for storeType in handleListStoreTypes(module, src):
+            if module.params['store_type'] in (str(storeType['StoreType']), storeType.get('ShortName'), storeType.get('Name')):
+                storeTypeId = storeType['StoreType']
+        if storeTypeId is None:
+            raise KeyfactorApiError('Store type ' + module.params['store_type'] + ' does not exist.')
+
+    certificate = module.handleJsonRequest("GET", src + '/Certificates/' + str(module.params['certificate_id']) + '?includeLocations=true')
+    locations = (certificate or {}).get('Locations') or []
+    holding = set(str(location['CertStoreId']).lower() for location in locations if location.get('CertStoreId'))
+    holdingPaths = set(((location.get('StoreMachine') or '').lower(), location.get('StorePath')) for location in locations)
+
+    entries = {}
+    for store in handleSelect(module, src, module.params['stores'], storeTypeId, module.params['container_id'], module.params['page_size']):
+        present = str(store['Id']).lower() in holding or ((store.get('ClientMachine') or '').lower(), store.get('StorePath')) in holdingPaths
+        # Replacing is what overwrite asks for, even where the certificate is
+        entries[store['Id']] = createEntry(store, 'present' if present and not module.params['overwrite'] else 'pending')
+
+    known = set(str(id).lower() for id in entries)
+    missing = [id for id in module.params['stores'] or [] if id.lower() not in known]
+    if missing:
+        raise KeyfactorApiError('Certificate stores not found: ' + ', '.join(missing) + '.')
+    return [entries[id] for id in sorted(entries, key=str)]
+
+def handleSubmit(module, pending):
+    chunks = createChunks(pending, module.params['chunk_size'])
+
+    def submit(chunk):
+        return handleAddCertificate(module, module.params['src'], module.params['certificate_id'],
+            [{'Id': entry['id']} for entry in chunk], module.params['alias'], module.params['overwrite'])
+
+    for chunk, (jobs, error) in zip(chunks, module.handleConcurrent(submit, chunks, module.params['concurrency'])):
+        # Command answers with one job id per store, in the order sent
+        jobs = jobs if isinstance(jobs, list) and len(jobs) == len(chunk) else [None] * len(chunk)
+        for entry, job in zip(chunk, jobs):
+            entry['status'] = 'error' if error else 'submitted'
+            entry['message'] = error
+            entry['job_id'] = str(job) if job else None
+
+def handleWait(module, submitted):
+    outstanding = dict((entry['job_id'], entry) for entry in submitted)
+    deadline = time.monotonic() + module.params['wait_timeout']
+    interval = module.params['poll_interval']
+    while outstanding:
+        time.sleep(max(0, min(interval, deadline - time.monotonic())))
+        try:
+            history = handleJobHistory(module, module.params['src'], sorted(outstanding), module.params['page_size'])
+        except KeyfactorApiError as e:
+            module.warn('Unable to read the job history: ' + e.message)
+            history = {}
+        for job, finished in history.items():
+            entry = outstanding.pop(job, None)
+            if entry:
+                entry['status'] = JOB_RESULTS.get(finished.get('Result'), 'unknown')
+                entry['message'] = finished.get('Message')
+        if time.monotonic() >= deadline:
+            return
+        interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+import time
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
@@ -56,6 +56,9 @@ options:
 
 author:
     - Sulav Acharya (@sacharya-inf)
+
+extends_documentation_fragment:
+    - keyfactor.platform.instances
 '''
 
 EXAMPLES = '''
@@ -89,6 +92,10 @@ msg:
     description: Message if an module does not get expected parameters
     type: str
     returned: sometimes
+instances:
+    description: Per instance result keyed by instance name, with the keys a single instance task returns
+    type: dict
+    returned: when instances is provided
 '''
 
 from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule
@@ -109,16 +116,20 @@ def run_module():
 
     mutually_exclusive_args = [["query", "copy_from_id"]]
 
-    # seed the result dict in the object
-    result = dict(
-        changed=False
-    )
-
     # Enable Suppot for Ansible Check-Mode
     module = AnsibleKeyfactorModule(
         argument_spec=argument_spec,
         mutually_exclusive=mutually_exclusive_args,
-        supports_check_mode=True
+        supports_check_mode=True,
+        supports_instances=True
+    )
+
+    module.handleInstances(lambda: handleModule(module))
+
+def handleModule(module):
+    # seed the result dict in the object
+    result = dict(
+        changed=False
     )
 
     # if the user is working with this module in only check mode we do not
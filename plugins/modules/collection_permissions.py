@@ -12,7 +12,8 @@ description:
     - This module handles adding and updating permissions on a specific collection for a given keyfactor role.
       The user will provide a keyfactor role_id and a list of appropriate permissions: Read, EditMetadata, Recover, Revoke and Delete 
       This permissions will be updating the existing permissions of that collection for the given keyfactor role.
-      Currently this module does not support checkmode.
+      The current permissions of the collection are read first and nothing is written when they already match.
+      A whole permission model can be applied at once with matrix. This module supports check mode.
 
 
 options:
@@ -36,9 +37,23 @@ options:
             - Set of permissions for the collection to have. Required only if the state is present
             - ['Read', 'EditMetadata', 'Recover', 'Revoke', 'Delete']
         required: false
+    matrix:
+        description:
+            - List of collection, role_id and permissions entries to apply in one task. Mutually exclusive with name and role_id.
+            - An empty permissions list removes the role from the collection.
+            - Collections are listed once, the current permissions of every collection are read concurrently and only
+              collections with differences get one POST carrying all of their changed roles.
+        required: false
+    concurrency:
+        description:
+            - Maximum number of requests sent at once with matrix. Default 10
+        required: false
 
 author:
     - Sulav Acharya (@sulavacharya-inf)
+
+extends_documentation_fragment:
+    - keyfactor.platform.instances
 '''
 
 EXAMPLES = '''
@@ -56,6 +71,19 @@ EXAMPLES = '''
       state: "present"
       role_id: 2
       permissions: ['Read', 'EditMetadata', 'Recover', 'Revoke', 'Delete']
+
+- name: Apply the collection permission model
+  keyfactor.platform.collection_permissions:
+      matrix:
+        - collection: "Pod Collection"
+          role_id: 2
+          permissions: ['Read', 'EditMetadata']
+        - collection: "Pod Collection"
+          role_id: 3
+          permissions: ['Read']
+        - collection: "Web Collection"
+          role_id: 3
+          permissions: []
 '''
 
 RETURN = '''
@@ -63,43 +91,68 @@ changed:
     description: Whether or not a change was made
     type: bool
     returned: always
+changes:
+    description: Per collection report with name, action (update or unchanged), changed and error
+    type: list
+    returned: when matrix is provided
+instances:
+    description: Per instance result keyed by instance name, with the keys a single instance task returns
+    type: dict
+    returned: when instances is provided
 '''
 
-from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule, KeyfactorApiError, createChangeReport
+from ansible_collections.keyfactor.platform.plugins.module_utils.collection_permissions import applyChange, createChange, handleGetPermissions, handleListCollections
 
 def run_module():
 
+    permission_choices = ['Read', 'EditMetadata', 'Recover', 'Revoke', 'Delete']
+
     argument_spec = dict(
-        name=dict(type='str', required=True),
+        name=dict(type='str', required=False),
         src=dict(type='str', required=False, default="KeyfactorAPI"),
-        role_id=dict(type='int', required=True),
-        permissions=dict(type='list', required=False, choices=['Read', 'EditMetadata', 'Recover', 'Revoke', 'Delete'], default=[]),
+        role_id=dict(type='int', required=False),
+        permissions=dict(type='list', required=False, choices=permission_choices, default=[]),
+        matrix=dict(type='list', elements='dict', required=False, options=dict(
+            collection=dict(type='str', required=True),
+            role_id=dict(type='int', required=True),
+            permissions=dict(type='list', elements='str', required=False, choices=permission_choices, default=[])
+        )),
+        concurrency=dict(type='int', required=False, default=10)
     )
 
+    module = AnsibleKeyfactorModule(
+        argument_spec=argument_spec,
+        required_one_of=[['name', 'matrix']],
+        required_together=[['name', 'role_id']],
+        mutually_exclusive=[['name', 'matrix']],
+        supports_check_mode=True,
+        supports_instances=True
+    )
+
+    module.handleInstances(lambda: handleModule(module))
+
+def handleModule(module):
     # seed the result dict in the object
     result = dict(
         changed=False
     )
 
-    module = AnsibleKeyfactorModule(
-        argument_spec=argument_spec,
-        supports_check_mode=False
-    )
-
-    # if the user is working with this module in only check mode we do not
-    # want to make any changes to the environment, just return the current
-    # state with no modifications
-    if module.check_mode:
+    if module.params['matrix'] is not None:
+        result['changes'] = handleBulk(module)
+        result['changed'] = any(change['changed'] for change in result['changes'])
+        errors = [change for change in result['changes'] if change['error']]
+        if errors:
+            module.fail_json(msg=str(len(errors)) + ' collection permission changes failed.', **result)
         module.exit_json(**result)
 
-
     isValid, current, msg = validate(module)
     if not isValid:
         module.fail_json(msg=msg)
 
     payload = create_payload(module)
     if module.params['state'] in ('absent', 'present'):
-        result['changed'] = handleChange(module, payload, current.get(str('Id')))
+        result['changed'] = handleStateChange(module, payload, current.get(str('Id')))
     else:
         msg = 'Invalid state \"' + module.params['state'] + '\"'
         module.fail_json(msg=msg)
@@ -146,6 +199,49 @@ def handleGet(module):
             return {}
         module.fail_json(msg=message)
 
+def handleStateChange(module, payload, id):
+    # Only write when the role's current permissions differ from the request
+    url = module.params.get('src')
+    try:
+        existing = handleGetPermissions(module, url, id)
+    except KeyfactorApiError as e:
+        module.fail_json(msg=e.message)
+    change = createChange(module.params['name'], id, existing, {module.params['role_id']: module.params['permissions']})
+    if change['action'] == 'unchanged':
+        return False
+    if module.check_mode:
+        return True
+    return handleChange(module, change['payload'], id)
+
+def handleBulk(module):
+    url = module.params.get('src')
+    requested = {}
+    for entry in module.params['matrix']:
+        roles = requested.setdefault(entry['collection'], {})
+        if entry['role_id'] in roles:
+            module.fail_json(msg='Role ' + str(entry['role_id']) + ' is listed more than once for collection \'' + entry['collection'] + '\'.')
+        roles[entry['role_id']] = entry['permissions']
+
+    try:
+        collections = dict((c['Name'], c) for c in handleListCollections(module, url))
+    except KeyfactorApiError as e:
+        module.fail_json(msg=e.message)
+    missing = [name for name in requested if name not in collections]
+    if missing:
+        module.fail_json(msg='Certificate Collections do not exist: ' + ', '.join(missing))
+
+    names = list(requested)
+    reads = module.handleConcurrent(lambda name: handleGetPermissions(module, url, collections[name]['Id']),
+        names, module.params['concurrency'])
+    changes = []
+    for name, (current, error) in zip(names, reads):
+        if error:
+            module.fail_json(msg='Unable to read permissions of \'' + name + '\': ' + error)
+        changes.append(createChange(name, collections[name]['Id'], current, requested[name]))
+
+    module.handleChanges(changes, lambda change: applyChange(module, url, change), module.params['concurrency'])
+    return createChangeReport(changes)
+
 def handleChange(module, payload, id):
     url = module.params.get('src')
     endpoint = url+'/CertificateCollections/'+str(id)+'/Permissions'
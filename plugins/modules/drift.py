@@ -0,0 +1,162 @@
+#!/usr/bin/python
+
+DOCUMENTATION = '''
+---
+module: drift
+
+short_description: This module reports what changed in keyfactor since its last run
+
+version_added: "2.11"
+
+description:
+    - This module keeps a digest of every identity, role, collection, collection permission set, metadata field,
+      store type and certificate authority in state_path, and reports the objects that were added, removed or changed
+      since the previous run.
+    - Lists are requested with the ETag of the previous run, so an unchanged list answered with 304 is not downloaded.
+      A list that is downloaded is compared object by object only when the digest of the whole list moved.
+    - The first run of a kind records its baseline and reports no drift.
+    - Nothing is written to keyfactor. In check mode the state file is not updated.
+
+options:
+    state_path:
+        description:
+            - Path of the file holding the digests of the previous run
+        required: true
+    kinds:
+        description:
+            - Kinds to check. Default all of them
+            - collection_permissions also checks collections, whose ids it needs
+        required: false
+    update_baseline:
+        description:
+            - Whether to save the state of this run as the baseline of the next one. Default True
+            - Set to False to keep reporting drift against a known good state
+        required: false
+    src:
+        description:
+            - Name of the Virtual Directory, Default: KeyfactorAPI
+        required: false
+    legacy_src:
+        description:
+            - Name of the Virtual Directory of the legacy API used for identities and roles, Default: CMSAPI
+        required: false
+    concurrency:
+        description:
+            - Maximum number of requests sent at once. Default 10
+        required: false
+
+author:
+    - Sulav Acharya (@sulavacharya-inf)
+'''
+
+EXAMPLES = '''
+- name: Check Keyfactor for drift
+  keyfactor.platform.drift:
+    state_path: /var/lib/keyfactor/drift.json
+  register: drift
+
+- name: Report drift
+  debug:
+    var: drift.drift
+  when: drift.drifted
+'''
+
+RETURN = '''
+changed:
+    description: Always False, nothing is written to keyfactor
+    type: bool
+    returned: always
+drifted:
+    description: Whether any kind drifted from its baseline
+    type: bool
+    returned: always
+drift:
+    description: Per drifted kind, the sorted added, removed and changed object names
+    type: dict
+    returned: always
+probes:
+    description: Per kind, how the drift was decided (not_modified, same_digest, diffed or baseline)
+    type: dict
+    returned: always
+'''
+
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule, KeyfactorApiError, readJsonFile, writeJsonAtomic
+from ansible_collections.keyfactor.platform.plugins.module_utils.drift import ENDPOINTS, handleProbe, handleProbePermissions
+
+def run_module():
+
+    kind_choices = list(ENDPOINTS) + ['collection_permissions']
+
+    argument_spec = dict(
+        state_path=dict(type='path', required=True),
+        kinds=dict(type='list', elements='str', required=False, choices=kind_choices, default=kind_choices),
+        update_baseline=dict(type='bool', required=False, default=True),
+        src=dict(type='str', required=False, default="KeyfactorAPI"),
+        legacy_src=dict(type='str', required=False, default="CMSAPI"),
+        concurrency=dict(type='int', required=False, default=10)
+    )
+
+    # seed the result dict in the object
+    result = dict(
+        changed=False,
+        drifted=False,
+        drift={},
+        probes={}
+    )
+
+    module = AnsibleKeyfactorModule(
+        argument_spec=argument_spec,
+        supports_check_mode=True
+    )
+
+    try:
+        state = handleDrift(module, result)
+    except KeyfactorApiError as e:
+        module.fail_json(msg=e.message, **result)
+
+    result['drifted'] = bool(result['drift'])
+    if module.params['update_baseline'] and not module.check_mode:
+        writeJsonAtomic(module.params['state_path'], state)
+    module.exit_json(**result)
+
+def handleDrift(module, result):
+    try:
+        previous = readJsonFile(module.params['state_path'], {})
+    except ValueError:
+        previous = None
+    if not isinstance(previous, dict):
+        module.fail_json(msg='The state file ' + module.params['state_path'] + ' is not valid JSON. Delete it to take a new baseline.', **result)
+    # A baseline taken from another instance says nothing about this one
+    if previous.get('url') != module.params['url']:
+        previous = {}
+    baselines = previous.get('kinds', {})
+    state = {'url': module.params['url'], 'kinds': dict(baselines)}
+
+    kinds = [kind for kind in ENDPOINTS if kind in module.params['kinds']
+        or (kind == 'collections' and 'collection_permissions' in module.params['kinds'])]
+    probes = module.handleConcurrent(
+        lambda kind: handleProbe(module, module.params[ENDPOINTS[kind][0]], kind, baselines.get(kind, {})),
+        kinds, module.params['concurrency'])
+    for kind, (value, error) in zip(kinds, probes):
+        if error:
+            raise KeyfactorApiError('Unable to read ' + kind + ': ' + error)
+        handleResult(result, state, kind, value)
+
+    if 'collection_permissions' in module.params['kinds']:
+        collections = state['kinds']['collections'].get('ids', {})
+        handleResult(result, state, 'collection_permissions', handleProbePermissions(module, module.params['src'],
+            baselines.get('collection_permissions', {}), collections, module.params['concurrency']))
+    return state
+
+def handleResult(result, state, kind, value):
+    probe, drift, baseline = value
+    result['probes'][kind] = probe
+    if drift and any(drift.values()):
+        result['drift'][kind] = drift
+    state['kinds'][kind] = baseline
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/python
+
+DOCUMENTATION = '''
+---
+module: expiry_report
+
+short_description: This module reports keyfactor certificates expiring within a number of days
+
+version_added: "2.11"
+
+description:
+    - This module answers "what expires within the next N days" from the local mirror kept by
+      keyfactor.platform.mirror. Certificates are ordered by expiry in the mirror, so the window is a range scan of that
+      index rather than a filter over every certificate.
+    - Before reporting the mirror is refreshed incrementally, so a repeat run only reads from keyfactor the certificates
+      imported or revoked since the previous one. See the mirror module for when full refreshes run.
+    - Certificates are grouped by collection, by CA or by the value of a metadata field. A certificate in several
+      collections is listed in each of them.
+    - Revoked certificates are left out unless include_revoked is set.
+    - This module does not change anything in keyfactor. In check mode the mirror is not refreshed and the report is
+      made from its current content.
+
+options:
+    path:
+        description:
+            - The SQLite mirror file
+        required: true
+    days:
+        description:
+            - Size of the window in days. Default 30
+        required: false
+    include_expired:
+        description:
+            - Also report certificates that expired already. Default False
+        required: false
+    include_revoked:
+        description:
+            - Also report revoked certificates. Default False
+        required: false
+    group_by:
+        description:
+            - collection, ca or metadata. Default ca
+        required: false
+    metadata_field:
+        description:
+            - Metadata field grouped by when group_by is metadata, for example Owner
+        required: false
+    fields:
+        description:
+            - Certificate fields reported. Default Id, IssuedCN, Thumbprint and NotAfter
+        required: false
+    refresh:
+        description:
+            - Refresh the mirror before reporting. Default True
+        required: false
+    full_refresh_interval:
+        description:
+            - Seconds after which the refresh reads every certificate, 0 for never. Default 604800 (7 days)
+        required: false
+    page_size:
+        description:
+            - Certificates requested per page when refreshing. Default 1000
+        required: false
+    concurrency:
+        description:
+            - Number of requests sent in parallel when refreshing. Default 10
+        required: false
+    src:
+        description:
+            - Name of the Virtual Directory, Default: KeyfactorAPI
+        required: false
+
+author:
+    - Sulav Acharya (@sulavacharya-inf)
+'''
+
+EXAMPLES = '''
+- name: Certificates expiring this month, per owner
+  keyfactor.platform.expiry_report:
+    path: /var/lib/keyfactor/mirror.db
+    days: 30
+    group_by: metadata
+    metadata_field: Owner
+  register: expiring
+
+- name: Mail every owner
+  mail:
+    to: "{{ item.name }}"
+    subject: "{{ item.count }} certificates expire soon"
+    body: "{{ item.certificates | map(attribute='IssuedCN') | join('\\n') }}"
+  loop: "{{ expiring.report }}"
+  when: item.name != '(none)'
+'''
+
+RETURN = '''
+changed:
+    description: Whether the refresh added, changed or removed any mirrored object
+    type: bool
+    returned: always
+report:
+    description: One entry per group with its name, count and certificates, the soonest expiring first
+    type: list
+    returned: always
+total:
+    description: Number of certificates in the window
+    type: int
+    returned: always
+window:
+    description: Start and end of the window, UTC
+    type: dict
+    returned: always
+refreshed:
+    description: How each mirrored kind was refreshed, empty when the mirror was not refreshed
+    type: dict
+    returned: always
+'''
+
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule, KeyfactorApiError
+from ansible_collections.keyfactor.platform.plugins.module_utils.certificates import parseDate, projectCertificate
+from ansible_collections.keyfactor.platform.plugins.module_utils.mirror import Mirror
+
+FIELDS = ['Id', 'IssuedCN', 'Thumbprint', 'NotAfter']
+REVOKED = 2
+NONE = '(none)'
+
+def run_module():
+
+    argument_spec = dict(
+        path=dict(type='path', required=True),
+        days=dict(type='int', required=False, default=30),
+        include_expired=dict(type='bool', required=False, default=False),
+        include_revoked=dict(type='bool', required=False, default=False),
+        group_by=dict(type='str', required=False, default='ca', choices=['collection', 'ca', 'metadata']),
+        metadata_field=dict(type='str', required=False),
+        fields=dict(type='list', elements='str', required=False),
+        refresh=dict(type='bool', required=False, default=True),
+        full_refresh_interval=dict(type='int', required=False, default=604800),
+        page_size=dict(type='int', required=False, default=1000),
+        concurrency=dict(type='int', required=False, default=10),
+        src=dict(type='str', required=False, default="KeyfactorAPI")
+    )
+
+    # seed the result dict in the object
+    result = dict(
+        changed=False,
+        report=[],
+        total=0,
+        window={},
+        refreshed={}
+    )
+
+    module = AnsibleKeyfactorModule(
+        argument_spec=argument_spec,
+        required_if=[('group_by', 'metadata', ('metadata_field',))],
+        supports_check_mode=True
+    )
+
+    if module.check_mode and not os.path.exists(module.params['path']):
+        module.fail_json(msg='Mirror ' + module.params['path'] + ' does not exist yet.', **result)
+
+    mirror = None
+    try:
+        mirror = Mirror(module.params['path'])
+        if module.params['refresh'] and not module.check_mode:
+            refreshed = mirror.handleRefresh(module, ['certificates', 'collections', 'certificate_authorities'],
+                module.params['src'], None,
+                full_refresh_interval=module.params['full_refresh_interval'],
+                page_size=module.params['page_size'],
+                collection_membership=module.params['group_by'] == 'collection' or mirror.getMeta('certificates.membership', False),
+                concurrency=module.params['concurrency'])
+            result['refreshed'] = dict((kind, mode) for kind, (mode, updated) in refreshed.items())
+            result['changed'] = any(updated for mode, updated in refreshed.values())
+        if module.params['group_by'] == 'collection' and not mirror.getMeta('certificates.membership'):
+            module.fail_json(msg='Mirror ' + module.params['path'] + ' does not record collection membership.', **result)
+        handleReport(module, mirror, result)
+    except KeyfactorApiError as e:
+        module.fail_json(msg=e.message, **result)
+    except sqlite3.Error as e:
+        module.fail_json(msg='Mirror ' + module.params['path'] + ' failed: ' + str(e), **result)
+    finally:
+        if mirror:
+            mirror.close()
+
+    module.exit_json(**result)
+
+def handleReport(module, mirror, result):
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    end = now + timedelta(days=module.params['days'])
+    start = None if module.params['include_expired'] else now
+    result['window'] = {'start': start.isoformat() if start else None, 'end': end.isoformat()}
+
+    groups = {}
+    names = createGroupNames(module, mirror)
+    fields = module.params['fields'] or FIELDS
+    for certificate in mirror.findCertificates(expires_after=start, expires_before=end):
+        if certificate.get('CertState') == REVOKED and not module.params['include_revoked']:
+            continue
+        entry = projectCertificate(certificate, fields)
+        entry['days_left'] = (parseDate(certificate.get('NotAfter')) - now).days
+        for group in createGroups(module, mirror, names, certificate):
+            groups.setdefault(group, []).append(entry)
+        result['total'] += 1
+
+    result['report'] = [{'name': name, 'count': len(groups[name]), 'certificates': groups[name]} for name in sorted(groups)]
+
+def createGroupNames(module, mirror):
+    if module.params['group_by'] == 'collection':
+        return mirror.findObjectNames('collections')
+    if module.params['group_by'] == 'ca':
+        return mirror.findObjectNames('certificate_authorities')
+    return {}
+
+def createGroups(module, mirror, names, certificate):
+    if module.params['group_by'] == 'collection':
+        return [names.get(str(i), str(i)) for i in mirror.findCollectionIds(certificate['Id'])] or [NONE]
+    if module.params['group_by'] == 'ca':
+        ca = certificate.get('CertificateAuthorityId')
+        return [names.get(str(ca)) or certificate.get('IssuerDN') or NONE]
+    value = (certificate.get('Metadata') or {}).get(module.params['metadata_field'])
+    return [str(value) if value not in (None, '') else NONE]
+
+from datetime import datetime, timedelta, timezone
+
+import os
+import sqlite3
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
@@ -30,6 +30,9 @@ options:
 
 author:
     - David Fleming (@david_fleming)
+
+extends_documentation_fragment:
+    - keyfactor.platform.instances
 '''
 
 EXAMPLES = '''
@@ -45,6 +48,10 @@ changed:
     description: Whether or not a change was made
     type: bool
     returned: always
+instances:
+    description: Per instance result keyed by instance name, with the keys a single instance task returns
+    type: dict
+    returned: when instances is provided
 '''
 
 from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule
@@ -55,16 +62,20 @@ def run_module():
         src=dict(type='str', required=False, default="CMSAPI")
     )
 
+    module = AnsibleKeyfactorModule(
+        argument_spec=argument_spec,
+        supports_check_mode=True,
+        supports_instances=True
+    )
+
+    module.handleInstances(lambda: handleModule(module))
+
+def handleModule(module):
     # seed the result dict in the object
     result = dict(
         changed=False
     )
 
-    module = AnsibleKeyfactorModule(
-        argument_spec=argument_spec,
-        supports_check_mode=True
-    )
-
     # if the user is working with this module in only check mode we do not
     # want to make any changes to the environment, just return the current
     # state with no modifications
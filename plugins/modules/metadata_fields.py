@@ -72,9 +72,29 @@ options:
         description:
             - Order in which the fields apprear. Default 0
         required: false
+    fields:
+        description:
+            - List of metadata fields to synchronize in one task. Mutually exclusive with name.
+            - Each entry takes the same options as the module (name, description, data_type, hint, validation, enrollment, options, default_value, explicit_update, allow_api, display_order) and its own state.
+            - data_type is required for present entries only.
+            - The current fields are fetched once and compared in memory, only the required POST/PUT/DELETE calls are sent.
+            - Entries without display_order are ordered by their position in the list.
+        required: false
+    prune:
+        description:
+            - With fields, delete metadata fields that are not in the list. Default false
+        required: false
+    concurrency:
+        description:
+            - Maximum number of requests sent at once when applying fields. Default 10
+        required: false
 
 author:
     - David Fleming (@david_fleming)
+
+extends_documentation_fragment:
+    - keyfactor.platform.fingerprint
+    - keyfactor.platform.instances
 '''
 
 EXAMPLES = '''
@@ -87,23 +107,53 @@ EXAMPLES = '''
     allow_api: true
     data_type: 1
 
+# Synchronize the whole metadata schema, ordered as listed
+- name: Synchronize Metadata Fields in Keyfactor
+  keyfactor.platform.metadata_fields:
+    fields:
+      - name: "PodName"
+        description: "Pod Name"
+        data_type: 1
+      - name: "Owner"
+        description: "Owning team"
+        data_type: 1
+        enrollment: 1
+      - name: "LegacyField"
+        data_type: 1
+        state: "absent"
 '''
 
 RETURN = '''
+fingerprint_hit:
+    description: Whether the task was skipped because the fingerprint store holds a recent apply of the same request
+    type: bool
+    returned: when fingerprint_store is set
 changed:
     description: Whether or not a change was made
     type: bool
     returned: always
+changes:
+    description: Per field report with name, action (create, update, delete or unchanged), changed and error
+    type: list
+    returned: when fields is provided
+instances:
+    description: Per instance result keyed by instance name, with the keys a single instance task returns
+    type: dict
+    returned: when instances is provided
 '''
 
-from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule, KeyfactorApiError, createChangeReport
+from ansible_collections.keyfactor.platform.plugins.module_utils.fingerprints import createFingerprintSpec, handleFingerprintLookup, handleFingerprintSave
+from ansible_collections.keyfactor.platform.plugins.module_utils.metadata_fields import applyChange, compareState, createChanges, createFieldSpec, createRequestedState, handleList, validateFields
 
 def run_module():
 
+    field_spec = createFieldSpec()
+
     argument_spec = dict(
         src=dict(type='str', required=False, default="KeyfactorAPI"),
         description=dict(type='str', required=False),
-        data_type=dict(type='int', required=True, choices=[1,2,3,4,5,6,7,8]),
+        data_type=dict(type='int', required=False, choices=[1,2,3,4,5,6,7,8]),
         hint=dict(type='str', required=False),
         validation=dict(type='str', required=False),
         enrollment=dict(type='int', required=False, choices=[0,1,2]),
@@ -111,18 +161,45 @@ def run_module():
         default_value=dict(type='str', required=False),
         explicit_update=dict(type='bool', required=False, default=False),
         allow_api=dict(type='bool', required=False),
-        display_order=dict(type='int', required=False, default=0)
+        display_order=dict(type='int', required=False, default=0),
+        fields=dict(type='list', elements='dict', required=False, options=field_spec),
+        prune=dict(type='bool', required=False, default=False),
+        concurrency=dict(type='int', required=False, default=10)
+    )
+    argument_spec.update(createFingerprintSpec())
+
+    module = AnsibleKeyfactorModule(
+        argument_spec=argument_spec,
+        required_one_of=[['name', 'fields']],
+        mutually_exclusive=[['name', 'fields']],
+        required_by={'name': 'data_type'},
+        supports_check_mode=True,
+        supports_instances=True
     )
 
+    module.handleInstances(lambda: handleModule(module))
+
+def handleModule(module):
     # seed the result dict in the object
     result = dict(
         changed=False
     )
 
-    module = AnsibleKeyfactorModule(
-        argument_spec=argument_spec,
-        supports_check_mode=True
-    )
+    if module.params['fields'] is not None:
+        validateFields(module, module.params['fields'])
+
+    if handleFingerprintLookup(module, 'metadata_fields'):
+        result['fingerprint_hit'] = True
+        module.exit_json(**result)
+
+    if module.params['fields'] is not None:
+        result['changes'] = handleBulk(module)
+        result['changed'] = any(change['changed'] for change in result['changes'])
+        errors = [change for change in result['changes'] if change['error']]
+        if errors:
+            module.fail_json(msg=str(len(errors)) + ' metadata field changes failed.', **result)
+        handleFingerprint(module)
+        module.exit_json(**result)
 
     # if the user is working with this module in only check mode we do not
     # want to make any changes to the environment, just return the current
@@ -136,10 +213,16 @@ def run_module():
     elif module.params['state'] == 'present':
         result['changed'] = handleStatePresent(module)
 
+    handleFingerprint(module)
     module.exit_json(**result)
 
 import json
 
+def handleFingerprint(module):
+    names = [field['name'] for field in module.params['fields'] or [module.params]]
+    handleFingerprintSave(module, 'metadata_fields',
+        lambda: [field for field in handleList(module, module.params['src']) if field['Name'] in names])
+
 def checkMode(module):
     current = handleGet(module)
     if module.params['state'] == 'absent':
@@ -148,13 +231,13 @@ def checkMode(module):
         return False
     if module.params['state'] == 'present':
         if current:
-            requestedState = createRequestedState(module)
+            requestedState = createRequestedState(module.params)
             return compareState(current,requestedState)
         return True
 
 def handleStatePresent(module):
     current = handleGet(module)
-    request = createRequestedState(module)
+    request = createRequestedState(module.params)
     if 'Id' in current:
         if compareState(current, request):
             request['id'] = current['Id']
@@ -162,29 +245,15 @@ def handleStatePresent(module):
         return False
     return handleAdd(module, request)
 
-def createRequestedState(module):
-    return {
-        "Name": module.params['name'], 
-        "Description": module.params['description'],
-        "DataType":module.params['data_type'],
-        "Hint":module.params['hint'],
-        "Validation":module.params['validation'],
-        "Enrollment":module.params['enrollment'],
-        "Options":module.params['options'],
-        "DefaultValue":module.params['default_value'],
-        "ExplicitUpdate":module.params['explicit_update'],
-        "AllowAPI":module.params['allow_api'],
-        "DisplayOrder":module.params['display_order']
-        }
-
-def compareState(currentState, requestedState):
-    for key, value in currentState.items():
-        if key not in ('Id', 'Enrollment'):
-            if (value == None and key not in requestedState):
-                continue
-            if value != requestedState[key]:
-                return True
-    return False
+def handleBulk(module):
+    url = module.params.get('src')
+    try:
+        current = handleList(module, url)
+    except KeyfactorApiError as e:
+        module.fail_json(msg=e.message)
+    changes = createChanges(current, module.params['fields'], module.params['prune'])
+    module.handleChanges(changes, lambda change: applyChange(module, url, change), module.params['concurrency'])
+    return createChangeReport(changes)
 
 def handleAdd(module, payload):
     url = module.params.get('src')
@@ -213,7 +282,7 @@ def handleStateAbsent(module):
     return False
 
 def handleDelete(module, id):
-    url = module.params.pop('src')
+    url = module.params.get('src')
     endpoint = url+'/MetadataFields/' + str(id)
     resp, info = module.handleRequest("DELETE", endpoint)
     status = info['status']
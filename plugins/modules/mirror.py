@@ -0,0 +1,178 @@
+#!/usr/bin/python
+
+DOCUMENTATION = '''
+---
+module: mirror
+
+short_description: This module keeps a local SQLite mirror of keyfactor objects
+
+version_added: "2.11"
+
+description:
+    - This module copies certificates, collections, CAs, store types, metadata fields, roles and identities into a
+      SQLite file, so that lookups, reports and playbooks can read them locally instead of asking keyfactor again.
+    - Certificates are indexed by CN, thumbprint, expiry and CA, and by collection when collection_membership is set.
+    - Lists other than certificates are read again with the ETag of the previous refresh and only replaced when
+      keyfactor reports a change.
+    - Certificates are refreshed incrementally, reading only those imported or revoked since the newest such date in
+      the mirror. Metadata edits and deleted certificates are not dated by keyfactor, so a full refresh runs every
+      full_refresh_interval seconds, or when full_refresh is set, and drops the certificates it did not see.
+    - Every refresh is one transaction, so readers see the previous or the new content and a failed refresh leaves the
+      mirror as it was. Check mode reads keyfactor but keeps nothing.
+
+options:
+    path:
+        description:
+            - The SQLite file. It is created when missing and holds one keyfactor instance
+        required: true
+    kinds:
+        description:
+            - Kinds refreshed. Default all of certificates, collections, certificate_authorities, store_types,
+              metadata_fields, roles and identities
+        required: false
+    full_refresh:
+        description:
+            - Read every certificate instead of the changed ones. Default False
+        required: false
+    full_refresh_interval:
+        description:
+            - Seconds after which a full certificate refresh runs anyway, 0 for never. Default 86400
+        required: false
+    collection_membership:
+        description:
+            - Record which certificates each collection holds, with one query per collection. Default True
+        required: false
+    include_metadata:
+        description:
+            - Whether certificate metadata is mirrored. Default True
+        required: false
+    page_size:
+        description:
+            - Certificates requested per page. Default 1000
+        required: false
+    concurrency:
+        description:
+            - Number of lists or collection queries read in parallel. Default 10
+        required: false
+    src:
+        description:
+            - Name of the Virtual Directory, Default: KeyfactorAPI
+        required: false
+    legacy_src:
+        description:
+            - Name of the legacy Virtual Directory, used for roles and identities, Default: CMSAPI
+        required: false
+
+author:
+    - Sulav Acharya (@sulavacharya-inf)
+'''
+
+EXAMPLES = '''
+- name: Refresh the mirror before the reports
+  keyfactor.platform.mirror:
+    path: /var/lib/keyfactor/mirror.db
+
+- name: Weekly full refresh of the certificates only
+  keyfactor.platform.mirror:
+    path: /var/lib/keyfactor/mirror.db
+    kinds:
+      - certificates
+    full_refresh: True
+'''
+
+RETURN = '''
+changed:
+    description: Whether any mirrored object was added, changed or removed
+    type: bool
+    returned: always
+refreshed:
+    description: How each kind was refreshed, full or incremental for certificates and listed or not_modified otherwise
+    type: dict
+    returned: always
+updated:
+    description: Number of objects added, changed or removed per kind
+    type: dict
+    returned: always
+counts:
+    description: Number of objects in the mirror per kind
+    type: dict
+    returned: always
+elapsed:
+    description: Seconds spent refreshing
+    type: float
+    returned: always
+'''
+
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule, KeyfactorApiError
+from ansible_collections.keyfactor.platform.plugins.module_utils.mirror import KINDS, Mirror
+
+def run_module():
+
+    argument_spec = dict(
+        path=dict(type='path', required=True),
+        kinds=dict(type='list', elements='str', required=False, default=list(KINDS), choices=list(KINDS)),
+        full_refresh=dict(type='bool', required=False, default=False),
+        full_refresh_interval=dict(type='int', required=False, default=86400),
+        collection_membership=dict(type='bool', required=False, default=True),
+        include_metadata=dict(type='bool', required=False, default=True),
+        page_size=dict(type='int', required=False, default=1000),
+        concurrency=dict(type='int', required=False, default=10),
+        src=dict(type='str', required=False, default="KeyfactorAPI"),
+        legacy_src=dict(type='str', required=False, default="CMSAPI")
+    )
+
+    # seed the result dict in the object
+    result = dict(
+        changed=False,
+        refreshed={},
+        updated={},
+        counts={},
+        elapsed=0.0
+    )
+
+    module = AnsibleKeyfactorModule(
+        argument_spec=argument_spec,
+        supports_check_mode=True
+    )
+
+    path = module.params['path']
+    # Check mode must not create the file either
+    if module.check_mode and not os.path.exists(path):
+        path = ':memory:'
+
+    start = time.time()
+    mirror = None
+    try:
+        mirror = Mirror(path)
+        refreshed = mirror.handleRefresh(module, module.params['kinds'], module.params['src'], module.params['legacy_src'],
+            full=module.params['full_refresh'],
+            full_refresh_interval=module.params['full_refresh_interval'],
+            page_size=module.params['page_size'],
+            include_metadata=module.params['include_metadata'],
+            collection_membership=module.params['collection_membership'],
+            concurrency=module.params['concurrency'])
+        for kind, (mode, updated) in refreshed.items():
+            result['refreshed'][kind] = mode
+            result['updated'][kind] = updated
+            result['counts'][kind] = mirror.handleCount(kind)
+    except KeyfactorApiError as e:
+        module.fail_json(msg=e.message, **result)
+    except sqlite3.Error as e:
+        module.fail_json(msg='Mirror ' + module.params['path'] + ' failed: ' + str(e), **result)
+    finally:
+        if mirror:
+            mirror.close()
+
+    result['changed'] = any(result['updated'].values())
+    result['elapsed'] = round(time.time() - start, 3)
+    module.exit_json(**result)
+
+import os
+import sqlite3
+import time
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
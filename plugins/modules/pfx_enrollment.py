@@ -16,8 +16,7 @@ options:
         description: Optional friendly name for the certificate
         type: str
     subject:
-        description: Subject for the certificate
-        required: true
+        description: Subject for the certificate. Required unless enrollments is provided
         type: str
     template:
         description: Template Short Name in Keyfactor
@@ -93,6 +92,87 @@ options:
             ms_ntdsreplication:
                 description: MS_NTDSReplication
                 type: list
+    enrollments:
+        description:
+            - List of certificates to enroll in one task. Mutually exclusive with subject.
+            - Each entry accepts key, name, subject, pfx_password, sans, metadata, additional_fields, template, ca, dest, key_dest and chain_dest.
+            - Entries inherit template, ca, cert_chain, values_from_ad and metadata from the task when not set.
+            - Requests are submitted through a thread pool, see concurrency and rate_limit.
+        type: list
+        elements: dict
+    concurrency:
+        description: Maximum number of enrollment requests in flight at once when using enrollments
+        type: int
+        default: 10
+    rate_limit:
+        description: Maximum number of enrollment requests started per second across all workers. 0 disables the limit
+        type: float
+        default: 0
+    checkpoint:
+        description:
+            - Path of a checkpoint file recording the certificate ID of every completed entry of enrollments.
+            - The file is replaced atomically, so a rerun after a failure or timeout skips the entries already enrolled instead of issuing duplicates.
+            - Entries are identified by their key, or by a digest of their subject, template, ca, sans, metadata and additional fields when no key is given.
+            - Skipped entries are returned with skipped set and without the PFX content, which is never written to the checkpoint.
+            - An entry whose certificate was issued but could not be written to dest is recorded as well, so a rerun warns about it instead of issuing a duplicate.
+            - A checkpoint that cannot be written is reported as a warning, the certificates enrolled are still returned.
+        type: path
+    checkpoint_interval:
+        description: Number of completed entries between checkpoint writes. The checkpoint is always written when the batch finishes
+        type: int
+        default: 1
+    dest:
+        description:
+            - Path to write the enrolled certificate to instead of returning it in the result.
+            - The file is written to a temporary file next to dest and renamed into place, with permissions set by mode.
+            - When set, pfx_certificate is not returned and the result carries dest and its sha256 checksum instead.
+        type: path
+    dest_format:
+        description:
+            - Format written to dest. pfx writes the decoded PKCS12 file.
+            - pem writes the certificate to dest, the unencrypted private key to key_dest and the chain to chain_dest, and requires the cryptography library.
+        type: str
+        choices: ['pfx', 'pem']
+        default: pfx
+    key_dest:
+        description: Path to write the PEM private key to. Required when dest_format is pem
+        type: path
+    chain_dest:
+        description: Path to write the PEM chain certificates to. When omitted with dest_format pem the chain is appended to dest
+        type: path
+    mode:
+        description:
+            - Permissions of the files written to dest, key_dest and chain_dest, as an octal number such as '0600'.
+            - Quote the value, or write it with a leading zero so YAML reads it as an octal number.
+        type: raw
+        default: '0600'
+    reuse_existing:
+        description:
+            - Skip enrollment when a matching, unrevoked certificate that is not due for renewal already exists.
+            - When dest is set the certificate in dest is checked, reading a pfx dest requires pfx_password. Its thumbprint is looked up in Command to confirm it is still active.
+            - Without dest, Command is searched for an active certificate with the same subject, template and SANs. Its PFX content is not returned.
+            - Reading dest requires the cryptography library, when it is missing the certificate is enrolled.
+        type: bool
+        default: false
+    renewal_days:
+        description: With reuse_existing, enroll a new certificate when the existing one expires within this many days
+        type: int
+        default: 30
+    aggregate:
+        description:
+            - Handled by the action plugin. Collect the request of every host in the play batch from the host_var host variable and enroll them all in one module execution using enrollments.
+            - The task must use run_once, and should be delegated to localhost so the requests are sent from the controller.
+            - The result is registered on every host, each host finds its own entry under hosts[inventory_hostname].
+              It carries no key material, so every request must set dest, and pfx_password when dest_format is pfx.
+            - The task only fails when every enrollment failed. Hosts whose enrollment failed are listed in failed_hosts
+              and have error set in their entry.
+            - Without the action plugin, for example when the module is run directly, aggregate must be false.
+        type: bool
+        default: false
+    host_var:
+        description: Handled by the action plugin. Name of the host variable holding each host's enrollment request when aggregate is set
+        type: str
+        default: pfx_enrollment_request
 
 author:
     - Matt Dobrowsky (@doebrowsk)
@@ -129,13 +209,90 @@ EXAMPLES = '''
         ip: 192.168.1.100,
         ip4: 192.168.1.100
     }
+
+# Request a batch of PFX certificates, 20 at a time and at most 50 per second
+- name: Request PFX certificates for the fleet
+  keyfactor.platform.pfx_enrollment:
+    template: 'WebServer'
+    ca: 'CA.my.domain\\CA'
+    concurrency: 20
+    rate_limit: 50
+    enrollments:
+      - subject: 'CN=node1.my.domain'
+        sans: {
+            dns: ['node1.my.domain']
+        }
+      - subject: 'CN=node2.my.domain'
+        metadata: {
+            'Owner': 'MyTeam'
+        }
+
+# Write the certificate and key to disk instead of returning the PFX
+- name: Request a certificate as PEM files
+  keyfactor.platform.pfx_enrollment:
+    subject: 'CN=web01.my.domain'
+    template: 'WebServer'
+    ca: 'CA.my.domain\\CA'
+    dest: /etc/pki/tls/certs/web01.crt
+    dest_format: pem
+    key_dest: /etc/pki/tls/private/web01.key
+    chain_dest: /etc/pki/tls/certs/web01-chain.crt
+
+# Only enroll when the certificate on disk is missing or expires within 14 days
+- name: Keep the web server certificate current
+  keyfactor.platform.pfx_enrollment:
+    subject: 'CN=web01.my.domain'
+    template: 'WebServer'
+    ca: 'CA.my.domain\\CA'
+    dest: /etc/pki/tls/certs/web01.crt
+    dest_format: pem
+    key_dest: /etc/pki/tls/private/web01.key
+    reuse_existing: true
+    renewal_days: 14
+
+# Enroll one certificate per host from a single controller side execution,
+# each host sets pfx_enrollment_request, for example
+# {'subject': 'CN=' + inventory_hostname, 'dest': '/srv/certs/' + inventory_hostname + '.pfx', 'pfx_password': pfx_password}
+- name: Request host certificates for the whole batch
+  keyfactor.platform.pfx_enrollment:
+    template: 'WebServer'
+    ca: 'CA.my.domain\\CA'
+    aggregate: true
+    concurrency: 25
+  run_once: true
+  delegate_to: localhost
+  register: host_certificates
+
+- name: Show this host's certificate ID
+  debug:
+    msg: "{{ host_certificates.hosts[inventory_hostname].certificate_id }}"
+
+# Long running batch that can be resumed and polled with async_status
+- name: Request PFX certificates with a checkpoint
+  keyfactor.platform.pfx_enrollment:
+    template: 'WebServer'
+    ca: 'CA.my.domain\\CA'
+    checkpoint: /var/tmp/fleet-enrollment.checkpoint
+    checkpoint_interval: 25
+    enrollments: "{{ fleet_certificates }}"
+  async: 7200
+  poll: 0
+  register: fleet_enrollment
+
+- name: Wait for the batch enrollment to finish
+  async_status:
+    jid: "{{ fleet_enrollment.ansible_job_id }}"
+  register: fleet_result
+  until: fleet_result.finished
+  retries: 240
+  delay: 30
 '''
 
 RETURN = '''
 pfx_certificate:
     description: Enrolled certificate content
     type: str
-    returned: success
+    returned: success and dest is not set
 pfx_password:
     description: PFX Password for the enrolled certificate
     type: str
@@ -144,14 +301,116 @@ certificate_id:
     description: Certificate ID in Keyfactor
     type: int
     returned: success
+reused:
+    description: Whether an existing certificate was kept instead of enrolling a new one
+    type: bool
+    returned: success
+dest:
+    description: Path the certificate was written to
+    type: str
+    returned: when dest is set
+checksum:
+    description: sha256 checksum of the file written to dest
+    type: str
+    returned: when dest is set
+enrollments:
+    description: Per entry results in the order of the enrollments option. Each entry has key, subject, certificate_id, pfx_certificate, pfx_password, skipped, reused and error
+    type: list
+    returned: when enrollments is provided
+hosts:
+    description: Per host results keyed by inventory hostname, with the same fields as enrollments except pfx_certificate and pfx_password
+    type: dict
+    returned: when aggregate is set
+failed_hosts:
+    description: Hosts whose enrollment failed
+    type: list
+    returned: when aggregate is set
+throughput:
+    description: Aggregate numbers for a batch run (total, succeeded, failed, skipped, reused, elapsed_seconds, enrollments_per_second)
+    type: dict
+    returned: when enrollments is provided
 '''
 
+import base64
+import hashlib
 import json
-from datetime import datetime, timezone
-from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule
+import threading
+import time
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from ansible.module_utils.basic import missing_required_lib
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule, KeyfactorApiError, readJsonFile, writeFileAtomic, writeJsonAtomic
+from ansible_collections.keyfactor.platform.plugins.module_utils.certificates import createQueryString, handleCertificateSearch, normalizeDn, parseDate
+
+try:
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.serialization import Encoding, NoEncryption, PrivateFormat, pkcs12
+    HAS_CRYPTOGRAPHY = True
+except ImportError:
+    HAS_CRYPTOGRAPHY = False
+
+# Multiple of 4 so every slice of the base64 blob decodes on its own
+DECODE_CHUNK_SIZE = 64 * 1024
 
 def run_module():
 
+    sans_options = dict(
+        other=dict(
+            type='list',
+            elements='raw'
+        ),
+        rfc822=dict(
+            type='list',
+            elements='raw'
+        ),
+        dns=dict(
+            type='list',
+            elements='raw'
+        ),
+        x400=dict(
+            type='list',
+            elements='raw'
+        ),
+        directory=dict(
+            type='list',
+            elements='raw'
+        ),
+        ediparty=dict(
+            type='list',
+            elements='raw'
+        ),
+        uri=dict(
+            type='list',
+            elements='raw'
+        ),
+        ip=dict(
+            type='list',
+            elements='raw'
+        ),
+        ip4=dict(
+            type='list',
+            elements='raw'
+        ),
+        ip6=dict(
+            type='list',
+            elements='raw'
+        ),
+        registeredid=dict(
+            type='list',
+            elements='raw'
+        ),
+        ms_ntprincipalname=dict(
+            type='list',
+            elements='raw'
+        ),
+        ms_ntdsreplication=dict(
+            type='list',
+            elements='raw'
+        )
+    )
+
     argument_spec = dict(
         vdir=dict(
             type='str',
@@ -161,15 +420,15 @@ def run_module():
             type='str'
         ),
         subject=dict(
-            type='str',
-            required=True
+            type='str'
         ),
         template=dict(
             type='str',
             required=True
         ),
         pfx_password=dict(
-            type='str'
+            type='str',
+            no_log=True
         ),
         ca=dict(
             type='str',
@@ -194,72 +453,120 @@ def run_module():
         sans=dict(
             type='dict',
             default={},
+            options=sans_options
+        ),
+        enrollments=dict(
+            type='list',
+            elements='dict',
             options=dict(
-                other=dict(
-                    type='list',
-                    elements='raw'
-                ),
-                rfc822=dict(
-                    type='list',
-                    elements='raw'
+                key=dict(
+                    type='str',
+                    no_log=False
                 ),
-                dns=dict(
-                    type='list',
-                    elements='raw'
+                name=dict(
+                    type='str'
                 ),
-                x400=dict(
-                    type='list',
-                    elements='raw'
+                subject=dict(
+                    type='str',
+                    required=True
                 ),
-                directory=dict(
-                    type='list',
-                    elements='raw'
+                pfx_password=dict(
+                    type='str',
+                    no_log=True
                 ),
-                ediparty=dict(
-                    type='list',
-                    elements='raw'
+                template=dict(
+                    type='str'
                 ),
-                uri=dict(
-                    type='list',
-                    elements='raw'
+                ca=dict(
+                    type='str'
                 ),
-                ip=dict(
-                    type='list',
-                    elements='raw'
+                metadata=dict(
+                    type='dict'
                 ),
-                ip4=dict(
-                    type='list',
-                    elements='raw'
+                additional_fields=dict(
+                    type='dict'
                 ),
-                ip6=dict(
-                    type='list',
-                    elements='raw'
+                sans=dict(
+                    type='dict',
+                    options=sans_options
                 ),
-                registeredid=dict(
-                    type='list',
-                    elements='raw'
+                dest=dict(
+                    type='path'
                 ),
-                ms_ntprincipalname=dict(
-                    type='list',
-                    elements='raw'
+                key_dest=dict(
+                    type='path',
+                    no_log=False
                 ),
-                ms_ntdsreplication=dict(
-                    type='list',
-                    elements='raw'
+                chain_dest=dict(
+                    type='path'
                 )
             )
+        ),
+        concurrency=dict(
+            type='int',
+            default=10
+        ),
+        rate_limit=dict(
+            type='float',
+            default=0
+        ),
+        checkpoint=dict(
+            type='path'
+        ),
+        checkpoint_interval=dict(
+            type='int',
+            default=1
+        ),
+        dest=dict(
+            type='path'
+        ),
+        dest_format=dict(
+            type='str',
+            choices=['pfx', 'pem'],
+            default='pfx'
+        ),
+        key_dest=dict(
+            type='path',
+            no_log=False
+        ),
+        chain_dest=dict(
+            type='path'
+        ),
+        mode=dict(
+            type='raw',
+            default='0600'
+        ),
+        reuse_existing=dict(
+            type='bool',
+            default=False
+        ),
+        renewal_days=dict(
+            type='int',
+            default=30
+        ),
+        aggregate=dict(
+            type='bool',
+            default=False
+        ),
+        host_var=dict(
+            type='str',
+            default='pfx_enrollment_request'
         )
     )
 
     # seed the result dict in the object
     result = dict(
+        changed=False,
         pfx_certificate=None,
         pfx_password=None,
-        certificate_id=None
+        certificate_id=None,
+        reused=False
     )
 
     module = AnsibleKeyfactorModule(
         argument_spec=argument_spec,
+        required_one_of=[['subject', 'enrollments']],
+        mutually_exclusive=[['subject', 'enrollments']],
         supports_check_mode=False
     )
 
@@ -269,53 +576,359 @@ def run_module():
     if module.check_mode:
         module.exit_json(**result)
 
+    if module.params['aggregate']:
+        module.fail_json(msg='aggregate is handled by the pfx_enrollment action plugin, which was not used to run the module.')
+
+    # Check before enrolling so that no certificate is issued and then lost
+    try:
+        module.params['mode'] = parseMode(module.params['mode'])
+    except ValueError as e:
+        module.fail_json(msg=str(e))
+
+    if module.params['dest_format'] == 'pem':
+        if not HAS_CRYPTOGRAPHY:
+            module.fail_json(msg=missing_required_lib('cryptography'))
+        # Check before enrolling so that no certificate is issued and then lost
+        for item in module.params['enrollments'] or [module.params]:
+            if item.get('dest') and not item.get('key_dest'):
+                module.fail_json(msg='key_dest is required when dest_format is pem.')
+
     headers = {}
     headers['Content-Type'] = 'application/json'
     headers['X-Keyfactor-Requested-With'] = 'APIClient'
     headers['X-CertificateFormat'] = 'PFX'
     module.params['headers'] = headers
-    
+
+    if module.params['enrollments'] is not None:
+        result = enrollBatch(module)
+        if result['throughput']['failed']:
+            module.fail_json(msg=str(result['throughput']['failed']) + ' of ' + str(result['throughput']['total']) + ' enrollments failed.', **result)
+        module.exit_json(**result)
+
     enrollment_result = enroll(module)
 
     result.update(enrollment_result)
 
     module.exit_json(**result)
 
-def enroll(module):
-    url = module.params.get('vdir', 'KeyfactorAPI')
-    endpoint = url+'/Enrollment/PFX'
+def parseMode(value):
+    # YAML reads an unquoted 0600 as the integer 384, a string is octal
+    if isinstance(value, int) and not isinstance(value, bool):
+        mode = value
+    elif isinstance(value, str) and re.match(r'^0?[0-7]{3,4}$', value.strip()):
+        mode = int(value.strip(), 8)
+    else:
+        raise ValueError('mode must be an octal number such as 0600, got ' + str(value) + '.')
+    if mode < 0 or mode > 0o7777:
+        raise ValueError('mode must be an octal number such as 0600, got ' + str(value) + '.')
+    return mode
 
-    sans = module.params.get('sans', {})
+def createItemParams(module, item):
+    # Entries of the enrollments list fall back to the task level values,
+    # except for the output paths which only make sense per entry
+    params = dict(module.params, dest=None, key_dest=None, chain_dest=None)
+    params.update({k: v for k, v in item.items() if v is not None and k != 'metadata'})
+    params['metadata'] = dict(module.params.get('metadata') or {}, **(item.get('metadata') or {}))
+    return params
+
+def createItemKey(params):
+    if params.get('key'):
+        return params['key']
+    identity = {
+        'subject': params.get('subject'),
+        'template': params.get('template'),
+        'ca': params.get('ca'),
+        'sans': {k: v for k, v in (params.get('sans') or {}).items() if v is not None},
+        'metadata': params.get('metadata'),
+        'additional_fields': params.get('additional_fields')
+    }
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode('utf-8')).hexdigest()
+
+def createPayload(params):
+    sans = params.get('sans') or {}
     filtered_sans = {k: v for k,v in sans.items() if v is not None}
 
-    payload = {
-        'CustomFriendlyName': module.params.get('name', None),
-        'Password': module.params.get('pfx_password', None),
-        'PopulateMissingValuesFromAD': bool(module.params.get('values_from_ad', False)),
-        'Subject': module.params.get('subject'),
-        'IncludeChain': bool(module.params.get('cert_chain', False)),
-        'CertificateAuthority': module.params.get('ca'),
+    return {
+        'CustomFriendlyName': params.get('name', None),
+        'Password': params.get('pfx_password', None),
+        'PopulateMissingValuesFromAD': bool(params.get('values_from_ad', False)),
+        'Subject': params.get('subject'),
+        'IncludeChain': bool(params.get('cert_chain', False)),
+        'CertificateAuthority': params.get('ca'),
         'Timestamp': datetime.now(timezone.utc).isoformat().replace('+00:00','Z'),
-        'Template': module.params.get('template'),
+        'Template': params.get('template'),
         'SANs': dict(filtered_sans),
-        'Metadata': dict(module.params.get('metadata', None)),
-        'AdditionalEnrollmentFields': dict(module.params.get('additional_fields', None))
+        'Metadata': dict(params.get('metadata') or {}),
+        'AdditionalEnrollmentFields': dict(params.get('additional_fields') or {})
     }
 
-    resp, info = module.handleRequest('POST', endpoint, payload)
+def handleEnroll(module, payload):
+    url = module.params.get('vdir', 'KeyfactorAPI')
+    endpoint = url+'/Enrollment/PFX'
+    response = module.handleJsonRequest('POST', endpoint, payload)
     try:
-        content = resp.read()
-        response = json.loads(content)
         cert_info = response['CertificateInformation']
-        result = {
+        return {
             'pfx_certificate': cert_info['Pkcs12Blob'],
             'pfx_password': cert_info['Password'],
             'certificate_id': cert_info['KeyfactorId']
         }
-    except AttributeError:
-        content = info.pop('body', '')
-        message = json.loads(content)['Message']
-        module.fail_json(msg=message)
+    except (KeyError, TypeError):
+        raise KeyfactorApiError('Unexpected enrollment response for ' + str(payload['Subject']) + '.')
+
+def decodeChunks(blob):
+    for offset in range(0, len(blob), DECODE_CHUNK_SIZE):
+        yield base64.b64decode(blob[offset:offset + DECODE_CHUNK_SIZE])
+
+def writeCertificate(module, params, value):
+    # Replaces the PFX content of an enrollment result with the path and
+    # checksum of the file(s) it was written to.
+    dest = params['dest']
+    mode = module.params['mode']
+    blob = value.pop('pfx_certificate')
+    value['pfx_certificate'] = None
+    value['dest'] = dest
+
+    if module.params['dest_format'] == 'pfx':
+        value['checksum'] = writeFileAtomic(dest, decodeChunks(blob), mode)
+        return value
+
+    key_dest = params['key_dest']
+    password = value['pfx_password']
+    key, certificate, chain = pkcs12.load_key_and_certificates(b''.join(decodeChunks(blob)),
+        password.encode('utf-8') if password else None)
+    del blob
+    if key is None:
+        raise ValueError('The PFX returned for ' + str(params['subject']) + ' holds no private key to write to ' + str(key_dest) + '.')
+    chain_pem = [c.public_bytes(Encoding.PEM) for c in chain or []]
+    if params.get('chain_dest'):
+        writeFileAtomic(params['chain_dest'], chain_pem, mode)
+        chain_pem = []
+    writeFileAtomic(key_dest, [key.private_bytes(Encoding.PEM, PrivateFormat.PKCS8, NoEncryption())], mode)
+    value['checksum'] = writeFileAtomic(dest, [certificate.public_bytes(Encoding.PEM)] + chain_pem, mode)
+    value['pfx_password'] = None
+    return value
+
+def readLocalThumbprint(module, params):
+    # Thumbprint of the certificate at dest, or None when it is missing or
+    # cannot be read
+    dest = params.get('dest')
+    if not dest or not HAS_CRYPTOGRAPHY or not os.path.exists(dest):
+        return None
+    try:
+        with open(dest, 'rb') as f:
+            content = f.read()
+        if module.params['dest_format'] == 'pem':
+            certificate = x509.load_pem_x509_certificate(content)
+        else:
+            if not params.get('pfx_password'):
+                return None
+            certificate = pkcs12.load_key_and_certificates(content, params['pfx_password'].encode('utf-8'))[1]
+        return certificate.fingerprint(hashes.SHA1()).hex().upper()
+    except (OSError, ValueError, TypeError):
+        return None
+
+def createSanValues(params):
+    values = set()
+    for san_values in (params.get('sans') or {}).values():
+        values.update(str(v).lower() for v in san_values or [])
+    return values
+
+def matchesRequest(params, certificate, renew_before):
+    if certificate.get('RevocationEffDate'):
+        return False
+    not_after = parseDate(certificate.get('NotAfter'))
+    if not not_after or not_after <= renew_before:
+        return False
+    if normalizeDn(certificate.get('IssuedDN')) != normalizeDn(params['subject']):
+        return False
+    requested = createSanValues(params)
+    if requested:
+        # Templates commonly copy the CN into the DNS SANs, do not count it
+        existing = set(str(e.get('Value', '')).lower() for e in certificate.get('SubjectAltNameElements') or [])
+        existing.discard(str(certificate.get('IssuedCN') or '').lower())
+        requested.discard(str(certificate.get('IssuedCN') or '').lower())
+        if existing != requested:
+            return False
+    return True
+
+def handleFindExisting(module, params):
+    # Returns the Command record of an active certificate that satisfies the
+    # request and is outside of the renewal window, or None
+    renew_before = datetime.now(timezone.utc) + timedelta(days=module.params['renewal_days'])
+    if params.get('dest'):
+        thumbprint = readLocalThumbprint(module, params)
+        if not thumbprint:
+            return None
+        conditions = [('Thumbprint', '-eq', thumbprint)]
+    else:
+        cn = [part.strip()[3:] for part in params['subject'].split(',') if part.strip().lower().startswith('cn=')]
+        conditions = [('IssuedCN', '-eq', cn[0])] if cn else [('IssuedDN', '-eq', params['subject'])]
+        conditions.append(('TemplateShortName', '-eq', params['template']))
+    conditions.append(('CertState', '-eq', 1))
+
+    certificates = handleCertificateSearch(module.handleJsonRequest, module.params['vdir'],
+        createQueryString(conditions), page_size=50)
+    for certificate in certificates:
+        if matchesRequest(params, certificate, renew_before):
+            return certificate
+    return None
+
+def createReusedResult(module, params, certificate):
+    value = {
+        'pfx_certificate': None,
+        'pfx_password': None,
+        'certificate_id': certificate.get('Id'),
+        'reused': True
+    }
+    if params.get('dest'):
+        value['dest'] = params['dest']
+        value['checksum'] = module.sha256(params['dest'])
+    return value
+
+def handleEnrollItem(module, params, issued=None):
+    # issued(value) is called once the certificate is issued, before it is
+    # written to dest
+    if module.params['reuse_existing']:
+        existing = handleFindExisting(module, params)
+        if existing:
+            return createReusedResult(module, params, existing)
+    value = handleEnroll(module, createPayload(params))
+    if issued:
+        issued(value)
+    if params.get('dest'):
+        value = writeCertificate(module, params, value)
+    value['reused'] = False
+    return value
+
+def enroll(module):
+    try:
+        value = handleEnrollItem(module, module.params)
+        value['changed'] = not value['reused']
+        return value
+    except KeyfactorApiError as e:
+        module.fail_json(msg=e.message)
+    except (OSError, ValueError) as e:
+        if module.params['dest']:
+            module.fail_json(msg='Unable to write certificate to ' + module.params['dest'] + ': ' + str(e))
+        module.fail_json(msg='Unable to enroll certificate: ' + str(e))
+
+def loadCheckpoint(module):
+    path = module.params.get('checkpoint')
+    try:
+        checkpoint = readJsonFile(path, {})
+    except ValueError:
+        module.fail_json(msg='Checkpoint file ' + path + ' is not valid JSON.')
+    return checkpoint.get('completed', {})
+
+def enrollBatch(module):
+    items = [createItemParams(module, item) for item in module.params['enrollments']]
+    keys = [createItemKey(params) for params in items]
+    if len(set(keys)) != len(keys):
+        module.fail_json(msg='Entries of enrollments must be unique, set key to tell identical requests apart.')
+
+    checkpoint_path = module.params.get('checkpoint')
+    completed = loadCheckpoint(module) if checkpoint_path else {}
+    pending = [(key, params) for key, params in zip(keys, items) if key not in completed]
+
+    lock = threading.Lock()
+    unsaved = [0]
+    checkpointErrors = []
+
+    def saveCheckpoint():
+        # Only called from the main thread. A failed write must not lose the
+        # certificates already issued, so it is reported as a warning.
+        with lock:
+            content = {'completed': dict(completed)}
+        try:
+            writeJsonAtomic(checkpoint_path, content)
+            unsaved[0] = 0
+        except (OSError, ValueError) as e:
+            checkpointErrors.append(str(e))
+
+    def enrollItem(pending_item):
+        key, params = pending_item
+
+        def issued(value):
+            # Recorded as soon as the certificate exists, so a rerun does not
+            # issue it again even when writing dest fails
+            with lock:
+                completed[key] = {
+                    'subject': params['subject'],
+                    'certificate_id': value['certificate_id'],
+                    'dest': None,
+                    'checksum': None
+                }
+
+        value = handleEnrollItem(module, params, issued)
+        if key in completed:
+            with lock:
+                completed[key]['dest'] = value.get('dest')
+                completed[key]['checksum'] = value.get('checksum')
+        return value
+
+    def handleComplete(pending_item, value, error):
+        if checkpoint_path and pending_item[0] in completed:
+            unsaved[0] += 1
+            if unsaved[0] >= module.params['checkpoint_interval']:
+                saveCheckpoint()
+
+    started = time.monotonic()
+    outcomes = dict(zip([key for key, params in pending], module.handleConcurrent(enrollItem, pending,
+        concurrency=module.params['concurrency'],
+        rate_limit=module.params['rate_limit'],
+        on_complete=handleComplete)))
+    elapsed = time.monotonic() - started
+    if checkpoint_path and unsaved[0]:
+        saveCheckpoint()
+    if checkpointErrors:
+        module.warn('Unable to write checkpoint ' + checkpoint_path + ': ' + checkpointErrors[-1])
+
+    enrollments = []
+    for key, params in zip(keys, items):
+        entry = {
+            'key': key,
+            'subject': params['subject'],
+            'certificate_id': None,
+            'pfx_certificate': None,
+            'pfx_password': None,
+            'skipped': key not in outcomes,
+            'reused': False,
+            'error': None
+        }
+        if entry['skipped']:
+            entry['certificate_id'] = completed[key]['certificate_id']
+            if completed[key].get('dest'):
+                entry['dest'] = completed[key]['dest']
+                entry['checksum'] = completed[key]['checksum']
+            elif params.get('dest'):
+                module.warn('Certificate ' + str(entry['certificate_id']) + ' for ' + params['subject']
+                    + ' was enrolled by an earlier run but not written to ' + params['dest'] + '.')
+        else:
+            value, entry['error'] = outcomes[key]
+            # A certificate issued but not written still has its id reported
+            if entry['error'] and key in completed:
+                entry['certificate_id'] = completed[key]['certificate_id']
+            if value:
+                entry.update(value)
+        enrollments.append(entry)
+
+    skipped = len(items) - len(pending)
+    failed = len([e for e in enrollments if e['error'] is not None])
+    reused = len([e for e in enrollments if e['reused']])
+    return {
+        'changed': len(pending) - failed - reused > 0,
+        'enrollments': enrollments,
+        'throughput': {
+            'total': len(enrollments),
+            'succeeded': len(pending) - failed,
+            'failed': failed,
+            'skipped': skipped,
+            'reused': reused,
+            'elapsed_seconds': round(elapsed, 3),
+            'enrollments_per_second': round(len(pending) / elapsed, 2) if elapsed else None
+        }
+    }
 
 def main():
     run_module()
@@ -0,0 +1,294 @@
+#!/usr/bin/python
+
+DOCUMENTATION = '''
+---
+module: reconcile
+
+short_description: This module applies a whole desired state document to keyfactor
+
+version_added: "2.11"
+
+description:
+    - This module takes the desired identities, roles, collections, collection permissions, metadata fields,
+      store types and certificate authorities in one document and brings keyfactor in line with it.
+    - The live state of every kind in the document is read once, concurrently, at the start of the run.
+    - Kinds are applied in dependency order. Identities come before roles, roles and collections before collection
+      permissions, metadata fields before collections and roles before certificate authorities. Kinds that do not
+      depend on each other share a wave, and all changes of a wave are sent in parallel.
+    - Deletes are sent after everything else, in the reverse order.
+    - Certificate collections cannot be updated through the API. A collection that differs is reported with an error.
+    - With mode plan, nothing is written. The changes are saved to plan_path together with a fingerprint of every object
+      they update or delete, so that they can be reviewed first. In check mode plan_path is not written either.
+    - With mode apply, the saved plan is run without planning again. The lists of the kinds the plan updates or deletes
+      are read once more, the same way the plan read them, and the run stops before the first write if the
+      fingerprint of any of those objects no longer matches.
+    - This module supports check mode.
+
+options:
+    config:
+        description:
+            - The desired state. Every key is optional and only the kinds present are reconciled.
+            - Required unless mode is apply.
+        required: false
+        suboptions:
+            identities:
+                description:
+                    - List of identities with name and state.
+            roles:
+                description:
+                    - List of roles with name, description, identities, permissions and state.
+                    - The identities and permissions lists are authoritative.
+            collections:
+                description:
+                    - List of collections with name, description, query, duplication_field, show_on_dashboard and favorite.
+            collection_permissions:
+                description:
+                    - List of collection, role (name) or role_id, and permissions entries.
+                    - An empty permissions list removes the role from the collection.
+            metadata_fields:
+                description:
+                    - List of metadata fields, with the same options as the fields option of metadata_fields.
+            store_types:
+                description:
+                    - List of store type definitions in the JSON format of the API, as taken by the definitions option of store_type.
+            certificate_authorities:
+                description:
+                    - List of certificate authorities, with the same options as the certificate_authorities option of certificate_authority.
+    mode:
+        description:
+            - reconcile plans and applies in one run, plan only writes plan_path, apply runs the plan in plan_path. Default reconcile
+        required: false
+    plan_path:
+        description:
+            - Path of the plan file. Required with mode plan and apply
+        required: false
+    src:
+        description:
+            - Name of the Virtual Directory, Default: KeyfactorAPI
+        required: false
+    legacy_src:
+        description:
+            - Name of the Virtual Directory of the legacy API used for identities and roles, Default: CMSAPI
+        required: false
+    api_src:
+        description:
+            - Name of the Virtual Directory used to send identity changes of a role as a delta, Default: KeyfactorAPI
+        required: false
+    concurrency:
+        description:
+            - Maximum number of requests sent at once. Default 10
+        required: false
+
+author:
+    - Sulav Acharya (@sulavacharya-inf)
+
+extends_documentation_fragment:
+    - keyfactor.platform.instances
+'''
+
+EXAMPLES = '''
+- name: Apply the Keyfactor configuration
+  keyfactor.platform.reconcile:
+    config:
+      identities:
+        - name: "KEYFACTOR\\\\PKI Admins"
+      roles:
+        - name: "PKI Admin"
+          description: "PKI administrators"
+          identities:
+            - "KEYFACTOR\\\\PKI Admins"
+          permissions:
+            - "CertificateCollectionsModify"
+      metadata_fields:
+        - name: "Owner"
+          data_type: 1
+      collections:
+        - name: "Owned"
+          description: "Certificates with an owner"
+          query: "Metadata.Owner -ne NULL"
+      collection_permissions:
+        - collection: "Owned"
+          role: "PKI Admin"
+          permissions:
+            - Read
+            - Revoke
+
+- name: Save a plan for review
+  keyfactor.platform.reconcile:
+    mode: plan
+    plan_path: /var/lib/keyfactor/plan.json
+    config: "{{ keyfactor_config }}"
+
+- name: Apply the reviewed plan
+  keyfactor.platform.reconcile:
+    mode: apply
+    plan_path: /var/lib/keyfactor/plan.json
+'''
+
+RETURN = '''
+changed:
+    description: Whether or not a change was made
+    type: bool
+    returned: always
+changes:
+    description: Per kind list of name, action (create, update, delete or unchanged), changed and error
+    type: dict
+    returned: always
+levels:
+    description: The waves the kinds were applied in
+    type: list
+    returned: always
+pending:
+    description: Whether the saved plan holds any change
+    type: bool
+    returned: when mode is plan
+drifted:
+    description: Objects whose fingerprint no longer matches the plan
+    type: list
+    returned: when mode is apply and the plan is stale
+instances:
+    description: Per instance result keyed by instance name, with the keys a single instance task returns
+    type: dict
+    returned: when instances is provided
+'''
+
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule, KeyfactorApiError, readJsonFile, writeJsonAtomic
+from ansible_collections.keyfactor.platform.plugins.module_utils.certificate_authorities import createCaSpec
+from ansible_collections.keyfactor.platform.plugins.module_utils.metadata_fields import createFieldSpec, validateFields
+from ansible_collections.keyfactor.platform.plugins.module_utils.reconcile import Reconciler, createResult
+
+PLAN_VERSION = 1
+
+def run_module():
+
+    permission_choices = ['Read', 'EditMetadata', 'Recover', 'Revoke', 'Delete']
+
+    config_spec = dict(
+        identities=dict(type='list', elements='dict', required=False, options=dict(
+            name=dict(type='str', required=True),
+            state=dict(type='str', required=False, default='present', choices=['absent', 'present'])
+        )),
+        roles=dict(type='list', elements='dict', required=False, options=dict(
+            name=dict(type='str', required=True),
+            description=dict(type='str', required=False, default=''),
+            identities=dict(type='list', elements='str', required=False, default=[]),
+            permissions=dict(type='list', elements='str', required=False, default=[]),
+            state=dict(type='str', required=False, default='present', choices=['absent', 'present'])
+        )),
+        collections=dict(type='list', elements='dict', required=False, options=dict(
+            name=dict(type='str', required=True),
+            description=dict(type='str', required=False, default=''),
+            query=dict(type='str', required=False, default=''),
+            duplication_field=dict(type='int', required=False, choices=[0,1,2,4], default=0),
+            show_on_dashboard=dict(type='bool', required=False, default=False),
+            favorite=dict(type='bool', required=False, default=False)
+        )),
+        collection_permissions=dict(type='list', elements='dict', required=False, options=dict(
+            collection=dict(type='str', required=True),
+            role=dict(type='str', required=False),
+            role_id=dict(type='int', required=False),
+            permissions=dict(type='list', elements='str', required=False, choices=permission_choices, default=[])
+        ), required_one_of=[['role', 'role_id']], mutually_exclusive=[['role', 'role_id']]),
+        metadata_fields=dict(type='list', elements='dict', required=False, options=createFieldSpec()),
+        store_types=dict(type='list', elements='dict', required=False),
+        certificate_authorities=dict(type='list', elements='dict', required=False, options=createCaSpec())
+    )
+
+    argument_spec = dict(
+        config=dict(type='dict', required=False, options=config_spec),
+        mode=dict(type='str', required=False, default='reconcile', choices=['reconcile', 'plan', 'apply']),
+        plan_path=dict(type='path', required=False),
+        src=dict(type='str', required=False, default="KeyfactorAPI"),
+        legacy_src=dict(type='str', required=False, default="CMSAPI"),
+        api_src=dict(type='str', required=False, default="KeyfactorAPI"),
+        concurrency=dict(type='int', required=False, default=10)
+    )
+
+    module = AnsibleKeyfactorModule(
+        argument_spec=argument_spec,
+        required_if=[
+            ['mode', 'reconcile', ['config']],
+            ['mode', 'plan', ['config', 'plan_path']],
+            ['mode', 'apply', ['plan_path']]
+        ],
+        supports_check_mode=True,
+        supports_instances=True
+    )
+
+    if module.params['instances'] and module.params['mode'] != 'reconcile':
+        module.fail_json(msg='mode plan and apply run against a single instance.')
+
+    module.handleInstances(lambda: handleModule(module))
+
+def handleModule(module):
+    # seed the result dict in the object
+    result = dict(
+        changed=False
+    )
+
+    validateFields(module, (module.params['config'] or {}).get('metadata_fields') or [])
+
+    reconciler = Reconciler(module, module.params['config'] or {}, module.params['src'],
+        module.params['legacy_src'], module.params['api_src'], module.params['concurrency'])
+    try:
+        if module.params['mode'] == 'plan':
+            result.update(handlePlan(module, reconciler))
+            module.exit_json(**result)
+        elif module.params['mode'] == 'apply':
+            result.update(handleApply(module, reconciler))
+        else:
+            result.update(reconciler.run())
+    except KeyfactorApiError as e:
+        module.fail_json(msg=e.message, **result)
+
+    reports = [change for kind in result['changes'].values() for change in kind]
+    result['changed'] = any(change['changed'] for change in reports)
+    errors = [change for change in reports if change['error']]
+    if errors:
+        module.fail_json(msg=str(len(errors)) + ' changes failed.', **result)
+    module.exit_json(**result)
+
+def handlePlan(module, reconciler):
+    # Nothing is written to keyfactor; the plan holds every change with the
+    # fingerprint of the object it was computed against
+    levels, changes = reconciler.plan()
+    result = createResult(levels, changes)
+    errors = [change for change in changes if change.get('error')]
+    if errors:
+        module.fail_json(msg=str(len(errors)) + ' changes cannot be planned, no plan was written.', **result)
+    # Check mode reports the plan without saving it
+    if not module.check_mode:
+        writeJsonAtomic(module.params['plan_path'], {
+            'version': PLAN_VERSION,
+            'url': module.params['url'],
+            'levels': levels,
+            'changes': [change for change in changes if change['action'] != 'unchanged']
+            })
+    result['pending'] = any(change['action'] != 'unchanged' for change in changes)
+    return result
+
+def handleApply(module, reconciler):
+    # Runs a saved plan without listing anything again. Only the objects the
+    # plan updates or deletes are read back, and the run stops before the
+    # first write if any of them changed since the plan was made.
+    try:
+        plan = readJsonFile(module.params['plan_path'])
+    except ValueError as e:
+        module.fail_json(msg='Unable to read plan: ' + str(e))
+    if not plan:
+        module.fail_json(msg='Plan ' + module.params['plan_path'] + ' does not exist.')
+    if plan.get('version') != PLAN_VERSION:
+        module.fail_json(msg='Unsupported plan version ' + str(plan.get('version')) + '.')
+    if plan['url'] != module.params['url']:
+        module.fail_json(msg='The plan was made against ' + str(plan['url']) + '.')
+    drifted = reconciler.handleVerify(plan['changes'])
+    if drifted:
+        module.fail_json(msg='Objects changed since the plan was made, make a new plan.', drifted=drifted)
+    reconciler.apply(plan['levels'], plan['changes'])
+    return createResult(plan['levels'], plan['changes'])
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
@@ -77,9 +77,46 @@ options:
         description:
             - Whether the role should be present or absent
         required: true
+    identities:
+        description:
+            - Complete list of identities of the role. Mutually exclusive with identities_add and identities_remove.
+        required: false
+    identities_add:
+        description:
+            - Identities to add to the role, other members are kept.
+        required: false
+    identities_remove:
+        description:
+            - Identities to remove from the role, other members are kept.
+        required: false
+    permissions:
+        description:
+            - Complete list of permissions of the role. Mutually exclusive with permissions_add and permissions_remove.
+        required: false
+    permissions_add:
+        description:
+            - Permissions to add to the role.
+        required: false
+    permissions_remove:
+        description:
+            - Permissions to remove from the role.
+        required: false
+    api_src:
+        description:
+            - Name of the Keyfactor API Virtual Directory used to send identity changes as a delta. Default: KeyfactorAPI
+        required: false
+
+notes:
+    - Identity membership is compared with the live role as a set. When only identities differ, just the added and removed
+      identities are sent to the Security/Roles/{id}/Identities endpoint. Description or permission changes rewrite the role.
+    - Without any of the add/remove options, omitted identities or permissions are treated as empty lists. When one of them
+      is used, an omitted list is left untouched.
 
 author:
     - David Fleming (@david_fleming)
+
+extends_documentation_fragment:
+    - keyfactor.platform.instances
 '''
 EXAMPLES = '''
 # Create a test role and description with permission APIRead and assign to identity KEYFACTOR\\Test
@@ -97,6 +134,17 @@ EXAMPLES = '''
   keyfactor.platform.roles:
     name: "AnsibleTestRole"
     state: 'absent'
+
+# Add one member to a large role without resending its other identities
+- name: Add an Identity to a Role in Keyfactor
+  keyfactor.platform.roles:
+    name: "AnsibleTestRole"
+    description: "AnsibleTestRoleDescription"
+    state: 'present'
+    identities_add:
+    - "KEYFACTOR\\NewMember"
+    identities_remove:
+    - "KEYFACTOR\\FormerMember"
 '''
 
 RETURN = '''
@@ -104,19 +152,44 @@ changed:
     description: Whether or not a change was made
     type: bool
     returned: always
+instances:
+    description: Per instance result keyed by instance name, with the keys a single instance task returns
+    type: dict
+    returned: when instances is provided
 '''
 
-from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule, KeyfactorApiError
+from ansible_collections.keyfactor.platform.plugins.module_utils.roles import applyChange, createChange
 
 def run_module():
 
     argument_spec = dict(
         description=dict(type='str', required=True),
         src=dict(type='str', required=False, default="CMSAPI"),
-        identities=dict(type='list', required=False, default=[]),
-        permissions=dict(type='list', required=False, default=[])
+        api_src=dict(type='str', required=False, default="KeyfactorAPI"),
+        identities=dict(type='list', required=False),
+        identities_add=dict(type='list', elements='str', required=False),
+        identities_remove=dict(type='list', elements='str', required=False),
+        permissions=dict(type='list', required=False),
+        permissions_add=dict(type='list', elements='str', required=False),
+        permissions_remove=dict(type='list', elements='str', required=False)
+    )
+
+    module = AnsibleKeyfactorModule(
+        argument_spec=argument_spec,
+        mutually_exclusive=[
+            ['identities', 'identities_add'],
+            ['identities', 'identities_remove'],
+            ['permissions', 'permissions_add'],
+            ['permissions', 'permissions_remove']
+        ],
+        supports_check_mode=True,
+        supports_instances=True
     )
 
+    module.handleInstances(lambda: handleModule(module))
+
+def handleModule(module):
     # seed the result dict in the object
     result = dict(
         changed=False,
@@ -124,11 +197,6 @@ def run_module():
         message=''
     )
 
-    module = AnsibleKeyfactorModule(
-        argument_spec=argument_spec,
-        supports_check_mode=True
-    )
-
     # if the user is working with this module in only check mode we do not
     # want to make any changes to the environment, just return the current
     # state with no modifications
@@ -152,66 +220,37 @@ def checkMode(module):
             return True, current['Id']
         return False, None
     if module.params['state'] == 'present':
-        if current:
-            return not compareState(current, module), current['Id']
-        return True, None
+        change = createChange(current, createRequestedState(module))
+        return change['action'] != 'unchanged', change.get('id')
 
 def createRequestedState(module):
-    return { 
-        "name": module.params['name'], 
-        "description": module.params['description'],
-        "identities": [i.capitalize() for i in module.params['identities']],
-        "permissions": [i.capitalize() for i in module.params['permissions']],
-        }
-
-def compareState(current, module):
-    requested = createRequestedState(module)
-    # This could be an unordered list. Sets do not preserve order
-    requested["identities"] = set(requested["identities"])
-    requested["permissions"] = set(requested["permissions"])
-    current = {k.lower():v for (k,v) in current.items()}
-    # This could be an unordered list. Sets do not preserve order
-    current["identities"] =  {i.encode('ascii').strip().capitalize() for i in current["identities"].split(',')}
-    current["permissions"] =  {i.encode('ascii').strip().capitalize() for i in current["permissions"].split(',')}
-
-    for key, value in requested.items():
-        if value != current.get(str(key)):
-            return False
-    return True
-
+    requested = dict((k, module.params[k]) for k in (
+        'name', 'description',
+        'identities', 'identities_add', 'identities_remove',
+        'permissions', 'permissions_add', 'permissions_remove'))
+    # Without any add/remove list the full lists are authoritative, even when
+    # omitted. Otherwise an omitted list leaves that membership untouched; an
+    # add/remove list that is set but empty still counts.
+    incremental = any(requested[key + suffix] is not None for key in ('identities', 'permissions') for suffix in ('_add', '_remove'))
+    for key in ('identities', 'permissions'):
+        if requested[key] is None and not incremental:
+            requested[key] = []
+    return requested
 
 def handleStatePresent(module):
     current = handleGetMode(module)
-    if current:
-        if compareState(current, module):
-            return False, current['Id']  
-        return handleUpdate(module), current['Id']
-    return handleAdd(module)
-
-def handleAdd(module):
-    url = module.params.get('src')
-    endpoint = url+'/Security/1/AddRole'
-    payload = { 
-        "name": module.params['name'], 
-        "description": module.params['description'], 
-        "identities":module.params['identities'],
-        "permissions":module.params['permissions']
-        }
-    resp, info = module.handleRequest("POST", endpoint, payload)
+    change = createChange(current, createRequestedState(module))
+    if change['action'] == 'unchanged':
+        return False, change['id']
     try:
-        content = resp.read()
-        response = json.loads(content)
-        if (response['Valid']) == True:
-            return True, response['Id']
-        module.fail_json(msg='Failed.')
-    except AttributeError:
-        content = info.pop('body', '')
-        message = (json.loads(content)['Message'])
-        if message == 'Cannot create Role because it already exist.':
-            return False
-        if message == 'Could not find user or Group.':
-            module.fail_json(msg=message)
-        module.fail_json(msg='Failed.')
+        response = applyChange(module, module.params['src'], module.params['api_src'], change)
+    except KeyfactorApiError as e:
+        module.fail_json(msg=e.message)
+    if isinstance(response, dict) and response.get('Valid') == False:
+        module.fail_json(msg=response.get('Message', 'Failed.'))
+    if change['action'] == 'create':
+        return True, (response or {}).get('Id')
+    return True, change['id']
 
 def handleStateAbsent(module):
     current = handleGetMode(module)
@@ -256,31 +295,6 @@ def handleGet(module):
             return {}
         module.fail_json(msg=message)
 
-def handleUpdate(module):
-    #"Cannot edit Role because it does not exist."
-    url = module.params.get('src')
-    endpoint = url+'/Security/1/EditRole'
-    payload = { 
-        "name": module.params['name'], 
-        "description": module.params['description'],
-        "identities":module.params['identities'],
-        "permissions":module.params['permissions']
-        }
-    resp, info = module.handleRequest("POST", endpoint, payload)
-    try:
-        content = resp.read()
-        contentSet = json.loads(content)
-        if (contentSet['Valid']) == True:
-            return True
-        module.fail_json(msg='Unknown Error.')
-    except AttributeError:
-        
-        content = info.pop('body', '')
-        message = json.loads(content)['Message']
-        if message == 'Cannot edit Role because it does not exist.':
-            return False
-        module.fail_json(msg=message)
-
 def handleGetMode(module):
     url = module.params.get('src')
     endpoint = url+'/Security/1/GetRoles'
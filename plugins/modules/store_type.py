@@ -93,9 +93,27 @@ options:
     job_custom_fields:
       description: Add custom fields to the Store Type
       required: false
+    definitions:
+      description:
+        - List of complete store type definitions, in the JSON format returned by the CertificateStoreTypes API. Mutually exclusive with name.
+        - The current store types are fetched once. Each definition is compared with the live one through a digest of the normalized definition, limited to the keys it sets.
+        - Only new and changed store types are sent, in parallel.
+      required: false
+    definitions_path:
+      description:
+        - Path to a store type definition JSON file, or to a directory whose *.json files are all loaded. Files may hold one definition or a list.
+        - Combined with definitions when both are given.
+      required: false
+    concurrency:
+      description: Maximum number of store types sent at once with definitions or definitions_path. Default 10
+      required: false
 
 author:
     - Sulav Acharya (@sulavacharya-inf)
+
+extends_documentation_fragment:
+    - keyfactor.platform.fingerprint
+    - keyfactor.platform.instances
 '''
 
 EXAMPLES = '''
@@ -128,21 +146,39 @@ EXAMPLES = '''
     keyfactor.platform.store_type:
       name: "PODSCS"
       state: absent
+- name: Synchronize custom Store Types from their definition files
+    keyfactor.platform.store_type:
+      definitions_path: "{{ playbook_dir }}/store_types"
+  delegate_to: localhost
 '''
 
 RETURN = '''
+fingerprint_hit:
+    description: Whether the task was skipped because the fingerprint store holds a recent apply of the same request
+    type: bool
+    returned: when fingerprint_store is set
 changed:
     description: Whether or not a change was made
     type: bool
     returned: always
+changes:
+    description: Per store type report with name, action (create, update or unchanged), changed and error
+    type: list
+    returned: when definitions or definitions_path is provided
+instances:
+    description: Per instance result keyed by instance name, with the keys a single instance task returns
+    type: dict
+    returned: when instances is provided
 '''
 
-from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule
+from ansible_collections.keyfactor.platform.plugins.module_utils.core import AnsibleKeyfactorModule, KeyfactorApiError, createChangeReport
+from ansible_collections.keyfactor.platform.plugins.module_utils.fingerprints import createFingerprintSpec, handleFingerprintLookup, handleFingerprintSave
+from ansible_collections.keyfactor.platform.plugins.module_utils.store_types import applyChange, createChanges, handleList, loadDefinitions
 
 def run_module():
 
     argument_spec = dict(
-        name=dict(type='str', required=True),
+        name=dict(type='str', required=False),
         src=dict(type='str', required=False, default="KeyfactorAPI"),
         short_name=dict(type='str', required=False),
         local_server=dict(type='bool', required=False, default=True),
@@ -157,25 +193,54 @@ def run_module():
         store_path_fixed=dict(type='str', required=False, default=''),
         store_path_choice=dict(type='list', required=False, default=[]),
         job_types=dict(type='list', required=False, default=[]),
-        job_custom_fields=dict(type='list', required=False, default=[])
+        job_custom_fields=dict(type='list', required=False, default=[]),
+        definitions=dict(type='list', elements='dict', required=False),
+        definitions_path=dict(type='path', required=False),
+        concurrency=dict(type='int', required=False, default=10)
     )
+    argument_spec.update(createFingerprintSpec())
 
     required_if_args = [
-      ['state', 'present', ['short_name']],
       ['store_path_type', 'Multiple Choice', ['store_path_choice']],
       ['store_path_type', 'Fixed', ['store_path_fixed']]
       ]
 
-    result = dict(
-        changed=False
-    )
-
     module = AnsibleKeyfactorModule(
         argument_spec=argument_spec,
         required_if=required_if_args,
-        supports_check_mode=True
+        required_one_of=[['name', 'definitions', 'definitions_path']],
+        mutually_exclusive=[['name', 'definitions'], ['name', 'definitions_path']],
+        supports_check_mode=True,
+        supports_instances=True
     )
 
+    module.handleInstances(lambda: handleModule(module))
+
+def handleModule(module):
+    # seed the result dict in the object
+    result = dict(
+        changed=False
+    )
+
+    # Definition files are part of the request, so they are read before the
+    # fingerprint store is consulted
+    definitions = None if module.params['name'] else loadRequestedDefinitions(module)
+    if handleFingerprintLookup(module, 'store_type', definitions):
+        result['fingerprint_hit'] = True
+        module.exit_json(**result)
+
+    if definitions is not None:
+        result['changes'] = handleBulk(module, definitions)
+        result['changed'] = any(change['changed'] for change in result['changes'])
+        errors = [change for change in result['changes'] if change['error']]
+        if errors:
+            module.fail_json(msg=str(len(errors)) + ' store type changes failed.', **result)
+        handleFingerprint(module, definitions)
+        module.exit_json(**result)
+
+    if module.params['state'] == 'present' and not module.params['short_name']:
+        module.fail_json(msg='state is present but all of the following are missing: short_name')
+
     # if the user is working with this module in only check mode we do not
     # want to make any changes to the environment, just return the current
     # state with no modifications
@@ -187,11 +252,42 @@ def run_module():
         result['changed'] = handleStateAbsent(module)
     elif module.params['state'] == 'present':
         result['changed'] = handleStatePresent(module)
+    handleFingerprint(module)
     module.exit_json(**result)
 
 
 import json
 
+def handleFingerprint(module, definitions=None):
+  names = [d.get('Name') for d in definitions] if definitions is not None else [module.params['name']]
+  handleFingerprintSave(module, 'store_type',
+    lambda: [storeType for storeType in handleList(module, module.params['src']) if storeType['Name'] in names], definitions)
+
+def loadRequestedDefinitions(module):
+  definitions = list(module.params['definitions'] or [])
+  if module.params['definitions_path']:
+    try:
+      definitions.extend(loadDefinitions(module.params['definitions_path']))
+    except (OSError, ValueError) as e:
+      module.fail_json(msg='Unable to read store type definitions: ' + str(e))
+  names = [d.get('Name') for d in definitions]
+  if not all(names):
+    module.fail_json(msg='Every store type definition must have a Name.')
+  duplicates = sorted(set(n for n in names if names.count(n) > 1))
+  if duplicates:
+    module.fail_json(msg='Store type definitions are duplicated: ' + ', '.join(duplicates))
+  return definitions
+
+def handleBulk(module, definitions):
+  url = module.params.get('src')
+  try:
+    current = handleList(module, url)
+  except KeyfactorApiError as e:
+    module.fail_json(msg=e.message)
+  changes = createChanges(current, definitions)
+  module.handleChanges(changes, lambda change: applyChange(module, url, change), module.params['concurrency'])
+  return createChangeReport(changes)
+
 def createPayload(module):
   payload =  {
     "Name": module.params.get("name"),